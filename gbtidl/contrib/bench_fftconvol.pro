@@ -0,0 +1,114 @@
+;+
+; Benchmark the FFT convolution used by dcconvol for large kernels
+; (see fftconvol) against the direct convolution done by CONVOL.
+;
+; <p>
+; A synthetic spectrum with noise, a few lines and some blanked
+; channels is smoothed with Gaussian kernels of increasing width, as
+; dcsmooth would construct them, using both methods with the keywords
+; dcsmooth uses (/nan, /edge_truncate, /normalize).  The time for each
+; method and the largest difference between the two results (relative
+; to the largest result value) are printed for each kernel width.  The
+; crossover where the FFT method becomes faster is the basis of the
+; 64 element threshold used by dcconvol.
+;
+; <p>
+; The cases that are easy to get wrong are then checked against
+; CONVOL: an even length kernel with no edge keywords (the number of
+; zeroed end channels), and /nan without /normalize over the blanked
+; block (every value under the kernel blanked gives MISSING).
+;
+; <p><B>Contributed By: GBT Science Support</B>
+;
+; @keyword nchan {in}{optional}{type=long}{default=32768} The number of
+; channels in the synthetic spectrum.
+; @keyword widths {in}{optional}{type=long array}{default=[11,21,41,65,129,257,513,1025,2049]}
+; The kernel widths (number of elements) to use.
+; @keyword nrepeat {in}{optional}{type=integer}{default=5} The
+; number of times each convolution is repeated.
+;
+; @examples
+; <pre>
+; bench_fftconvol
+; bench_fftconvol, nchan=131072, widths=[33,257,4097]
+; </pre>
+;
+; @version $Id$
+;-
+pro bench_fftconvol, nchan=nchan, widths=widths, nrepeat=nrepeat
+    compile_opt idl2
+
+    if n_elements(nchan) eq 0 then nchan = 32768L
+    if n_elements(widths) eq 0 then widths = [11,21,41,65,129,257,513,1025,2049]
+    if n_elements(nrepeat) eq 0 then nrepeat = 5
+
+    seed = 42L
+    x = findgen(nchan)
+    data = randomn(seed, nchan) + 5.0*exp(-0.5*((x-nchan/3.0)/20.0)^2) $
+           + 2.0*exp(-0.5*((x-2.0*nchan/3.0)/200.0)^2)
+    ; some blanked channels, including a block wider than some kernels
+    data[nchan/10] = !values.f_nan
+    data[(nchan/2):(nchan/2+99)] = !values.f_nan
+
+    print, 'width', 'convol (s)', 'fft (s)', 'speedup', 'max rel diff', format='(a8,2a14,a10,a16)'
+    for w=0,(n_elements(widths)-1) do begin
+        conwid = widths[w] < (nchan-1)
+        if conwid mod 2 eq 0 then conwid -= 1
+        ; the same kernel shape as dcsmooth
+        conres = conwid * sqrt(2.0*alog(2.0)) / 4.0
+        conCenter = (conwid-1.0)/2.0
+        conHeight = (2.0/conres) * sqrt(alog(2.0)/!pi)
+        kernel = make_gauss_data(findgen(conwid),[conHeight,conCenter,conres],0.0)
+
+        t0 = systime(/seconds)
+        for r=1,nrepeat do direct = convol(data, kernel, /nan, /edge_truncate, /normalize)
+        tdirect = (systime(/seconds) - t0)/nrepeat
+
+        t0 = systime(/seconds)
+        for r=1,nrepeat do viafft = fftconvol(data, kernel, /nan, /edge_truncate, /normalize)
+        tfft = (systime(/seconds) - t0)/nrepeat
+
+        both = where(finite(direct) and finite(viafft), nboth)
+        maxdiff = (nboth gt 0) ? max(abs(direct[both]-viafft[both])) / max(abs(direct[both])) : 0.0
+        if total(finite(direct) ne finite(viafft)) gt 0 then $
+            message, 'Blanked channels differ for width ' + strtrim(conwid,2), /info
+
+        print, conwid, tdirect, tfft, tdirect/(tfft > 1d-9), maxdiff, format='(i8,2f14.5,f10.1,e16.3)'
+    endfor
+
+    clean = data
+    bad = where(finite(clean) eq 0)
+    clean[bad] = 0.0
+    evenKernel = [1.0, 3.0, 4.0, 3.0, 1.0, 0.5]
+    labels = ['even kernel', 'even kernel, scale_factor', 'even kernel, /nan', $
+              'odd kernel, /nan', 'even kernel, /nan, missing=-999']
+    for c=0,(n_elements(labels)-1) do begin
+        case c of
+            0: begin
+                direct = convol(clean, evenKernel)
+                viafft = fftconvol(clean, evenKernel)
+            end
+            1: begin
+                direct = convol(clean, evenKernel, 12.5)
+                viafft = fftconvol(clean, evenKernel, 12.5)
+            end
+            2: begin
+                direct = convol(data, evenKernel, /nan)
+                viafft = fftconvol(data, evenKernel, /nan)
+            end
+            3: begin
+                direct = convol(data, evenKernel[0:4], /nan)
+                viafft = fftconvol(data, evenKernel[0:4], /nan)
+            end
+            4: begin
+                direct = convol(data, evenKernel, /nan, missing=-999.0)
+                viafft = fftconvol(data, evenKernel, /nan, missing=-999.0)
+            end
+        endcase
+        same = array_equal(finite(direct), finite(viafft)) and $
+               array_equal(direct eq -999.0, viafft eq -999.0)
+        both = where(finite(direct), nboth)
+        if same and nboth gt 0 then same = max(abs(direct[both]-viafft[both])) le 1e-4*max(abs(direct[both]))
+        print, labels[c], same ? 'same as CONVOL' : 'DIFFERS from CONVOL', format='(a-34,a)'
+    endfor
+end
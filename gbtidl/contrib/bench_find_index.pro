@@ -0,0 +1,94 @@
+;+
+; Benchmark the find index used by select and find with the indexed
+; keyword (see get_find_index and query_find_index) against a linear
+; search of every row.
+;
+; <p>
+; A synthetic index of nrows rows is constructed with columns
+; resembling a large multi-beam, multi-window project (SCAN, IFNUM,
+; PLNUM, FDNUM, INT, SOURCE).  The same queries are then done with
+; query_find_index and with a linear search using where on the full
+; columns.  The results are checked to be identical and the times
+; are printed.  The time to construct the find index is also printed
+; since that is paid once per index (it is kept until the index
+; changes).
+;
+; <p><B>Contributed By: GBT Science Support</B>
+;
+; @keyword nrows {in}{optional}{type=long}{default=5000000} The
+; number of rows in the synthetic index.
+; @keyword nrepeat {in}{optional}{type=integer}{default=10} The
+; number of times each query is repeated.
+;
+; @examples
+; <pre>
+; bench_find_index
+; bench_find_index, nrows=100000
+; </pre>
+;
+; @version $Id$
+;-
+pro bench_find_index, nrows=nrows, nrepeat=nrepeat
+    compile_opt idl2
+
+    if n_elements(nrows) eq 0 then nrows = 5000000L
+    if n_elements(nrepeat) eq 0 then nrepeat = 10
+
+    ; 8 IFs x 2 pols x 7 feeds x integrations per scan
+    nper = 8L*2L*7L
+    rows = lindgen(nrows)
+    scan = 1 + (rows / (nper*20L))
+    int = (rows / nper) mod 20
+    ifnum = rows mod 8
+    plnum = (rows / 8) mod 2
+    fdnum = (rows / 16) mod 7
+    source = 'SRC' + strtrim(scan mod 50,2)
+
+    t0 = systime(/seconds)
+    fidx = {nrows:nrows, names:['SCAN','IFNUM','PLNUM','FDNUM','INT','SOURCE'], $
+            cols:[ptr_new(find_index_column(scan)), ptr_new(find_index_column(ifnum)), $
+                  ptr_new(find_index_column(plnum)), ptr_new(find_index_column(fdnum)), $
+                  ptr_new(find_index_column(int)), ptr_new(find_index_column(source))], stamp:''}
+    tbuild = systime(/seconds) - t0
+    print, nrows, tbuild, format='("Find index for ",i0," rows constructed in ",f8.3," s")'
+
+    print, 'query', 'linear (s)', 'indexed (s)', 'speedup', 'count', format='(a-40,2a14,a10,a10)'
+
+    for q=0,4 do begin
+        t0 = systime(/seconds)
+        for r=1,nrepeat do begin
+            case q of
+                0: lin = where(scan ge 100 and scan le 900 and (ifnum eq 0 or ifnum eq 2), nlin)
+                1: lin = where(scan eq 1234 and plnum eq 1, nlin)
+                2: lin = where(source eq 'SRC7' and fdnum eq 3 and int le 5, nlin)
+                3: lin = where(ifnum eq 5, nlin)
+                4: lin = where(scan ge 2000 and int ge 15, nlin)
+            endcase
+        endfor
+        tlin = (systime(/seconds) - t0)/nrepeat
+
+        t0 = systime(/seconds)
+        for r=1,nrepeat do begin
+            case q of
+                0: idx = query_find_index(fidx, count=nidx, scan='100:900', ifnum=[0,2])
+                1: idx = query_find_index(fidx, count=nidx, scan=1234, plnum=1)
+                2: idx = query_find_index(fidx, count=nidx, source='SRC7', fdnum=3, int=':5')
+                3: idx = query_find_index(fidx, count=nidx, ifnum=5)
+                4: idx = query_find_index(fidx, count=nidx, scan='2000:', int='15:')
+            endcase
+        endfor
+        tidx = (systime(/seconds) - t0)/nrepeat
+
+        label = (["scan='100:900', ifnum=[0,2]", "scan=1234, plnum=1", $
+                  "source='SRC7', fdnum=3, int=':5'", "ifnum=5", $
+                  "scan='2000:', int='15:'"])[q]
+        if nlin ne nidx then begin
+            message, 'Count mismatch for ' + label, /info
+        endif else begin
+            if nlin gt 0 then if not array_equal(lin, idx) then message, 'Result mismatch for ' + label, /info
+        endelse
+        print, label, tlin, tidx, tlin/(tidx > 1d-9), nidx, format='(a-40,2f14.5,f10.1,i10)'
+    endfor
+
+    ptr_free, fidx.cols
+end
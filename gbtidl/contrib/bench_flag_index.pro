@@ -0,0 +1,150 @@
+;+
+; Benchmark finding the flagged channels of spectra using the flag
+; index (see flag_index and flag_mask) against checking every flag
+; rule for every spectrum.
+;
+; <p>
+; A synthetic set of nrules flag rules is constructed resembling a
+; large project with many RFI flags: mostly short scan ranges, some
+; long ones, some restricted to an integration range, plnum, ifnum or
+; fdnum, and channel ranges of various widths, with a few different
+; flag ids.  Masks for nspectra synthetic spectra are then found with
+; flag_mask and with a linear check of every rule using where, using
+; all rules, useflag='RFI' and skipflag=['RFI','SPUR'].  The masks are
+; checked to be identical and the times are printed.  The time to construct the
+; flag index is also printed since that is paid once per set of rules.
+;
+; <p><B>Contributed By: GBT Science Support</B>
+;
+; @keyword nrules {in}{optional}{type=long}{default=100000} The
+; number of flag rules.
+; @keyword nspectra {in}{optional}{type=long}{default=2000} The
+; number of spectra checked.
+; @keyword nchan {in}{optional}{type=long}{default=4096} The number
+; of channels in each spectrum.
+;
+; @examples
+; <pre>
+; bench_flag_index
+; bench_flag_index, nrules=10000, nspectra=500
+; </pre>
+;
+; @version $Id$
+;-
+pro bench_flag_index, nrules=nrules, nspectra=nspectra, nchan=nchan
+    compile_opt idl2
+
+    if n_elements(nrules) eq 0 then nrules = 100000L
+    if n_elements(nspectra) eq 0 then nspectra = 2000L
+    if n_elements(nchan) eq 0 then nchan = 4096L
+
+    seed = 42L
+    maxscan = 20000L
+    r = replicate({scan:[0L,0L], intnum:[-1L,-1L], plnum:-1L, ifnum:-1L, $
+                   fdnum:-1L, bchan:0L, echan:-1L, idstring:''}, nrules)
+    first = long(randomu(seed, nrules) * maxscan) + 1
+    ; 90% span a few scans, the rest up to 2000 scans
+    width = long(randomu(seed, nrules) * 4)
+    wide = where(randomu(seed, nrules) gt 0.9, nwide)
+    if nwide gt 0 then width[wide] = long(randomu(seed, nwide) * 2000)
+    r.scan = transpose([[first], [first + width]])
+    some = where(randomu(seed, nrules) gt 0.8, nsome)
+    if nsome gt 0 then begin
+        ilo = long(randomu(seed, nsome) * 20)
+        r[some].intnum = transpose([[ilo], [ilo + long(randomu(seed, nsome) * 5)]])
+    endif
+    some = where(randomu(seed, nrules) gt 0.5, nsome)
+    if nsome gt 0 then r[some].plnum = long(randomu(seed, nsome) * 2)
+    some = where(randomu(seed, nrules) gt 0.5, nsome)
+    if nsome gt 0 then r[some].ifnum = long(randomu(seed, nsome) * 8)
+    some = where(randomu(seed, nrules) gt 0.7, nsome)
+    if nsome gt 0 then r[some].fdnum = long(randomu(seed, nsome) * 7)
+    r.bchan = long(randomu(seed, nrules) * nchan)
+    r.echan = (r.bchan + long(randomu(seed, nrules) * 64)) < (nchan - 1)
+    some = where(randomu(seed, nrules) gt 0.95, nsome)
+    if nsome gt 0 then begin
+        r[some].bchan = 0
+        r[some].echan = -1
+    endif
+    idNames = ['RFI', 'SPUR', 'BAD', '']
+    r.idstring = idNames[long(randomu(seed, nrules) * n_elements(idNames))]
+
+    t0 = systime(/seconds)
+    fi = flag_index(r)
+    tbuild = systime(/seconds) - t0
+    print, nrules, n_elements(fi.center), tbuild, $
+           format='("Flag index for ",i0," rules (",i0," nodes) constructed in ",f8.3," s")'
+
+    ; the rule values, as the linear check would use them
+    scanlo = fi.scanlo
+    scanhi = fi.scanhi
+    intlo = fi.intlo
+    inthi = fi.inthi
+    plnum = fi.plnum
+    ifnum = fi.ifnum
+    fdnum = fi.fdnum
+    bchan = fi.bchan
+    echan = fi.echan
+    idstring = fi.idstring
+
+    dc = data_new(fltarr(nchan))
+    specScan = long(randomu(seed, nspectra) * maxscan) + 1
+    specInt = long(randomu(seed, nspectra) * 20)
+    specPl = long(randomu(seed, nspectra) * 2)
+    specIf = long(randomu(seed, nspectra) * 8)
+    specFd = long(randomu(seed, nspectra) * 7)
+
+    labels = ['all rules', "useflag='RFI'", "skipflag=['RFI','SPUR']"]
+    print, 'flags used', 'linear (ms)', 'indexed (ms)', 'speedup', 'rules/spectrum', $
+           format='(a-26,3a14,a16)'
+    for mode=0,2 do begin
+        case mode of
+            0: idOK = replicate(1B, nrules)
+            1: idOK = idstring eq 'RFI'
+            2: idOK = idstring ne 'RFI' and idstring ne 'SPUR'
+        endcase
+
+        tlin = 0d
+        tidx = 0d
+        nmatchTotal = 0LL
+        nbad = 0L
+        for i=0L,(nspectra-1) do begin
+            dc.scan_number = specScan[i]
+            dc.integration = specInt[i]
+            dc.polarization_num = specPl[i]
+            dc.if_number = specIf[i]
+            dc.feed_num = specFd[i]
+
+            t0 = systime(/seconds)
+            lin = bytarr(nchan)
+            hits = where(scanlo le specScan[i] and scanhi ge specScan[i] and idOK and $
+                         (intlo lt 0 or (specInt[i] ge intlo and specInt[i] le inthi)) and $
+                         (plnum lt 0 or plnum eq specPl[i]) and $
+                         (ifnum lt 0 or ifnum eq specIf[i]) and $
+                         (fdnum lt 0 or fdnum eq specFd[i]), nhits)
+            for h=0L,(nhits-1) do begin
+                e = echan[hits[h]]
+                if e lt 0 or e ge nchan then e = nchan - 1
+                lin[bchan[hits[h]]:e] = 1B
+            endfor
+            tlin += systime(/seconds) - t0
+
+            t0 = systime(/seconds)
+            case mode of
+                0: mask = flag_mask(fi, dc, nmatch=nmatch)
+                1: mask = flag_mask(fi, dc, nmatch=nmatch, useflag='RFI')
+                2: mask = flag_mask(fi, dc, nmatch=nmatch, skipflag=['RFI','SPUR'])
+            endcase
+            tidx += systime(/seconds) - t0
+
+            nmatchTotal += nmatch
+            if nmatch ne nhits || ~array_equal(mask, lin) then nbad += 1
+        endfor
+
+        if nbad gt 0 then message, string(nbad, labels[mode], $
+                                          format='("Mask mismatch for ",i0," spectra with ",a)'), /info
+        print, labels[mode], 1d3*tlin/nspectra, 1d3*tidx/nspectra, tlin/(tidx > 1d-9), $
+               double(nmatchTotal)/nspectra, format='(a-26,2f14.4,f14.1,f16.2)'
+    endfor
+    data_free, dc
+end
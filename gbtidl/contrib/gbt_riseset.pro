@@ -0,0 +1,179 @@
+function gbt_riseset, ra, dec, ELEVATION=elevation, LATITUDE=latitude, $
+                      LONGITUDE=longitude, NOREFRACT=norefract, $
+                      SET=lstset, TRANSIT=transit, UPHOURS=uphours, $
+                      STATUS=status, JD=jd, TABLE=table, LSTGRID=lstgrid, $
+                      TRES=tres
+;+
+; NAME:
+;       GBT_RISESET
+;
+; PURPOSE:
+;       To find the rise, set and transit times of many sources above a
+;       given elevation at the GBT, all at once.
+;
+; CALLING SEQUENCE:
+;       Result = GBT_RISESET(RA, DEC [, ELEVATION=scalar float]
+;                [, LATITUDE=scalar] [, LONGITUDE=scalar] [, /NOREFRACT]
+;                [, SET=variable] [, TRANSIT=variable] [, UPHOURS=variable]
+;                [, STATUS=variable] [, JD=scalar double]
+;                [, TABLE=variable] [, LSTGRID=variable] [, TRES=scalar])
+;
+; INPUTS:
+;       RA - the J2000 right ascension of the sources in decimal degrees;
+;            a scalar or vector.
+;       DEC - the J2000 declination of the sources in decimal degrees;
+;             same number of elements as RA.
+;
+; KEYWORD PARAMETERS:
+;       ELEVATION = the elevation of the horizon in degrees, as seen by
+;                   the telescope.  Default is 5.25, the nominal GBT
+;                   horizon limit (the same default as Horizon() in
+;                   AstrID).
+;       LATITUDE = the latitude of the telescope in degrees.  Default is
+;                  the GBT.
+;       LONGITUDE = the East longitude of the telescope in degrees, only
+;                   used with JD.  Default is the GBT.
+;       /NOREFRACT - set to turn off the approximate atmospheric
+;                    refraction correction.  By default a source is taken
+;                    to be up when its apparent (refracted) elevation is
+;                    at least ELEVATION, using Bennett's formula for the
+;                    refraction.
+;       SET = the LST of setting for each source, in hours [0,24).
+;       TRANSIT = the LST of transit for each source, in hours [0,24).
+;       UPHOURS = the number of sidereal hours each source is up per
+;                 day.
+;       STATUS = 1 if the source rises and sets, 0 if it never rises and
+;                2 if it never sets.  The rise and set times of sources
+;                that never rise or never set are NaN.
+;       JD = if a julian day is given, the rise, set and transit times
+;            (Result, SET and TRANSIT) are returned as the julian days
+;            of the next such event after JD, rather than LST.
+;       TABLE = a byte array [nsources, ngrid] that is 1 where a source
+;               is up at the LST given by LSTGRID.  The table for the most
+;               recent set of inputs is cached, so asking again for the
+;               same sources is free.
+;       LSTGRID = the LST in hours of each column of TABLE.
+;       TRES = the time resolution of TABLE in minutes.  Default is 12
+;              minutes, as in FIND_GBT_POLCAL.
+;
+; OUTPUTS:
+;       Function returns the LST of rising for each source in hours
+;       [0,24), or the julian day of the next rise if JD is given.
+;
+; COMMON BLOCKS:
+;       GBT_RISESET_COMMON - holds the last visibility table.
+;
+; RESTRICTIONS:
+;       No precession, nutation or aberration is applied, which is
+;       plenty for planning at the level of a minute.  The sidereal times
+;       are mean sidereal times.
+;
+; PROCEDURES CALLED:
+;       JULDAYTOLMST
+;
+; EXAMPLE:
+;       Find when the 3C286 and 3C48 polarization calibrators are above
+;       15 degrees:
+;       IDL> rise = gbt_riseset([202.78453,24.422081],[30.509155,33.159760],$
+;            ELEVATION=15, SET=set, TRANSIT=transit)
+;
+;       For a whole catalog, the visibility table tells which sources are
+;       up at each LST.  How many sources are up at each LST:
+;       IDL> rise = gbt_riseset(ra, dec, TABLE=up, LSTGRID=lst)
+;       IDL> plot, lst, total(up,1)
+;
+;       The next rise, as a julian day, after now:
+;       IDL> rise = gbt_riseset(ra, dec, JD=systime(/julian,/utc))
+;
+; NOTES:
+;       The hour angle at which a source crosses the horizon is found
+;       directly from
+;          cos(H) = (sin(el) - sin(lat)sin(dec)) / (cos(lat)cos(dec))
+;       for all of the sources at once, so there is no search over LST
+;       and the cost for thousands of sources is a few array operations.
+;
+; MODIFICATION HISTORY:
+;       Written for planning sessions with large catalogs.
+;-
+
+on_error, 2
+common gbt_riseset_common, rs_key, rs_table, rs_lstgrid
+
+nsrc = N_elements(ra)
+if (nsrc eq 0) then message, 'RA and DEC must be given.'
+if (N_elements(dec) ne nsrc) $
+   then message, 'RA and DEC must have the same number of elements.'
+
+; DEFAULT TO THE GBT...
+if (N_elements(elevation) eq 0) then elevation = 5.25d0
+if (N_elements(latitude) eq 0) then latitude = 38.D + 25.D/60.D + 59.2284D/3600.D
+if (N_elements(longitude) eq 0) then longitude = -(79.D + 50.D/60.D + 23.3988D/3600.D)
+
+d2r = !dpi/180d0
+r2d = 180d0/!dpi
+
+; THE GEOMETRIC ELEVATION OF THE HORIZON, REMOVING THE REFRACTION WHICH
+; RAISES THE APPARENT POSITION OF THE SOURCE (BENNETT 1982, IN ARCMIN)...
+el = double(elevation)
+if not keyword_set(NOREFRACT) then $
+   el = el - (1d0/tan(d2r*(el + 7.31d0/(el + 4.4d0))))/60d0
+
+rad = reform(double(ra), nsrc)
+decd = reform(double(dec), nsrc)
+
+; HOUR ANGLE OF THE HORIZON CROSSING FOR ALL SOURCES AT ONCE...
+cosha = (sin(d2r*el) - sin(d2r*latitude)*sin(d2r*decd)) / $
+       (cos(d2r*latitude)*cos(d2r*decd))
+status = replicate(1B, nsrc)
+never = where(cosha gt 1, nnever)
+if (nnever gt 0) then status[never] = 0B
+always = where(cosha lt -1, nalways)
+if (nalways gt 0) then status[always] = 2B
+h0 = r2d*acos((cosha > (-1d0)) < 1d0)/15d0   ; HOURS
+
+uphours = 2d0*h0
+
+; THE LST OF TRANSIT, RISING AND SETTING IN [0,24)...
+transit = ((rad/15d0 mod 24d0) + 24d0) mod 24d0
+rise = (transit - h0 + 24d0) mod 24d0
+lstset = ((transit + h0) mod 24d0)
+bad = where(status ne 1, nbad)
+if (nbad gt 0) then begin
+   rise[bad] = !values.d_nan
+   lstset[bad] = !values.d_nan
+endif
+
+; THE LST VISIBILITY TABLE...
+if arg_present(TABLE) or arg_present(LSTGRID) then begin
+   if (N_elements(tres) eq 0) then tres = 12.0
+   key = [double(nsrc), el, double(latitude), double(tres), rad, decd]
+   if (N_elements(rs_key) eq N_elements(key)) then $
+      cached = array_equal(rs_key, key) $
+   else cached = 0
+   if not cached then begin
+      ngrid = round(24d0/(tres/60d0)) > 1L
+      rs_lstgrid = dindgen(ngrid)*(24d0/ngrid)
+      ; THE HOUR ANGLE OF EACH SOURCE AT EACH LST IN [-12,12)...
+      ha = rebin(rs_lstgrid, ngrid, nsrc) - rebin(transpose(transit), ngrid, nsrc)
+      ha = ((ha + 36d0) mod 24d0) - 12d0
+      rs_table = transpose(abs(ha) le rebin(transpose(h0), ngrid, nsrc))
+      if (nnever gt 0) then rs_table[never,*] = 0B
+      if (nalways gt 0) then rs_table[always,*] = 1B
+      rs_key = key
+   endif
+   table = rs_table
+   lstgrid = rs_lstgrid
+endif
+
+; CONVERT TO THE JULIAN DAY OF THE NEXT EVENT...
+if (N_elements(jd) gt 0) then begin
+   sidereal = 1.00273790935d0
+   lst0 = 24d0/(2d0*!dpi)*juldaytolmst(double(jd[0]), obslong=longitude)
+   rise = jd[0] + (((rise - lst0) mod 24d0) + 24d0) mod 24d0 / 24d0 / sidereal
+   lstset = jd[0] + (((lstset - lst0) mod 24d0) + 24d0) mod 24d0 / 24d0 / sidereal
+   transit = jd[0] + (((transit - lst0) mod 24d0) + 24d0) mod 24d0 / 24d0 / sidereal
+endif
+
+return, rise
+
+end; gbt_riseset
@@ -9,6 +9,7 @@
 ; @field lun The currently open LUN
 ; @field bs The boostrap record.
 ; @field index An array of index records.
+; @field indexcols A structure of index column arrays.
 ;
 ; @file_comments
 ; This is a class for reading data from a unipops SDD file
@@ -33,6 +34,11 @@
 ; <p> This works for recent 12m data, which reverses the byte ordering
 ; from the original big-endian SDD format.
 ;
+; <p> The bootstrap and index records are read in one call when the
+; file is opened.  The index is also available as column arrays
+; (getindexcols) and getdata2d returns the data for many scans as one
+; 2-D array, reading contiguous scans in one call.
+;
 ; <p><B>Contributed By: Bob Garwood, NRAO-CV</B>
 ;
 ; @version $Id$
@@ -57,10 +63,10 @@ FUNCTION SDD::init, file_name
     on_ioerror, bad_open
     error = 1
 
-    ; open the file for reading
-    openr, lun, file_name, /get_lun, /swap_endian ; open the file
+    ; open the file for reading, everything is read as bytes and the
+    ; byte order is worked out from the bootstrap record in read_bs
+    openr, lun, file_name, /get_lun ; open the file
     self.swap_endian = 1
-    ; openr, lun, file_name, /get_lun ; open the file
     error = 0
 
     bad_open:
@@ -91,6 +97,7 @@ PRO SDD::cleanup
     compile_opt idl2, hidden
 
     if ptr_valid(self.index) then ptr_free, self.index
+    if ptr_valid(self.indexcols) then ptr_free, self.indexcols
     self.bs.nindxrec = 0
     if self.lun ge 0 then close, self.lun
     self.lun = -1
@@ -98,7 +105,12 @@ PRO SDD::cleanup
 END
 
 ;+
-; Digest the index record
+; Digest the bootstrap record
+;
+; <p>The bootstrap record is read once as bytes and the byte order is
+; worked out from those bytes.  The original SDD format is big-endian
+; (new or old type), recent 12m data is written in the native byte
+; order.
 ; @private
 ;-
 FUNCTION SDD::read_bs
@@ -108,49 +120,71 @@ FUNCTION SDD::read_bs
 
     point_lun, self.lun, 0L
 
-    bs = self.bs
-    readu, self.lun, bs
-    self.bs = bs
+    hdr = bytarr(32)
+    readu, self.lun, hdr
 
-    ; if bs.version is not 1, then this must be the old type, try again
-    if self.bs.version ne 1 then begin
-        point_lun, self.lun, 0L
-        oldbs = {nindxrec:0s, ndatarec:0s, byteperrec:0s, byteperindx:0s, nindxused:0s, $
-                 counter:0s}
-        readu, self.lun, oldbs
-        self.bs.nindxrec = oldbs.nindxrec
-        self.bs.ndatarec = oldbs.ndatarec
-        self.bs.byteperrec = oldbs.byteperrec
-        self.bs.byteperindx = oldbs.byteperindx
-        self.bs.nindxused = oldbs.nindxused
-        self.bs.counter = oldbs.counter
-        self.bs.type = 1L
-        self.bs.version = 0L
+    ; try the original big-endian type first
+    self.swap_endian = 1
+    vals = swap_endian(long(hdr,0,8))
+
+    ; if bs.version is not 1, then this must be the old type
+    if vals[7] ne 1 then begin
+        ; nindxrec, ndatarec, byteperrec, byteperindx, nindxused, counter
+        oldvals = swap_endian(fix(hdr,0,6))
+        vals = [long(oldvals), 1L, 0L]
     endif
-    
+
     ; final sanity check - we always wrote 512 byte records
-    if self.bs.byteperrec ne 512 then begin
+    if vals[2] ne 512 then begin
         ; one last test, the new 12m writes out data on linux in native endian format, try that.
-        close, self.lun
-        openr, lun, self.file_name, /get_lun ; no swap_endian this time
-        self.lun = lun
         self.swap_endian = 0
-        point_lun, self.lun, 0L
-
-        bs = self.bs
-        readu, self.lun, bs
-        self.bs = bs
-        if self.bs.version ne 1 and self.bs.byteperrec ne 512 then begin
+        vals = long(hdr,0,8)
+        if vals[7] ne 1 and vals[2] ne 512 then begin
             message,'This does not appear to be Unipops SDD data, can not continue',/info
             return, 0
         endif
     endif
 
+    bs = self.bs
+    for i=0,7 do bs.(i) = vals[i]
+    self.bs = bs
+
     return, 1
 END
 
+;+
+; Extract one column of values from a block of fixed length records.
+;
+; @param block {in}{required}{type=bytarr} The records, [reclen,nrec].
+; @param offset {in}{required}{type=long int} The offset in bytes of
+; the value in each record.
+; @param type {in}{required}{type=integer} The IDL type code of the
+; value (2, 3, 4 or 5).
+; @returns array of nrec values
+; @private
+;-
+FUNCTION SDD::GET_COLUMN, block, offset, type
+    compile_opt idl2
+
+    reclen = (size(block,/dimensions))[0]
+    nrec = n_elements(block)/reclen
+    case type of
+        2: nbytes = 2
+        5: nbytes = 8
+        else: nbytes = 4
+    endcase
+    bytes = reform(block[offset:(offset+nbytes-1),*], nbytes*nrec)
+    vals = fix(bytes, 0, nrec, type=type)
+    return, self.swap_endian ? swap_endian(vals) : vals
+END
+
 ;+
 ; Read in the index
+;
+; <p>The whole index block is read in one call and each field is
+; decoded for all of the index records at once.  The index is kept as
+; an array of index records (see getindx) and as a structure of column
+; arrays (see getindexcols).
 ; @private
 ;-
 FUNCTION SDD::read_index
@@ -169,46 +203,69 @@ FUNCTION SDD::read_index
 
     index = replicate(indxrec, nindex)
 
+    block = bytarr(self.bs.byteperindx, nindex)
+    readu, self.lun, block
+
+    ; the common fields, at the same offsets in both types
+    hcoord = self->get_column(block, 8, 4)
+    vcoord = self->get_column(block, 12, 4)
+    source = reform(string(block[16:31,*]), nindex)
+    scan = self->get_column(block, 32, 4)
+    fresol = self->get_column(block, 36, 4)
+    frest = self->get_column(block, 40, 5)
+    lst = self->get_column(block, 48, 4)
+    ut = self->get_column(block, 52, 4)
+    obsmode = self->get_column(block, 56, 2)
+    rphcode = self->get_column(block, 58, 2)
+
     if (self.bs.version eq 1L) then begin
         ; - new type
-        readu, self.lun, index
+        nset = nindex
+        startbyte = self->get_column(block, 0, 3)
+        nbytes = self->get_column(block, 4, 3)
+        poscode = self->get_column(block, 60, 2)
     endif else begin
-        ; - old type
-        oldindxrec = {startbyte:0s, nbytes:0s, magic:0s, poscode:0s, hcoord:0.0, vcoord:0.0, $
-                      source:'                ', scan:0.0, fresol:0.0, frest:0.0D, $
-                      lst:0.0, ut:0.0, obsmode:0s, rphcode:0s, pad:intarr((self.bs.byteperindx-60)/2)}
-        oldindex = replicate(oldindxrec, nindex)
-        readu, self.lun, oldindex
-        ; transfer it one at a time to self.index
-        for i = 0, (self.bs.nindxused-1) do begin
-            thisindx = index[i]
-            oldindx = oldindex[i]
-            thisindx.startbyte = oldindx.startbyte
-            thisindx.nbytes = oldindx.nbytes
-            thisindx.hcoord = oldindx.hcoord
-            thisindx.vcoord = oldindx.vcoord
-            thisindx.source = oldindx.source
-            thisindx.scan = oldindx.scan
-            thisindx.fresol = oldindx.fresol
-            thisindx.frest = oldindx.frest
-            thisindx.lst = oldindx.lst
-            thisindx.ut = oldindx.ut
-            thisindx.obsmode = oldindx.obsmode
-            thisindx.rphcode = oldindx.rphcode
-            thisindx.poscode = oldindx.poscode
-            index[i] = thisindx
-        endfor
+        ; - old type, only the used index records are transferred
+        nset = self.bs.nindxused < nindex
+        startbyte = long(self->get_column(block, 0, 2))
+        nbytes = long(self->get_column(block, 2, 2))
+        poscode = self->get_column(block, 6, 2)
     endelse
 
+    if nset gt 0 then begin
+        last = nset-1
+        index[0:last].startbyte = startbyte[0:last]
+        index[0:last].nbytes = nbytes[0:last]
+        index[0:last].hcoord = hcoord[0:last]
+        index[0:last].vcoord = vcoord[0:last]
+        index[0:last].source = source[0:last]
+        index[0:last].scan = scan[0:last]
+        index[0:last].fresol = fresol[0:last]
+        index[0:last].frest = frest[0:last]
+        index[0:last].lst = lst[0:last]
+        index[0:last].ut = ut[0:last]
+        index[0:last].obsmode = obsmode[0:last]
+        index[0:last].rphcode = rphcode[0:last]
+        index[0:last].poscode = poscode[0:last]
+    endif
+
     ; - calculate true startbyte and nbytes, values are now startrec and
     ;   lastrec
 
-    for i = 0, (self.bs.nindxused-1) do begin
-        index[i].nbytes = (index[i].nbytes - index[i].startbyte + 1) * self.bs.byteperrec
-        index[i].startbyte = (index[i].startbyte - 1L) * self.bs.byteperrec
-    endfor
+    nused = self.bs.nindxused < nindex
+    if nused gt 0 then begin
+        startrec = index[0:(nused-1)].startbyte
+        lastrec = index[0:(nused-1)].nbytes
+        index[0:(nused-1)].nbytes = (lastrec - startrec + 1) * self.bs.byteperrec
+        index[0:(nused-1)].startbyte = (startrec - 1L) * self.bs.byteperrec
+    endif
 
     self.index = ptr_new(index)
+    self.indexcols = ptr_new({startbyte:index.startbyte, nbytes:index.nbytes, $
+                              hcoord:index.hcoord, vcoord:index.vcoord, source:index.source, $
+                              scan:index.scan, fresol:index.fresol, frest:index.frest, $
+                              lst:index.lst, ut:index.ut, obsmode:index.obsmode, $
+                              rphcode:index.rphcode, poscode:index.poscode})
 
     return, 1
 END
@@ -1087,6 +1144,148 @@ FUNCTION SDD::getindx, loc
     return, (*self.index)[loc]
 END
 
+;+
+; Get the index as a structure of column arrays, one element per
+; index record.  The fields are the same as those of the index records
+; returned by getindx (without the padding).  This is much more
+; convenient than looping over getindx for selecting scans.
+;
+; @returns structure of index column arrays
+;
+; @examples
+; <pre>
+; cols = sdd->getindexcols()
+; locs = where(cols.nbytes gt 0 and strtrim(cols.source,2) eq 'ORION')
+; </pre>
+;-
+FUNCTION SDD::getindexcols
+    compile_opt idl2
+
+    if not ptr_valid(self.indexcols) then return, -1
+    return, *self.indexcols
+END
+
+;+
+; Get the data values for many index locations as one 2-D array.
+;
+; <p>The scans are read in as few reads as possible: scans that are
+; next to each other in the file are read in one call.  Only the
+; preamble and the two header values needed to locate the data
+; (class 1 headlen and class 12 noint) are decoded.  Use getdc or
+; get_uniscan for the full header of any scan.
+;
+; <p>Each column of the result holds the data for one location, in the
+; order given by locs.  Columns for scans with fewer channels than the
+; longest are padded with NaN.
+;
+; @param locs {in}{optional}{type=long integer array} The index
+; locations to fetch.  Defaults to all used index locations.
+; @keyword count {out}{optional}{type=integer} The number of columns
+; returned.  0 on failure.
+; @keyword nchan {out}{optional}{type=long integer array} The number of
+; channels in each column.
+; @returns float array [max(nchan),count] or -1 on failure.
+;
+; @examples
+; <pre>
+; sdd = obj_new('sdd','sdd_hc.wbl_001')
+; data = sdd->getdata2d(count=count,nchan=nchan)
+; </pre>
+;-
+FUNCTION SDD::getdata2d, locs, count=count, nchan=nchan
+    compile_opt idl2
+
+    count = 0
+    if self.lun lt 0 or not ptr_valid(self.index) then begin
+        message,'No file has been opened yet',/info
+        return, -1
+    endif
+
+    nused = self->nscans() < n_elements(*self.index)
+    if n_elements(locs) eq 0 then begin
+        if nused le 0 then begin
+            message,'There are no scans in this file',/info
+            return, -1
+        endif
+        thisLocs = where((*self.index)[0:(nused-1)].nbytes gt 0 and $
+                         (*self.index)[0:(nused-1)].startbyte gt 0, nlocs)
+        if nlocs eq 0 then begin
+            message,'All of the index locations are unused',/info
+            return, -1
+        endif
+    endif else begin
+        thisLocs = long(locs)
+        nlocs = n_elements(thisLocs)
+        if min(thisLocs) lt 0 or max(thisLocs) ge n_elements(*self.index) then begin
+            message,'LOCS must be >= 0 and less than the number of index locations',/info
+            return, -1
+        endif
+    endelse
+
+    startbyte = (*self.index)[thisLocs].startbyte
+    nbytes = (*self.index)[thisLocs].nbytes
+    unused = where(startbyte eq 0 or nbytes le 0, nunused)
+    if nunused gt 0 then begin
+        message,'Some of the index locations are unused',/info
+        return, -1
+    endif
+
+    ; runs of scans that are contiguous in the file
+    order = sort(startbyte)
+    sb = startbyte[order]
+    nb = nbytes[order]
+    if nlocs gt 1 then begin
+        breaks = where(sb[1:*] ne (sb[0:(nlocs-2)] + nb[0:(nlocs-2)]), nbreaks)
+        runEnds = (nbreaks gt 0) ? [breaks, nlocs-1] : [nlocs-1]
+    endif else begin
+        runEnds = [0L]
+    endelse
+    nruns = n_elements(runEnds)
+    runStarts = (nruns gt 1) ? [0L, runEnds[0:(nruns-2)]+1] : [0L]
+
+    spectra = ptrarr(nlocs)
+    nchan = lonarr(nlocs)
+    for r=0L,(nruns-1) do begin
+        first = runStarts[r]
+        last = runEnds[r]
+        runBytes = sb[last] + nb[last] - sb[first]
+        block = bytarr(runBytes)
+        point_lun, self.lun, sb[first]
+        readu, self.lun, block
+        for k=first,last do begin
+            i = order[k]
+            hdu = block[(sb[k]-sb[first]):(sb[k]-sb[first]+nb[k]-1)]
+            preamble = self->get_preamble(hdu)
+            if ((preamble[0] gt 15) or (preamble[0] lt 13)) then begin
+                message, 'Invalid number of classes in preamble at location '+ $
+                         strtrim(thisLocs[i],2)+', skipping',/info
+                continue
+            endif
+            preamble[1:15] = (preamble[1:15]-1L)*8L
+            loc = preamble[1]
+            headlen = self->get_double(hdu, loc)
+            ; noint is the 15th value in class 12
+            loc = preamble[12] + 14L*8L
+            if loc ge preamble[13] then continue
+            noint = self->get_double(hdu, loc)
+            nchan[i] = fix(noint+0.001)
+            if nchan[i] gt 0 then spectra[i] = ptr_new(self->get_data(hdu, headlen, noint))
+        endfor
+    endfor
+
+    maxchan = max(nchan) > 1
+    result = make_array(maxchan, nlocs, /float, value=!values.f_nan)
+    for i=0L,(nlocs-1) do begin
+        if ptr_valid(spectra[i]) then begin
+            result[0:(nchan[i]-1),i] = *spectra[i]
+            ptr_free, spectra[i]
+        endif
+    endfor
+
+    count = nlocs
+    return, result
+END
+
 ;+
 ; Convert a unipops SDD structure to a spectrum data container.
 ;
@@ -1307,7 +1506,8 @@ PRO sdd__define
          lun:0L, $   ; currently opened LUN
          swap_endian:1L, $  ; default is to swap_endian
          bs:{bsrec,nindxrec:0L, ndatarec:0L, byteperrec:0L, byteperindx:0L, nindxused:0L, counter:0L, type:0L, version:0L}, $
-         index:ptr_new() $ ; ptr to array of index records
+         index:ptr_new(), $ ; ptr to array of index records
+         indexcols:ptr_new() $ ; ptr to structure of index column arrays
          }
     
 END
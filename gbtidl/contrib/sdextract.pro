@@ -21,6 +21,17 @@
 ; dcextract.  If that routine returns -1 at any time, this routine
 ; exits and any already processed data is written to sdfout.
 ;
+; <p>When raw is set, the selected rows are copied from sdfin to
+; sdfout without being read into data containers.  The selection is
+; resolved against the index of sdfin and the matching rows are copied
+; byte for byte in large contiguous blocks using
+; <a href="../../user/toolbox/sdfits_copy_rows.html">sdfits_copy_rows</a>.
+; All of the columns are kept exactly as they are in sdfin.  This is
+; much faster for large files, but it can only be used to select
+; rows: startat, endat and boxwidth can not be used with raw.  No
+; index file is written for sdfout, GBTIDL creates it the first time
+; that file is opened.
+;
 ; <p><B>Contributed By: Bob Garwood, NRAO-CV</B>
 ;
 ; @param sdfin {in}{required}{type=string} The intput FITS file.  This
@@ -43,12 +54,16 @@
 ; @keyword clobber {in}{optional}{type=boolean} When set, if sdfout
 ; exists, it will first be deleted (including any associated index
 ; file).
+; @keyword raw {in}{optional}{type=boolean} When set, copy the selected
+; rows without decoding them.  Can not be combined with startat, endat
+; or boxwidth.
 ;
 ; @uses <a href="../../user/toolbox/dcboxcar.html">dcboxcar</a>
 ; @uses <a href="../../user/toolbox/dcextract.html">dcextract</a>
+; @uses <a href="../../user/toolbox/sdfits_copy_rows.html">sdfits_copy_rows</a>
 ;-
 pro sdextract, sdfin, sdfout, startat=startat, endat=endat, $
-               boxwidth=boxwidth, clobber=clobber, $
+               boxwidth=boxwidth, clobber=clobber, raw=raw, $
                _EXTRA=ex
   compile_opt idl2
 
@@ -73,6 +88,14 @@ pro sdextract, sdfin, sdfout, startat=startat, endat=endat, $
      return
   endif
 
+  ; raw only copies rows
+  if keyword_set(raw) then begin
+     if n_elements(startat) gt 0 or n_elements(endat) gt 0 or keyword_set(boxwidth) then begin
+        message,'startat, endat and boxwidth can not be used with raw',/info
+        return
+     endif
+  endif
+
   ; sdfout must end in .fits
   if strmid(sdfout,4,/reverse_offset) ne ".fits" then begin
      message,"output file name must end in .fits",/info
@@ -130,21 +153,29 @@ pro sdextract, sdfin, sdfout, startat=startat, endat=endat, $
      return
   endif
 
-  ; no canned routine like sdfitsin to do this
-  iosdfout = obj_new('io_sdfits_writer')
-  iosdfout->set_index_file_name, sdfout_index
-  iosdfout->set_output_file, sdfout
-
   ; do the data selection
-  indx = select_data(iosdfin,_EXTRA=ex)
-  nrec = n_elements(indx)
+  indx = select_data(iosdfin,count=nrec,_EXTRA=ex)
 
-  if nrec eq 0 then begin
+  if nrec le 0 then begin
      message,'No data was selected.  Nothing to extract or copy.',/info
      obj_destroy, iosdfin
-     obj_destroy, iosdfout
      return
   endif
+
+  if keyword_set(raw) then begin
+     ; copy the selected rows as they are
+     exts = iosdfin->get_index_values('EXTENSION',index=indx)
+     rows = iosdfin->get_index_values('ROW',index=indx)
+     obj_destroy, iosdfin
+     ok = sdfits_copy_rows(sdfin, sdfout, exts, rows, count=ncopied)
+     if ok then print,ncopied,format="('Copied ',i0,' rows')"
+     return
+  endif
+
+  ; no canned routine like sdfitsin to do this
+  iosdfout = obj_new('io_sdfits_writer')
+  iosdfout->set_index_file_name, sdfout_index
+  iosdfout->set_output_file, sdfout
   
   ; some tuning of this might be wise
   nchunk = 50
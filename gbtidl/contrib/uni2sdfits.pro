@@ -3,10 +3,27 @@
 ; that can be consumed by GBTIDL.
 ;
 ; <p> This uses an sdd object to do the conversion, one scan at a
-; time.  The converted scan is then copied into the PDC and 
+; time.  The converted scan is then copied into the PDC and
 ; <a href="../../user/guide/keep.html">keep</a> is used
 ; to save that scan to the output file.
 ;
+; <p> When /stream is set, the converted scans do not go through the
+; PDC or the current output file.  They are collected in batches of
+; batchsize scans and each batch is written to sdfitsfile with one
+; write using a separate output object.  None of the GBTIDL state
+; (!g) is changed.  Use /resume to skip scans that are already in
+; sdfitsfile (same scan number and procseqn), e.g. after an earlier
+; conversion was interrupted.
+;
+; <p> Several files can be converted in one call by giving arrays of
+; input and output file names.  With nworkers greater than 1 the files
+; are converted concurrently in that many worker IDL processes
+; (IDL_IDLBridge objects), one file at a time per worker, using
+; /stream.  Each worker must be able to find the GBTIDL procedures and
+; this file, use the startup keyword to give the IDL command that sets
+; that up (e.g. "@/path/to/gbtidl_startup").  The number of rows
+; written and the rate (rows/s) are printed at the end.
+;
 ; <p> This also converts recent data from the 12m which uses the
 ; unipops SDD format except that the byte ordering is reversed.
 ;
@@ -15,11 +32,30 @@
 ; <p><B>Contributed By: Bob Garwood, NRAO-CV<g/B>
 ;
 ; @param unifile {in}{required}{type=string} The name of the unipops
-; SDD file to be converted.
+; SDD file to be converted.  May be an array of file names.
 ;
 ; @param sdfitsfile {in}{required}{type=string} The name of the output
 ; SDFITS file to hold the converted values.  Note that this simply
-; appends to the end of sdfitsfile if sdfitsfile already exists.
+; appends to the end of sdfitsfile if sdfitsfile already exists.  Must
+; have the same number of elements as unifile.
+;
+; @keyword stream {in}{optional}{type=boolean} When set, write the
+; scans in batches directly to sdfitsfile without using the PDC or
+; the current output file.  This is always used when more than one
+; file is given.
+; @keyword batchsize {in}{optional}{type=integer}{default=500} The
+; number of scans written at once when /stream is set.
+; @keyword resume {in}{optional}{type=boolean} When set, scans that
+; are already in sdfitsfile are skipped (only with /stream).
+; @keyword nworkers {in}{optional}{type=integer}{default=1} The number
+; of files to convert concurrently.
+; @keyword startup {in}{optional}{type=string} An IDL command executed
+; by each worker before anything else when nworkers is more than 1.
+; @keyword quiet {in}{optional}{type=boolean} When set, only the
+; final summary is printed (nothing at all for /stream on a single
+; file).
+; @keyword nrows {out}{optional}{type=long integer} The number of rows
+; written to each output file.
 ;
 ; @examples
 ; <pre>
@@ -27,6 +63,14 @@
 ; .com uni2sdfits
 ; uni2sdfits,'sdd_hc.wbl_001','sdd_hc.wbl_001.fits'
 ; </pre>
+; <p>
+; Convert a whole archive, 4 files at a time, picking up where an
+; earlier run stopped.
+; <pre>
+; files = file_search('/archive/sdd*')
+; uni2sdfits, files, files+'.fits', nworkers=4, /resume, $
+;     startup='@/users/me/gbtidl_startup.pro'
+; </pre>
 ;
 ; @uses <a href="../../user/toolbox/data_free.html">data_free</a>
 ; @uses <a href="../../user/guide/fileout.html">fileout</a>
@@ -38,9 +82,169 @@
 ;
 ; @version $Id$
 ;-
-pro uni2sdfits, unifile, sdfitsfile
+pro uni2sdfits, unifile, sdfitsfile, stream=stream, batchsize=batchsize, resume=resume, $
+                nworkers=nworkers, startup=startup, quiet=quiet, nrows=nrows
     compile_opt idl2
 
+    nfiles = n_elements(unifile)
+    if nfiles eq 0 or n_elements(sdfitsfile) ne nfiles then begin
+        message,'unifile and sdfitsfile must have the same number of file names',/info
+        return
+    endif
+    nrows = lonarr(nfiles)
+
+    nw = (n_elements(nworkers) gt 0) ? (long(nworkers[0]) < nfiles) > 1 : 1L
+
+    if nw gt 1 then begin
+        if n_elements(uniq(sdfitsfile,sort(sdfitsfile))) ne nfiles then begin
+            message,'Each input file needs its own output file when converting concurrently',/info
+            return
+        endif
+
+        tstart = systime(/seconds)
+        cmds = "u2s_nrows=0L & uni2sdfits,'" + unifile + "','" + sdfitsfile + $
+               "',/stream,/quiet,nrows=u2s_nrows"
+        if n_elements(batchsize) gt 0 then cmds += ',batchsize=' + strtrim(long(batchsize[0]),2)
+        if keyword_set(resume) then cmds += ',/resume'
+
+        bridges = objarr(nw)
+        catch, error_status
+        if error_status ne 0 then begin
+            catch, /cancel
+            message,'Unable to start the workers: ' + !error_state.msg,/info
+            obj_destroy, bridges
+            return
+        endif
+        for i=0,(nw-1) do begin
+            bridges[i] = obj_new('IDL_IDLBridge')
+            if n_elements(startup) gt 0 then bridges[i]->execute, startup[0]
+        endfor
+        catch, /cancel
+
+        workerFile = lonarr(nw) - 1
+        nextFile = 0L
+        ndone = 0L
+        while ndone lt nfiles do begin
+            for i=0,(nw-1) do begin
+                workerStatus = bridges[i]->status(error=errMsg)
+                if workerStatus eq 1 then continue
+                f = workerFile[i]
+                if f ge 0 then begin
+                    if workerStatus eq 2 then begin
+                        nrows[f] = bridges[i]->getvar('u2s_nrows')
+                    endif else begin
+                        message,'Converting ' + unifile[f] + ' failed: ' + errMsg,/info
+                    endelse
+                    if not keyword_set(quiet) then $
+                        print, unifile[f], sdfitsfile[f], nrows[f], format='(a," -> ",a," : ",i0," rows")'
+                    workerFile[i] = -1
+                    ndone += 1
+                endif
+                if nextFile lt nfiles then begin
+                    bridges[i]->execute, cmds[nextFile], /nowait
+                    workerFile[i] = nextFile
+                    nextFile += 1
+                endif
+            endfor
+            if ndone lt nfiles then wait, 0.05
+        endwhile
+        obj_destroy, bridges
+
+        elapsed = systime(/seconds) - tstart
+        print, total(nrows,/integer), nfiles, nw, elapsed, total(nrows)/(elapsed > 1d-9), $
+               format='("Wrote ",i0," rows from ",i0," files with ",i0," workers in ",f0.1," s (",f0.1," rows/s)")'
+        return
+    endif
+
+    if keyword_set(stream) or nfiles gt 1 then begin
+        nbatch = (n_elements(batchsize) gt 0) ? long(batchsize[0]) > 1 : 500L
+        tstart = systime(/seconds)
+        for f=0L,(nfiles-1) do begin
+            uniIn = obj_new('sdd',unifile[f])
+            if not obj_valid(uniIn) then begin
+                message,'Could not open ' + unifile[f] + ', skipping',/info
+                continue
+            endif
+            if uniIn->nscans() le 0 then begin
+                message,unifile[f] + ' appears to have no scans in it, skipping',/info
+                obj_destroy, uniIn
+                continue
+            endif
+
+            ; a separate output object, as fileout sets up !g.lineoutio
+            out = obj_new('io_sdfits_writer')
+            doneKeys = -1L
+            if out->file_exists(sdfitsfile[f]) eq 1 then begin
+                out->set_file, sdfitsfile[f]
+                if keyword_set(resume) && out->get_num_index_rows() gt 0 then begin
+                    doneKeys = long(out->get_index_values('SCAN'))*100L + $
+                               long(out->get_index_values('PROCSEQN'))
+                endif
+            endif else begin
+                if (strpos(sdfitsfile[f],'/') ne -1) then begin
+                    out->set_file_path, file_dirname(sdfitsfile[f])
+                    file_base = file_basename(sdfitsfile[f])
+                endif else begin
+                    file_base = sdfitsfile[f]
+                endelse
+                parts=strsplit(file_base,'.',/extract)
+                index_file = strjoin(parts[0:n_elements(parts)-2],'.') + '.index'
+                out->set_index_file_name, index_file
+                out->set_output_file, file_base
+            endelse
+
+            ; the scan number and procseqn of each scan, as in sdd_to_dc
+            cols = uniIn->getindexcols()
+            iscans = fix(cols.scan)
+            keys = long(iscans)*100L + round((cols.scan - iscans)*100.0)
+            isDone = bytarr(n_elements(keys))
+            if doneKeys[0] ge 0 then begin
+                doneKeys = doneKeys[sort(doneKeys)]
+                isDone = doneKeys[value_locate(doneKeys, keys) > 0] eq keys
+            endif
+
+            nskipped = 0L
+            nbuf = 0L
+            for i=0L,(uniIn->nscans()-1) do begin
+                if not uniIn->indexUsed(i) then continue
+                if isDone[i] then begin
+                    nskipped += 1
+                    continue
+                endif
+                dc = uniIn->getdc(i)
+                if data_valid(dc) le 0 then continue
+                buf = (nbuf eq 0) ? [dc] : [buf, dc]
+                nbuf += 1
+                if nbuf ge nbatch then begin
+                    out->write_spectra, buf
+                    data_free, buf
+                    nrows[f] += nbuf
+                    nbuf = 0L
+                endif
+            endfor
+            if nbuf gt 0 then begin
+                out->write_spectra, buf
+                data_free, buf
+                nrows[f] += nbuf
+            endif
+
+            obj_destroy, out
+            obj_destroy, uniIn
+
+            if not keyword_set(quiet) then begin
+                print, unifile[f], sdfitsfile[f], nrows[f], format='(a," -> ",a," : ",i0," rows")'
+                if nskipped gt 0 then print, nskipped, format='("   skipped ",i0," scans already converted")'
+            endif
+        endfor
+
+        elapsed = systime(/seconds) - tstart
+        if not keyword_set(quiet) or nfiles gt 1 then begin
+            print, total(nrows,/integer), nfiles, elapsed, total(nrows)/(elapsed > 1d-9), $
+                   format='("Wrote ",i0," rows from ",i0," files in ",f0.1," s (",f0.1," rows/s)")'
+        endif
+        return
+    endif
+
     ; remember current output file for restoration later
     curFileOut = !g.line_fileout_name
     fileout,sdfitsfile
@@ -63,11 +267,12 @@ pro uni2sdfits, unifile, sdfitsfile
             if data_valid(dc) gt 0 then begin
                 set_data_container, dc
                 keep
+                nrows += 1
                 print,string(i,dc.scan_number,dc.procseqn,format='(i5," : scan ", i5, ".", i2.2," converted")')
                 data_free, dc
             endif else begin
                 print,' ... skipping'
-            endelse                
+            endelse
         endif else begin
             print,'Index ', i,' is empty.'
         endelse
@@ -79,6 +79,7 @@ pro avgstack,noclear=noclear,useflag=useflag,skipflag=skipflag,keep=keep
        catch,/cancel ; may not be necessary
     endif
     if keyword_set(keep) then begin
+       keep_buffer_flush
        nchCol = !g.lineoutio->get_index_values("NUMCHN")
     endif else begin
        nchCol = !g.lineio->get_index_values("NUMCHN")
@@ -0,0 +1,176 @@
+; docformat='rst'
+
+;+
+; Fit and subtract a polynomial baseline from each of the records
+; listed in the stack and save the results to the output file.
+;
+; This is the equivalent of using :idl:pro:`getrec`,
+; :idl:pro:`baseline` and :idl:pro:`keep` on each record in the stack
+; in turn, but it is much faster for large stacks.  The data are
+; retrieved in chunks using :idl:pro:`getchunk` and each chunk is fit
+; at once using :idl:pro:`dcbaselinestack`: the orthogonal polynomials
+; for the baseline regions (!g.regions and !g.nregion) and order are
+; constructed once (and cached for later use) and every record with no
+; blanked channels in the regions is fit using the same polynomials
+; with a single matrix product.
+;
+; The rms of each fit for each order up to nfit (the same values that
+; :idl:pro:`bshape` puts in !g.polyfitrms) is returned in the polyrms
+; keyword.  On return, !g.polyfit and !g.polyfitrms hold the fit to
+; the last record in the stack that could be fit.  Records with no
+; unblanked data in the regions are not saved.  Their polyrms values
+; are NaN.  The records are saved in stack order.  A chunk of records
+; that can not be fit together (e.g. records with different numbers
+; of channels) is reported and not saved.  Nothing is fit if the
+; stack contains the same index number more than once.
+;
+; See the documentation in getchunk for a longer discussion on the
+; useflag and skipflag keywords also found here.
+;
+; :Keywords:
+;   nfit : in, optional, type=integer
+;       The order of polynomial to fit. Defaults to ``!g.nfit``. If set,
+;       then this also sets the value of ``!g.nfit``.
+;
+;   polyrms : out, optional, type=2D double array
+;       The rms of the fit for each order for each record in the
+;       stack, [nfit+1,!g.acount].
+;
+;   useflag : in, optional, type=boolean or string, default=true
+;       Apply all or just some of the flag rules?
+;
+;   skipflag : in, optional, type=boolean or string
+;       Do not apply any or do not apply a few of the flag rules?
+;
+;   keep : in, optional, type=boolean
+;       If this is set, the records are fetched from the keep file.
+;
+;   ok : out, optional, type=boolean
+;       This is set to 1 on success and 0 on failure.
+;
+; :Examples:
+;
+;   Remove a 3rd order baseline from every integration of scans 30
+;   through 40 and look at the rms of each fit.
+;
+;   .. code-block:: IDL
+;
+;       getps, 30
+;       setregion           ; set the baseline regions
+;       emptystack
+;       addstack, 100, 999  ; the index numbers of those integrations
+;       fileout, 'baselined.fits'
+;       baselinestack, nfit=3, polyrms=rms
+;       plot, rms[3,*]
+;
+; :Uses:
+;   :idl:pro:`dcbaselinestack`
+;   :idl:pro:`getchunk`
+;   :idl:pro:`putchunk`
+;
+;-
+pro baselinestack,nfit=nfit,polyrms=polyrms,useflag=useflag,skipflag=skipflag,keep=keep,ok=ok
+    compile_opt idl2
+
+    ok = 0
+    if not !g.line then begin
+       message,'baselinestack only works on spectral line data',/info
+       return
+    endif
+    if !g.acount le 0 then begin
+       message,'The stack is empty, nothing to fit.',/info
+       return
+    endif
+
+    if (n_elements(nfit) eq 0) then nfit = !g.nfit
+    if (nfit lt 0) then begin
+       message, 'nfit must be >= 0', /info
+       return
+    endif
+    if ((nfit+1) gt n_elements(!g.polyfitrms)) then begin
+       message, 'nfit is too large', /info
+       return
+    endif
+    !g.nfit = nfit
+
+    if !g.nregion le 0 then begin
+       message,'No baseline regions have been set, use setregion or nregion first',/info
+       return
+    endif
+
+    stack = (*!g.astack)[0:(!g.acount-1)]
+    ; check the whole stack before anything is written to the output file
+    if n_elements(uniq(stack, sort(stack))) ne !g.acount then begin
+       message,'The stack contains the same index number more than once, nothing was fit',/info
+       return
+    endif
+
+    ; same chunk size as avgstack, 1000 rows of 4K spectra
+    chunkSize = 1000*4096
+    if keyword_set(keep) then begin
+       keep_buffer_flush
+       nchCol = !g.lineoutio->get_index_values("NUMCHN")
+    endif else begin
+       nchCol = !g.lineio->get_index_values("NUMCHN")
+    endelse
+    if min(stack) lt 0 or max(stack) ge n_elements(nchCol) then begin
+       message,'The stack contains index numbers that are not in the file, nothing was fit',/info
+       return
+    endif
+    nch = max(nchCol[stack])
+    nPerChunk = round(chunkSize/nch) > 1
+    nChunk = (!g.acount + nPerChunk - 1) / nPerChunk
+
+    polyrms = make_array(nfit+1, !g.acount, /double, value=!values.d_nan)
+    lastFit = -1
+    for c=0,(nChunk-1) do begin
+       first = c*nPerChunk
+       last = (first+nPerChunk-1) < (!g.acount-1)
+       indices = stack[first:last]
+       chunk = getchunk(count=count,index=indices,keep=keep,useflag=useflag,skipflag=skipflag,$
+                        indicies=chunkIndicies)
+       if count ne (last-first+1) then begin
+          message,'Problems getting data, check arguments or try re-populating the stack',/info
+          if count gt 0 then data_free, chunk
+          return
+       endif
+       ; the chunk is in index order, find the stack position of each record
+       s = sort(indices)
+       pos = s[value_locate(indices[s], chunkIndicies) > 0]
+       if total(indices[pos] ne chunkIndicies) ne 0 then begin
+          message,'Problems getting data, check arguments or try re-populating the stack',/info
+          data_free, chunk
+          return
+       endif
+       chunkOK = dcbaselinestack(chunk, nfit, !g.regions, !g.nregion, polyfit, chunkRms, $
+                                 /subtract, fitok=fitok)
+       if chunkOK then begin
+          polyrms[*,first+pos] = chunkRms
+          ; save in stack order
+          good = where(fitok)
+          good = good[sort(pos[good])]
+          putchunk, chunk[good]
+          lastGood = good[n_elements(good)-1]
+          lastPolyfit = polyfit[*,*,lastGood]
+          lastFit = first + pos[lastGood]
+       endif else begin
+          message,'Stack entries '+strtrim(first,2)+' to '+strtrim(last,2)+$
+                  ' could not be fit and were not saved',/info
+       endelse
+       data_free, chunk
+    endfor
+
+    if lastFit lt 0 then begin
+       message,'None of the records in the stack could be fit',/info
+       return
+    endif
+    nskipped = long(total(finite(polyrms[0,*]) eq 0))
+    if nskipped gt 0 then begin
+       message,'Skipped '+strtrim(nskipped,2)+' records with no unblanked data in the regions',/info
+    endif
+
+    !g.polyfit[*,0:nfit] = lastPolyfit
+    !g.polyfitrms[0:nfit] = polyrms[*,lastFit]
+
+    ok = 1
+end
@@ -0,0 +1,287 @@
+; docformat = 'rst'
+
+;+
+; Calibrate many scans in parallel and save the results to the output
+; file.
+;
+; Each entry in the manifest describes one calibration: the calibration
+; procedure to use (one of :idl:pro:`getps`, :idl:pro:`getfs`,
+; :idl:pro:`getnod` or :idl:pro:`getbs`), the scan number and the ifnum,
+; plnum and fdnum to use.  The calibrations are spread over a pool of
+; worker IDL processes (IDL_IDLBridge objects) running on this host.
+; Each worker has its own GBTIDL state (its own !g), opens the current
+; input file (or directory) and keeps its results in its own
+; temporary output file.  Work is handed out one manifest entry at a
+; time to whichever worker is idle, so workers that get quick scans do
+; more of them.
+;
+; When all of the manifest entries have been done, the kept results
+; are copied from the worker files to the current output file (see
+; :idl:pro:`fileout`) in manifest order.  The result is therefore the
+; same as doing each calibration in turn followed by :idl:pro:`keep`
+; regardless of the number of workers or how the work was divided
+; between them.  Entries that fail (status not 1) are not kept.  The
+; number of calibrations, failures and spectra kept by each worker and
+; its throughput are printed at the end (unless /quiet is set) and are
+; also available through the stats keyword.
+;
+; Each worker is a new IDL process and it must be able to find the
+; GBTIDL procedures and set up !g before it can do anything.  Use the
+; startup keyword to give the IDL command (e.g. a batch file, as in
+; "@/path/to/gbtidl_startup") that does that for your installation.
+; The workers have none of the state of this session other than the
+; input file, so set any other options in the options keyword.
+;
+; For fdnum, getnod and getbs use the trackfdnum keyword.
+;
+; :Params:
+;   manifest : in, required, type=structure array
+;       One element per calibration with these fields.  Only proc and
+;       scan are required, the others default to 0.
+;
+;       * proc : the calibration procedure name ('getps', 'getfs', 'getnod' or 'getbs')
+;       * scan : the scan number
+;       * ifnum : the IF number
+;       * plnum : the polarization number
+;       * fdnum : the feed number (trackfdnum for getnod and getbs)
+;
+; :Keywords:
+;   nworkers : in, optional, type=integer
+;       The number of worker processes.  Defaults to the number of
+;       CPUs on this host, but not more than the number of entries in
+;       the manifest.
+;   options : in, optional, type=string
+;       Additional keywords to use in every calibration, as they would
+;       be typed at the command line (e.g. "units='Jy',tau=0.01").
+;   startup : in, optional, type=string
+;       An IDL command executed by each worker before anything else.
+;       This should set up GBTIDL in that worker.
+;   workdir : in, optional, type=string
+;       The directory for the temporary worker files.  Defaults to the
+;       IDL temporary directory.
+;   keepwork : in, optional, type=boolean
+;       When set, the temporary worker files (output files and logs)
+;       are not deleted.  Useful to debug problems in a worker.
+;   quiet : in, optional, type=boolean
+;       When set, the progress and throughput messages are suppressed.
+;   status : out, optional, type=integer
+;       The status value of each manifest entry as returned by the
+;       calibration procedure.  1 is success.  -1 also indicates that
+;       the calibration stopped with an error.
+;   stats : out, optional, type=structure array
+;       One element per worker with fields worker, ntasks, nfailed,
+;       nspectra, busy (seconds) and rate (calibrations per second
+;       while busy).
+;
+; :Examples:
+;
+;   .. code-block:: IDL
+;
+;       filein,'TGBT_001.raw.vegas'
+;       fileout,'reduced.fits'
+;       m = replicate({proc:'getps',scan:0L,ifnum:0,plnum:0,fdnum:0},8)
+;       m.scan = [51,51,53,53,55,55,57,57]
+;       m.plnum = [0,1,0,1,0,1,0,1]
+;       batchreduce, m, nworkers=4, options="units='Ta*'", $
+;           startup='@/users/me/gbtidl_startup.pro', status=status
+;
+; :Uses:
+;   :idl:pro:`data_free`
+;
+;-
+pro batchreduce, manifest, nworkers=nworkers, options=options, startup=startup, $
+                 workdir=workdir, keepwork=keepwork, quiet=quiet, status=status, $
+                 stats=stats
+    compile_opt idl2
+
+    status = -1
+
+    if n_params() eq 0 then begin
+        usage,'batchreduce'
+        return
+    endif
+
+    if not !g.line then begin
+        message,'batchreduce is only available for spectral line data',/info
+        return
+    endif
+
+    if size(manifest,/type) ne 8 then begin
+        message,'manifest must be an array of structures',/info
+        return
+    endif
+
+    if not obj_valid(!g.lineio) || not !g.lineio->is_data_loaded() then begin
+        message,'No line data is attached yet, use filein or dirin first',/info
+        return
+    endif
+
+    if not obj_valid(!g.lineoutio) then begin
+        message,'No output file is open, use fileout first',/info
+        return
+    endif
+
+    tags = tag_names(manifest)
+    if total(tags eq 'PROC') eq 0 or total(tags eq 'SCAN') eq 0 then begin
+        message,'manifest must have proc and scan fields',/info
+        return
+    endif
+
+    ntasks = n_elements(manifest)
+    procs = strlowcase(strtrim(manifest.proc,2))
+    okProcs = ['getps','getfs','getnod','getbs']
+    for i=0,(ntasks-1) do begin
+        if total(okProcs eq procs[i]) eq 0 then begin
+            message,'Unrecognized calibration procedure in manifest: ' + procs[i],/info
+            return
+        endif
+    endfor
+
+    ifnums = lonarr(ntasks)
+    plnums = lonarr(ntasks)
+    fdnums = lonarr(ntasks)
+    w = where(tags eq 'IFNUM', ntag) & if ntag gt 0 then ifnums[*] = manifest.ifnum
+    w = where(tags eq 'PLNUM', ntag) & if ntag gt 0 then plnums[*] = manifest.plnum
+    w = where(tags eq 'FDNUM', ntag) & if ntag gt 0 then fdnums[*] = manifest.fdnum
+
+    ; the command each worker executes for each manifest entry
+    fdKeys = replicate(',fdnum=',ntasks)
+    w = where(procs eq 'getnod' or procs eq 'getbs', nsel)
+    if nsel gt 0 then fdKeys[w] = ',trackfdnum='
+    extra = (n_elements(options) gt 0) ? ',' + strtrim(options[0],2) : ''
+    cmds = 'batch_status=-1 & ' + procs + ',' + strtrim(long(manifest.scan),2) + $
+           ',ifnum=' + strtrim(ifnums,2) + ',plnum=' + strtrim(plnums,2) + $
+           fdKeys + strtrim(fdnums,2) + extra + $
+           ',/quiet,status=batch_status & if batch_status eq 1 then keep'
+
+    nw = (n_elements(nworkers) gt 0) ? long(nworkers[0]) : !cpu.hw_ncpu
+    nw = (nw < ntasks) > 1
+
+    thisWorkdir = (n_elements(workdir) gt 0) ? workdir[0] : getenv('IDL_TMPDIR')
+    if strlen(thisWorkdir) eq 0 then thisWorkdir = filepath('',/tmp)
+    prefix = filepath('batchreduce_' + strtrim(ulong64(systime(/seconds)*1000),2) + '_w', $
+                      root_dir=thisWorkdir)
+    workFiles = prefix + strtrim(lindgen(nw),2) + '.fits'
+    workLogs = prefix + strtrim(lindgen(nw),2) + '.log'
+
+    inName = !g.line_filein_name
+    inCmd = file_test(inName,/directory) ? 'dirin,' : 'filein,'
+    inCmd += "'" + inName + "'"
+
+    ; start the workers, the input and output files are opened in
+    ; all of the workers at the same time
+    tstart = systime(/seconds)
+    bridges = objarr(nw)
+    catch, error_status
+    if error_status ne 0 then begin
+        catch, /cancel
+        message,'Unable to start the workers: ' + !error_state.msg,/info
+        obj_destroy, bridges
+        return
+    endif
+    for i=0,(nw-1) do begin
+        bridges[i] = obj_new('IDL_IDLBridge', output=workLogs[i])
+        if n_elements(startup) gt 0 then bridges[i]->execute, startup[0]
+        bridges[i]->execute, inCmd + " & fileout,'" + workFiles[i] + "',/new", /nowait
+    endfor
+    catch, /cancel
+    for i=0,(nw-1) do begin
+        while bridges[i]->status() eq 1 do wait, 0.05
+        if bridges[i]->status(error=errMsg) gt 2 then begin
+            message,'Worker ' + strtrim(i,2) + ' could not open the files: ' + errMsg,/info
+            obj_destroy, bridges
+            return
+        endif
+    endfor
+
+    status = lonarr(ntasks) - 1
+    taskWorker = lonarr(ntasks) - 1
+    taskFirst = lonarr(ntasks)
+    taskCount = lonarr(ntasks)
+    workerTask = lonarr(nw) - 1
+    workerStart = dblarr(nw)
+    workerRows = lonarr(nw)
+    stats = replicate({worker:0L, ntasks:0L, nfailed:0L, nspectra:0L, busy:0.0d, rate:0.0d}, nw)
+    stats.worker = lindgen(nw)
+
+    nextTask = 0L
+    ndone = 0L
+    while ndone lt ntasks do begin
+        for i=0,(nw-1) do begin
+            workerStatus = bridges[i]->status()
+            if workerStatus eq 1 then continue
+
+            t = workerTask[i]
+            if t ge 0 then begin
+                ; this worker has finished manifest entry t
+                stats[i].busy += systime(/seconds) - workerStart[i]
+                status[t] = (workerStatus eq 2) ? bridges[i]->getvar('batch_status') : -1
+                bridges[i]->execute, 'batch_nrows = !g.lineoutio->is_data_loaded() ? ' + $
+                                     '!g.lineoutio->get_num_index_rows() : 0L'
+                nrows = bridges[i]->getvar('batch_nrows')
+                taskWorker[t] = i
+                taskFirst[t] = workerRows[i]
+                taskCount[t] = nrows - workerRows[i]
+                workerRows[i] = nrows
+                stats[i].ntasks += 1
+                if status[t] ne 1 then stats[i].nfailed += 1
+                ndone += 1
+                if not keyword_set(quiet) and status[t] ne 1 then begin
+                    message,string(procs[t],manifest[t].scan,ifnums[t],plnums[t],fdnums[t], $
+                                   format='(a," scan=",i0," ifnum=",i0," plnum=",i0," fdnum=",i0," failed")'),/info
+                endif
+                workerTask[i] = -1
+            endif
+
+            if nextTask lt ntasks then begin
+                workerStart[i] = systime(/seconds)
+                bridges[i]->execute, cmds[nextTask], /nowait
+                workerTask[i] = nextTask
+                nextTask += 1
+            endif
+        endfor
+        if ndone lt ntasks then wait, 0.05
+    endwhile
+    obj_destroy, bridges
+    tcalib = systime(/seconds) - tstart
+
+    ; copy the results to the output file in manifest order, after
+    ; anything already kept
+    keep_buffer_flush
+    ios = objarr(nw)
+    for i=0,(nw-1) do begin
+        if workerRows[i] gt 0 then begin
+            ios[i] = obj_new('io_sdfits_line')
+            ios[i]->set_file, workFiles[i]
+        endif
+    endfor
+    for t=0L,(ntasks-1) do begin
+        if taskCount[t] le 0 then continue
+        i = taskWorker[t]
+        stats[i].nspectra += taskCount[t]
+        dcs = ios[i]->get_spectra(count, index=lindgen(taskCount[t])+taskFirst[t])
+        if count gt 0 then begin
+            !g.lineoutio->write_spectra, dcs
+            data_free, dcs
+        endif
+    endfor
+    obj_destroy, ios
+
+    if not keyword_set(keepwork) then begin
+        indexFiles = prefix + strtrim(lindgen(nw),2) + '.index'
+        file_delete, [workFiles, indexFiles, workLogs], /allow_nonexistent, /quiet
+    endif
+
+    busy = stats.busy > 1d-9
+    stats.rate = stats.ntasks / busy
+
+    if not keyword_set(quiet) then begin
+        print, ntasks, nw, tcalib, systime(/seconds)-tstart, $
+               format='("Calibrated ",i0," manifest entries with ",i0," workers in ",f0.1," s (",f0.1," s total)")'
+        print, 'worker', 'ntasks', 'nfailed', 'nspectra', 'busy (s)', 'rate (/s)', format='(a8,3a10,2a12)'
+        for i=0,(nw-1) do begin
+            print, stats[i].worker, stats[i].ntasks, stats[i].nfailed, stats[i].nspectra, $
+                   stats[i].busy, stats[i].rate, format='(i8,3i10,f12.1,f12.3)'
+        endfor
+    endif
+end
@@ -7,9 +7,9 @@
 ; Replaces the contents of the data being smoothed with the smoothed
 ; data.
 ;
-; For odd width, this uses the built-in idl SMOOTH function.  For
-; even widths this uses :idl:pro:`doboxcar1d` and the reference channel is 
-; moved left by 1/2 channel width.
+; This uses :idl:pro:`doboxcar1d`, which gives the same result as the
+; built-in idl SMOOTH function for odd widths.  For even widths the
+; reference channel is moved left by 1/2 channel width.
 ;
 ; Other buffers (0 to 15) can be used instead of the PDC by
 ; supplying a value for the buffer keyword.
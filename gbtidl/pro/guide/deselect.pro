@@ -43,6 +43,7 @@
 PRO deselect, keep=keep, _EXTRA=ex
     compile_opt idl2
     if (keyword_set(keep)) then begin
+        keep_buffer_flush
         indx = select_data(!g.lineoutio,_EXTRA=ex)
     endif else begin
         indx = !g.line ? select_data(!g.lineio, _EXTRA=ex) : select_data(!g.contio, _EXTRA=ex)
@@ -51,6 +51,9 @@ pro fileout, file_name, new=new
             message, 'file_name must be of the form *.fits',/info
             return
         endif
+        ; anything still in the keep buffer goes to the old file
+        keep_buffer_flush, ok=flushOK
+        if not flushOK then return
         new_io = obj_new('io_sdfits_writer')
         if (obj_valid(new_io)) then begin
             if (obj_valid(!g.lineoutio)) then obj_destroy, !g.lineoutio
@@ -23,6 +23,9 @@
 ;       unless the selection criteria used by FIND are changed carefully.
 ;   keep : in, optional, type=boolean
 ;       Select entries from the currently attached output (keep) file.
+;   indexed : in, optional, type=boolean
+;       When set, :idl:pro:`select` uses the typed, sorted find index
+;       when it can.  See the ``indexed`` keyword in select.
 ;
 ; :Examples:
 ; 
@@ -64,7 +67,7 @@
 ;   :idl:pro:`select`
 ;
 ;-
-pro find, keep=keep, append=append
+pro find, keep=keep, append=append, indexed=indexed
     compile_opt idl2
 
     if not keyword_set(append) then emptystack
@@ -112,8 +115,8 @@ pro find, keep=keep, append=append
         end
     endelse
     if count gt 0 then begin
-        select,keep=keep,_EXTRA=selStruct
+        select,keep=keep,indexed=indexed,_EXTRA=selStruct
     endif else begin
-        select,keep=keep
+        select,keep=keep,indexed=indexed
     endelse
 end
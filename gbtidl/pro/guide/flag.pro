@@ -119,6 +119,7 @@ pro flag, scan, intnum=intnum, plnum=plnum, ifnum=ifnum, fdnum=fdnum, sampler=sa
         return
     endif
 
+    if keyword_set(keep) then keep_buffer_flush
     thisio = keyword_set(keep) ? !g.lineoutio : !g.lineio
     if not thisio->is_data_loaded() then begin
         if keyword_set(keep) then begin
@@ -75,6 +75,7 @@ pro flagrec, record, bchan=bchan, echan=echan, chans=chans, chanwidth=chanwidth,
         return
     endif
 
+    if keyword_set(keep) then keep_buffer_flush
     thisio = keyword_set(keep) ? !g.lineoutio : !g.lineio
 
     if not thisio->is_data_loaded() then begin
@@ -66,6 +66,7 @@ function get_scan_numbers, count, keep=keep, unique=unique, _EXTRA=ex
 
    result = -1
    count = 0
+   if keyword_set(keep) then keep_buffer_flush
    if ((keyword_set(keep) and not !g.lineoutio->is_data_loaded()) or $
        (!g.line and not !g.lineio->is_data_loaded()) or $
        (not !g.line and not !g.contio->is_data_loaded())) then begin
@@ -104,6 +104,7 @@ function getchunk,count=count,keep=keep,useflag=useflag, skipflag=skipflag, indi
     endif
     
     if keyword_set(keep) then begin
+        keep_buffer_flush
         if !g.lineoutio->is_data_loaded() then begin
             res = !g.lineoutio->get_spectra(count,indicies,useflag=useflag,skipflag=skipflag,$
                                             _EXTRA=ex)
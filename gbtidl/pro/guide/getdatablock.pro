@@ -0,0 +1,165 @@
+; docformat = 'rst'
+
+;+
+; A function to get the data values of many spectra from an input
+; file as a single 2-D (channel x spectrum) array in one call.
+;
+; This is a light-weight alternative to :idl:pro:`getchunk` for
+; routines that only need the data values (e.g. to work on a whole
+; scan at once with array operations, see :idl:pro:`dobatchsigref`).
+; No data containers are created.  Instead, the location of each
+; selected row in the SDFITS files is found from the index and the
+; binary table layout (see :idl:pro:`sdfits_table_layout`), the
+; table rows are memory mapped directly from the file using SHMMAP,
+; and the DATA column of the selected rows is copied out of that
+; mapping in large contiguous blocks into the returned array.  The
+; returned array is the only copy of the data in memory, so reading
+; many spectra does not need one heap allocation per spectrum.
+; Use :idl:pro:`getchunk` when the header values are also needed
+; (the index values, e.g. from ``get_index_values``, are often enough).
+;
+; All of the selected spectra must have the same number of channels.
+; Column ``i`` of the result (``result[*,i]``) holds the data for
+; ``indicies[i]``.
+;
+; .. note::
+;   The data are returned exactly as they are in the file.  Flags
+;   (set via :idl:pro:`flag`) are **not** applied and VEGAS spur
+;   channels are not blanked.  Use getchunk if those are required.
+;
+; **There is no protection against running out of memory.** The same
+; caution described in getchunk applies here, although the memory
+; used is much less than that of the equivalent array of data
+; containers.
+;
+; :Keywords:
+;   count : out, optional, type=integer
+;       An output value giving the number of spectra actually returned.
+;   keep : in, optional, type=boolean
+;       When set, the data are fetched from the output file.
+;   indicies : out, optional, type=long
+;       Array of index numbers, one for each spectrum retrieved.
+;       Returns -1 when no spectra were returned.
+;   _EXTRA : in, optional, type=extra keywords
+;       These are selection parameters to specify which data to retrieve.
+;       See :idl:pro:`listcols` for a complete list of the columns available.
+;
+; :Returns:
+;   A 2-D array of data values, [nchan, count].  If no data satisfy the
+;   selection criteria, count will be 0 and the returned value will be -1.
+;
+; :Examples:
+;
+;   .. code-block:: IDL
+;
+;       d = getdatablock(scan=6000,ifnum=0,plnum=0,cal=0,count=count)
+;       ; mean spectrum of all cal-off integrations
+;       m = total(d,2)/count
+;
+; :Uses:
+;   :idl:pro:`sdfits_table_layout`
+;   :idl:pro:`select_data`
+;
+;-
+function getdatablock,count=count,keep=keep,indicies=indicies,_EXTRA=ex
+    compile_opt idl2
+
+    count = 0
+    indicies = -1
+    res = -1
+
+    if keyword_set(keep) then begin
+        keep_buffer_flush
+        io = !g.lineoutio
+        srcName = !g.line_fileout_name
+    endif else begin
+        if not !g.line then begin
+            message,'getdatablock is only available for spectral line data',/info
+            return, res
+        endif
+        io = !g.lineio
+        srcName = !g.line_filein_name
+    endelse
+
+    if not io->is_data_loaded() then begin
+        message,'No line data is attached yet',/info
+        return, res
+    endif
+
+    indx = select_data(io,count=nsel,_EXTRA=ex)
+    if nsel le 0 then return, res
+
+    files = io->get_index_values('FILE',index=indx)
+    exts = io->get_index_values('EXTENSION',index=indx)
+    rows = long64(io->get_index_values('ROW',index=indx))
+
+    ; the directory containing the data files
+    dataDir = file_test(srcName,/directory) ? srcName : file_dirname(srcName)
+
+    ; one group for each file and extension
+    groupKey = files + ':' + strtrim(exts,2)
+    groupOrder = sort(groupKey)
+    groupLast = uniq(groupKey[groupOrder])
+    groupFirst = [0L, groupLast[0:(n_elements(groupLast)-2 > 0)]+1]
+    if n_elements(groupLast) eq 1 then groupFirst = [0L]
+
+    nchan = -1LL
+    for g=0L,(n_elements(groupLast)-1) do begin
+        members = groupOrder[groupFirst[g]:groupLast[g]]
+        thisFile = files[members[0]]
+        if not file_test(thisFile) then thisFile = filepath(file_basename(thisFile),root_dir=dataDir)
+        layout = sdfits_table_layout(thisFile, long(exts[members[0]]))
+        if size(layout,/type) ne 8 then return, -1
+        if layout.col_type ne 4 and layout.col_type ne 5 then begin
+            message,'DATA column must be a floating point type',/info
+            return, -1
+        endif
+        if nchan lt 0 then begin
+            nchan = layout.col_repeat
+            res = make_array(nchan, nsel, type=layout.col_type, /nozero)
+        endif
+        if layout.col_repeat ne nchan or layout.col_type ne size(res,/type) then begin
+            message,'All selected spectra must have the same number of channels',/info
+            return, -1
+        endif
+
+        ; rows of this group, in ascending order
+        theseRows = rows[members]
+        rowOrder = sort(theseRows)
+        members = members[rowOrder]
+        theseRows = theseRows[rowOrder]
+
+        ; map just the span of rows needed, starting at a page boundary
+        spanStart = layout.data_offset + theseRows[0]*layout.naxis1
+        spanEnd = layout.data_offset + (theseRows[-1]+1)*layout.naxis1
+        mapStart = (spanStart / 65536LL) * 65536LL
+        shmmap, dimension=spanEnd-mapStart, /byte, filename=thisFile, offset=mapStart, $
+                /private, get_name=segName
+        mapped = shmvar(segName)
+
+        ; copy contiguous runs of rows in one step each
+        colBytes = layout.col_repeat * layout.col_bytes
+        ngroup = n_elements(theseRows)
+        nbreaks = 0
+        if ngroup gt 1 then breaks = where(theseRows[1:*] - theseRows ne 1, nbreaks)
+        runLast = (nbreaks gt 0) ? [breaks, ngroup-1] : [ngroup-1]
+        nruns = n_elements(runLast)
+        runFirst = (nruns gt 1) ? [0L, runLast[0:(nruns-2)]+1] : [0L]
+        for r=0L,(nruns-1) do begin
+            nr = runLast[r] - runFirst[r] + 1
+            first = spanStart - mapStart + (theseRows[runFirst[r]]-theseRows[0])*layout.naxis1
+            rowBytes = reform(mapped[first:(first + nr*layout.naxis1 - 1)], layout.naxis1, nr)
+            colData = rowBytes[layout.col_offset:(layout.col_offset+colBytes-1),*]
+            values = (layout.col_type eq 4) ? float(colData,0,nchan,nr) : double(colData,0,nchan,nr)
+            ; FITS is big-endian
+            swap_endian_inplace, values, /swap_if_little_endian
+            res[*,members[runFirst[r]:runLast[r]]] = values
+        endfor
+        mapped = 0
+        shmunmap, segName
+    endfor
+
+    count = nsel
+    indicies = indx
+    return, res
+end
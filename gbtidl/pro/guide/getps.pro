@@ -27,6 +27,17 @@
 ;     Jy are requested via the units keyword, then :idl:pro:`dcsetunits`
 ;     is used to convert to the desired units.
 ;
+;   * When the ``batch`` keyword is set, all of the integrations are
+;     calibrated at once using :idl:pro:`dobatchsigref` instead of one at
+;     a time with dofullsigref.  The data for each switching phase are
+;     held as a single 2-D (channel x integration) array and Tsys,
+;     the calibrated data, and the exposure of every integration are
+;     calculated in one vectorized step.  The raw data containers are
+;     re-used to hold the calibrated integrations so that no data
+;     containers are copied.  The results are identical to those
+;     produced without ``batch``.  This is much faster for scans with
+;     many integrations and many channels.
+;
 ;   * Averaging of individual integrations is then done using 
 ;     :idl:pro:`dcaccum`.  By default, integrations are weighted as
 ;     described in dcaccum. If the ``eqweight`` keyword is set, then
@@ -207,6 +218,9 @@
 ;       When set, the normal status message on successful completion
 ;       is not printed.  This will not have any effect on error messages. 
 ;       Default is unset.
+;   batch : in, optional, type=boolean
+;       When set, all integrations are calibrated in a single vectorized
+;       step using :idl:pro:`dobatchsigref`.  Default is unset.
 ;   keepints : in, optional, type=boolean
 ;       When set, the individual integrations are saved to the current 
 ;       output file (fileout). This option is ignored if a specific 
@@ -254,16 +268,19 @@
 ;   :idl:pro:`dcaccum`
 ;   :idl:pro:`dcscale`
 ;   :idl:pro:`dcsetunits`
+;   :idl:pro:`dcpaircheck`
+;   :idl:pro:`dobatchsigref`
 ;   :idl:pro:`dofullsigref`
 ;   :idl:pro:`find_paired_info`
 ;   :idl:pro:`set_data_container`
+;   :idl:pro:`setdcdata2d`
 ;   :idl:pro:`showiftab`
 ;
 ;-
 pro getps,scan,ifnum=ifnum,intnum=intnum,plnum=plnum,fdnum=fdnum,sampler=sampler,tau=tau,$
           tsys=tsys,ap_eff=ap_eff,smthoff=smthoff,units=units,eqweight=eqweight,$
           tcal=tcal,quiet=quiet,keepints=keepints, useflag=useflag, skipflag=skipflag, $
-          instance=instance, file=file, timestamp=timestamp, status=status
+          instance=instance, file=file, timestamp=timestamp, batch=batch, status=status
     compile_opt idl2
 
     status=-1
@@ -415,29 +432,73 @@ pro getps,scan,ifnum=ifnum,intnum=intnum,plnum=plnum,fdnum=fdnum,sampler=sampler
     tauInts = fltarr(expectedCount)
     apEffInts = tauInts
     sigTsysInts = tauInts
-    for n_int = 0,(expectedCount-1) do begin
-       dofullsigref,result,onData[onScan_on[n_int]],onData[onScan_off[n_int]],$
-                    offData[offScan_on[n_int]],offData[offScan_off[n_int]], $
-                    smthoff,tsys=tsys,tau=tau,tcal=tcal,retreftsys=retreftsys,retsigtsys=retsigtsys
-        ; convert to the desired units
-        dcsetunits,result,units,tau=tau,ap_eff=ap_eff,ret_tau=ret_tau,ret_ap_eff=ret_ap_eff
-        ; these are only used in the status line at the end
-        tauInts[n_int] = ret_tau
-        apEffInts[n_int] = ret_ap_eff
-        sigTsysInts[n_int] = retsigtsys
+    if keyword_set(batch) then begin
+       ; calibrate all integrations at once, the result headers are
+       ; those of the "On" scan cal-off data containers, re-use those
+       ; to hold the calibrated data
+       resultInts = onData[onScan_off[0:(expectedCount-1)]]
+       ; the same pair checks as the per-integration path, and the
+       ; 2-D arrays need the same number of channels in every integration
+       for n_int = 0,(expectedCount-1) do begin
+          ok = dcpaircheck(onData[onScan_off[n_int]],onData[onScan_on[n_int]],msg)
+          if ok then ok = dcpaircheck(offData[offScan_off[n_int]],offData[offScan_on[n_int]],msg)
+          if ok then ok = dcpaircheck(onData[onScan_off[n_int]],offData[offScan_off[n_int]],msg)
+          if ok then ok = dcpaircheck(onData[onScan_off[n_int]],onData[onScan_off[0]],msg)
+          if not ok then begin
+             message,msg,/info
+             data_free, onData
+             data_free, offData
+             return
+          endif
+       endfor
+       dobatchsigref,calData,onData[onScan_on[0:(expectedCount-1)]],resultInts,$
+                     offData[offScan_on[0:(expectedCount-1)]],offData[offScan_off[0:(expectedCount-1)]],$
+                     smthoff,tsys=tsys,tau=tau,tcal=tcal,retsigtsys=retsigtsys,retreftsys=retreftsys,$
+                     retexposure=retexposure,retduration=retduration,rettcal=rettcal
+       setdcdata2d, resultInts, calData
+       resultInts.tsys = retreftsys
+       resultInts.mean_tcal = rettcal
+       resultInts.exposure = retexposure
+       resultInts.duration = retduration
+       sigTsysInts = retsigtsys
+       for n_int = 0,(expectedCount-1) do begin
+          thisInt = resultInts[n_int]
+          dcsetunits,thisInt,units,tau=tau,ap_eff=ap_eff,ret_tau=ret_tau,ret_ap_eff=ret_ap_eff
+          tauInts[n_int] = ret_tau
+          apEffInts[n_int] = ret_ap_eff
+          dcaccum,thisaccum,thisInt,weight=weight
+          resultInts[n_int] = thisInt
+       endfor
+       ; these are the same data containers as in onData
+       onData[onScan_off[0:(expectedCount-1)]] = resultInts
+       if keyword_set(keepints) then putchunk, resultInts
+       ; last integration, used if the average is all blanked
+       data_copy, resultInts[expectedCount-1], result
+    endif else begin
+       for n_int = 0,(expectedCount-1) do begin
+          dofullsigref,result,onData[onScan_on[n_int]],onData[onScan_off[n_int]],$
+                       offData[offScan_on[n_int]],offData[offScan_off[n_int]], $
+                       smthoff,tsys=tsys,tau=tau,tcal=tcal,retreftsys=retreftsys,retsigtsys=retsigtsys
+           ; convert to the desired units
+           dcsetunits,result,units,tau=tau,ap_eff=ap_eff,ret_tau=ret_tau,ret_ap_eff=ret_ap_eff
+           ; these are only used in the status line at the end
+           tauInts[n_int] = ret_tau
+           apEffInts[n_int] = ret_ap_eff
+           sigTsysInts[n_int] = retsigtsys
         
-        dcaccum,thisaccum,result,weight=weight
-        if keyword_set(keepints) then begin
-            ; re-use raw data containers to conserve space
-            ; defer the actual keep until later
-            ; takes 3 steps because of the nature of IDL
-            ; data passing (value vs reference)
-           tmp = onData[onScan_on[n_int]]
-           data_copy, result, tmp
-           onData[onScan_on[n_int]] = tmp
-       endif
-    end
-    if keyword_set(keepints) then putchunk, onData[onScan_on]
+           dcaccum,thisaccum,result,weight=weight
+           if keyword_set(keepints) then begin
+               ; re-use raw data containers to conserve space
+               ; defer the actual keep until later
+               ; takes 3 steps because of the nature of IDL
+               ; data passing (value vs reference)
+              tmp = onData[onScan_on[n_int]]
+              data_copy, result, tmp
+              onData[onScan_on[n_int]] = tmp
+          endif
+       end
+       if keyword_set(keepints) then putchunk, onData[onScan_on]
+    endelse
     naccum1 = thisaccum.n
     if naccum1 le 0 then begin
         message,'Result is all blanked - probably all of the data were flagged',/info
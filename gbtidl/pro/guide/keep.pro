@@ -14,6 +14,9 @@
 ;
 ; Only spectral line data can be saved to disk at this time.
 ;
+; When the keep buffer is on (see :idl:pro:`keepbuffer`) the spectrum
+; is written to the file along with others later.
+;
 ; :Params:
 ;   dc : in, optional, type=data container or integer, default=0
 ;       a data container, or an integer global buffer number. Defaults
@@ -32,6 +35,9 @@
 ;       keep                    ; saves buffer 0 by default
 ;       keep,1                  ; saves buffer 1
 ;
+; :Uses:
+;   :idl:pro:`keep_buffer_write`
+;
 ;-
 PRO keep,dc
     compile_opt idl2
@@ -49,7 +55,7 @@ PRO keep,dc
             message,'Only spectrum data containers can be kept at this time, sorry.',/info
             return
         endif
-        !g.lineoutio->write_spectra,thisdc
+        keep_buffer_write,thisdc
     endif else begin
         if (dctype eq 2 or dctype eq 3) then begin
             if (!g.line ne 1) then begin
@@ -65,7 +71,7 @@ PRO keep,dc
                 message,'Data container at buffer '+strtrim(string(thisdc),2)+' is empty, nothing to keep',/info
                 return
             endif
-            !g.lineoutio->write_spectra,!g.s[thisdc]
+            keep_buffer_write,!g.s[thisdc]
         endif else  begin
             message,'dc argument must be a data container structure or an integer',/info
             usage,'keep'
@@ -0,0 +1,114 @@
+; docformat = 'rst'
+
+;+
+; Turn on, tune, flush or turn off the keep buffer, or report on it.
+;
+; Normally every :idl:pro:`keep` (and :idl:pro:`putchunk`) writes to
+; the output file immediately, which updates the file and its index
+; once per call.  Pipelines that keep every integration spend much of
+; their time doing that.  When the keep buffer is on, copies of the
+; kept spectra are held in memory and written with one write (one
+; table append and one index update) when the buffer holds nspectra
+; spectra or mbytes megabytes of data, whichever comes first.
+;
+; The buffer is flushed before anything reads from or changes the
+; output file (:idl:pro:`kget`, :idl:pro:`nget`, :idl:pro:`list`,
+; :idl:pro:`nsave`, :idl:pro:`fileout`, and the keep keyword of the
+; selection and flagging procedures), so the buffered spectra behave
+; exactly as if they had already been written.
+;
+; The buffer is not crash safe.  IDL has no hook that runs when it
+; exits, so nothing flushes the buffer on exit or after a crash, and
+; the spectra still in the buffer (at most nspectra spectra or mbytes
+; megabytes) are then lost.  Use /flush or /off before exiting.  If a
+; write fails, the spectra stay in the buffer and nothing more is
+; written until the buffer has been flushed.
+;
+; With no keywords, the current settings and the statistics (spectra
+; kept, number of writes, spectra written and time spent writing) are
+; printed.
+;
+; :Keywords:
+;   nspectra : in, optional, type=integer
+;       Turn on the buffer and write when it holds this many spectra.
+;       Defaults to 500 when turning on the buffer.
+;   mbytes : in, optional, type=float
+;       Turn on the buffer and write when it holds this many megabytes
+;       of data (the data values and the headers).  Defaults to 64 when
+;       turning on the buffer.
+;   flush : in, optional, type=boolean
+;       Write anything in the buffer now.
+;   off : in, optional, type=boolean
+;       Write anything in the buffer and turn it off.
+;   quiet : in, optional, type=boolean
+;       Do not print the report.
+;   stats : out, optional, type=structure
+;       The settings and statistics, with fields enabled, nspectra,
+;       mbytes, nbuffered, nkept, nflushes, nwritten and flushtime (s).
+;
+; :Examples:
+;
+;   .. code-block:: IDL
+;
+;       fileout,'allints.fits'
+;       keepbuffer, nspectra=1000
+;       for i=0,(nints-1) do begin
+;          gettp, 30, intnum=i, /quiet
+;          keep
+;       endfor
+;       keepbuffer, /off     ; writes the rest and reports
+;
+; :Uses:
+;   :idl:pro:`keep_buffer_flush`
+;
+;-
+pro keepbuffer, nspectra=nspectra, mbytes=mbytes, flush=flush, off=off, quiet=quiet, stats=stats
+    compile_opt idl2
+    common keep_buffer_common, kb_dcs, kb_count, kb_bytes, kb_maxcount, kb_maxbytes, kb_stats
+
+    if n_elements(kb_maxcount) eq 0 then begin
+        kb_maxcount = 0L
+        kb_maxbytes = 0LL
+        kb_count = 0L
+        kb_bytes = 0LL
+        kb_stats = {nkept:0LL, nflushes:0L, nwritten:0LL, flushtime:0.0d}
+    endif
+
+    if keyword_set(flush) or keyword_set(off) then begin
+        keep_buffer_flush, ok=flushOK
+        if keyword_set(off) and flushOK then begin
+            kb_maxcount = 0L
+            kb_maxbytes = 0LL
+        endif
+    endif
+
+    if n_elements(nspectra) gt 0 or n_elements(mbytes) gt 0 then begin
+        if kb_maxcount le 0 then begin
+            ; turning it on, start new statistics
+            kb_maxcount = 500L
+            kb_maxbytes = 64LL*1024*1024
+            kb_stats = {nkept:0LL, nflushes:0L, nwritten:0LL, flushtime:0.0d}
+        endif
+        if n_elements(nspectra) gt 0 then kb_maxcount = long(nspectra[0]) > 1L
+        if n_elements(mbytes) gt 0 then kb_maxbytes = long64(mbytes[0]*1024d*1024d) > 1LL
+        if kb_count ge kb_maxcount or kb_bytes ge kb_maxbytes then keep_buffer_flush
+    endif
+
+    stats = {enabled:kb_maxcount gt 0, nspectra:kb_maxcount, $
+             mbytes:kb_maxbytes/(1024d*1024d), nbuffered:kb_count, $
+             nkept:kb_stats.nkept, nflushes:kb_stats.nflushes, $
+             nwritten:kb_stats.nwritten, flushtime:kb_stats.flushtime}
+
+    if not keyword_set(quiet) then begin
+        if kb_maxcount gt 0 then begin
+            print, kb_maxcount, stats.mbytes, kb_count, $
+                   format='("Keep buffer is on: ",i0," spectra or ",f0.1," MB, ",i0," buffered")'
+        endif else begin
+            print, 'Keep buffer is off'
+        endelse
+        if stats.nkept gt 0 then begin
+            print, stats.nkept, stats.nwritten, stats.nflushes, stats.flushtime, $
+                   format='("Kept ",i0," spectra, ",i0," written in ",i0," writes (",f0.2," s)")'
+        endif
+    endif
+end
@@ -80,6 +80,7 @@ pro kget, useflag=useflag, skipflag=skipflag, _EXTRA=ex
     endif
 
    if (!g.line) then begin
+       keep_buffer_flush
        if !g.lineoutio->is_data_loaded() eq 0 then begin
            message,'No keep file has been set or the keep file is empty',/info
            return
@@ -41,6 +41,7 @@ function lastrec, keep=keep
 
     result = -1
     if keyword_set(keep) then begin
+        keep_buffer_flush
         result = !g.lineoutio->get_last_record()
     endif else begin
         thisIO = !g.line ? !g.lineio : !g.contio
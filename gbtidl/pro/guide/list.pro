@@ -122,6 +122,7 @@ pro list, start, finish, keep=keep, columns=columns, user=user, $
     endif
 
     if (keyword_set(keep)) then begin
+        keep_buffer_flush
         if !g.lineoutio->is_data_loaded() eq 0 then begin
             message,'No keep file has been set or the keep file is empty',/info
             return
@@ -19,6 +19,7 @@ pro listids, keep=keep
         return
     endif
 
+    if keyword_set(keep) then keep_buffer_flush
     thisio = keyword_set(keep) ? !g.lineoutio : !g.lineio
 
     if not thisio->is_data_loaded() then begin
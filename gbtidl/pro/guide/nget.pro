@@ -89,6 +89,7 @@ pro nget,nsave,buffer=buffer,infile=infile,useflag=useflag,skipflag=skipflag,ok=
     if keyword_set(infile) then begin
         dc = !g.lineio->get_spectra(nsave=nsave,count,useflag=useflag,skipflag=skipflag)
     endif else begin
+        keep_buffer_flush
         dc = !g.lineoutio->get_spectra(nsave=nsave,count,useflag=useflag,skipflag=skipflag)
     endelse
     
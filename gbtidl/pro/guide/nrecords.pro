@@ -20,6 +20,7 @@ function nrecords, keep=keep
     compile_opt idl2
 
    if keyword_set(keep) then begin
+       keep_buffer_flush
        if (!g.lineoutio->is_data_loaded()) then begin
           return, !g.lineoutio->get_num_index_rows()
        endif else begin
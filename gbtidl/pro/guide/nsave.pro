@@ -77,6 +77,9 @@ pro nsave,nsave,buffer=buffer,dc=dc,ok=ok
         endelse
     endelse
 
+    ; anything kept earlier is written first
+    keep_buffer_flush
+
     ; ready to save, make sure the protection status is in sync
     if !g.sprotect then begin
         !g.lineoutio->set_sprotect_on
@@ -91,6 +94,8 @@ pro nsave,nsave,buffer=buffer,dc=dc,ok=ok
     endif else begin
         !g.lineoutio->nsave_spectrum, !g.s[buffer], nsave, status
     endelse
+    ; an overwrite does not change the number of rows
+    forget_find_index, !g.lineoutio
 
     if status eq 0 then begin
         if !g.sprotect then begin
@@ -22,6 +22,9 @@
 ;           data_free, a
 ;       endfor
 ;
+; :Uses:
+;   :idl:pro:`keep_buffer_write`
+;
 ;-
 pro putchunk, chunk
     compile_opt idl2
@@ -42,5 +45,5 @@ pro putchunk, chunk
         return
     endif
 
-    !g.lineoutio->write_spectra,chunk
+    keep_buffer_write,chunk
 end
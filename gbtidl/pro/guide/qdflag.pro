@@ -119,6 +119,7 @@ pro qdflag, scans, thresh=thresh, idstring=idstring, flag_qd_bad=flag_qd_bad, ke
 
   fio = !g.lineio
   if keyword_set(keep) then begin
+     keep_buffer_flush
      fio = !g.lineoutio
   endif
 
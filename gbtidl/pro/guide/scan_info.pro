@@ -150,6 +150,7 @@ FUNCTION scan_info, scan, file, keep=keep, quiet=quiet, count=count
     result = -1
     count = 0
     if (keyword_set(keep)) then begin
+        keep_buffer_flush
         if (!g.lineoutio->is_data_loaded()) then begin
             result = !g.lineoutio->get_scan_info(scan,file,count=count,quiet=quiet)
         endif else begin
@@ -32,6 +32,14 @@
 ; 
 ;   quiet : in, optional, type=boolean
 ;       Turn off informational messages.
+;
+;   indexed : in, optional, type=boolean
+;       If set, use the typed, sorted find index (see
+;       :idl:pro:`get_find_index` and :idl:pro:`query_find_index`)
+;       when all of the selection parameters are columns held in that
+;       index (SCAN, IFNUM, PLNUM, FDNUM, INT, SOURCE, SAMPLER and
+;       TIMESTAMP, given in full).  This is much faster for large
+;       indexes.  Otherwise the io class's search_index is used as usual.
 ; 
 ;   _EXTRA : in, optional, type=extra keywords
 ;       These are the selection parameters.
@@ -49,17 +57,26 @@
 ; :Uses:
 ; 
 ;   :idl:pro:`select_data`
+;   :idl:pro:`get_find_index`
+;   :idl:pro:`query_find_index`
 ;   :idl:pro:`appendstack`
 ;
 ;-
-PRO select, count, keep=keep, quiet=quiet, _EXTRA=ex
+PRO select, count, keep=keep, quiet=quiet, indexed=indexed, _EXTRA=ex
     compile_opt idl2
     count = 0
     if (keyword_set(keep)) then begin
-        indx = select_data(!g.lineoutio,_EXTRA=ex)
+        keep_buffer_flush
+        io = !g.lineoutio
     endif else begin
-        indx = !g.line ? select_data(!g.lineio, _EXTRA=ex) : select_data(!g.contio, _EXTRA=ex)
+        io = !g.line ? !g.lineio : !g.contio
     endelse
+
+    ok = 0
+    if keyword_set(indexed) then begin
+        indx = query_find_index(get_find_index(io), ok=ok, _EXTRA=ex)
+    endif
+    if not ok then indx = select_data(io, _EXTRA=ex)
     
     if (indx[0] lt 0) then begin
         if not keyword_set(quiet) then message,'No matching indices were found',/info
@@ -126,6 +126,7 @@ pro unflag, id, keep=keep, all=all
         return
     endif
 
+    if keyword_set(keep) then keep_buffer_flush
     thisio = keyword_set(keep) ? !g.lineoutio : !g.lineio
     if not thisio->is_data_loaded() then begin
         if keyword_set(keep) then begin
@@ -0,0 +1,145 @@
+; docformat = 'rst'
+
+;+
+; Fit a polynomial baseline to each of an array of data containers
+; using the same regions and order for all of them.
+;
+; This is the equivalent of using :idl:pro:`dcbaseline` on each data
+; container in turn, but the orthogonal polynomials are only
+; constructed once (see :idl:pro:`ortho_basis`) and all of the data
+; containers are fit with a single matrix product.  Data containers
+; with blanked channels in the regions need a different set of
+; polynomials and are fit individually using :idl:pro:`ortho_fit`,
+; exactly as dcbaseline does.
+;
+; All of the data containers must have the same number of channels.
+; Optionally, the fitted baseline (evaluated at all channels, as
+; :idl:pro:`bsubtract` does) is subtracted from each data container.
+;
+; :Params:
+;   dcs : in, required, type=data container array
+;       The data containers to fit.
+;   nfit : in, required, type=integer
+;       The order of polynomial to fit.
+;   regions : in, required, type=2D array
+;       The regions to use, as in dcbaseline.
+;   nregion : in, required, type=integer
+;       The number of regions to use.
+;   polyfit : out, required, type=3D array
+;       The polyfit array for each data container,
+;       [4,nfit+1,n_elements(dcs)].  ``polyfit[*,*,i]`` is the same as
+;       the polyfit returned by dcbaseline for ``dcs[i]``.
+;   polyrms : out, required, type=2D array
+;       The rms for each order up to nfit for each data container,
+;       [nfit+1,n_elements(dcs)].  NaN where there was no unblanked data
+;       to fit.
+;
+; :Keywords:
+;   subtract : in, optional, type=boolean
+;       When set, subtract the fitted baseline from each data container.
+;   fitok : out, optional, type=byte array
+;       1 for each data container that could be fit, otherwise 0.
+;
+; :Returns:
+;   1 if at least one data container was fit, otherwise 0.
+;
+; :Examples:
+;
+;   .. code-block:: IDL
+;
+;       dcs = getchunk(scan=10,ifnum=0,plnum=0)
+;       ok = dcbaselinestack(dcs, 3, !g.regions, !g.nregion, polyfit, polyrms, /subtract)
+;
+; :Uses:
+;   :idl:pro:`get_chans`
+;   :idl:pro:`getdcdata2d`
+;   :idl:pro:`ortho_basis`
+;   :idl:pro:`ortho_fit`
+;   :idl:pro:`ortho_poly`
+;   :idl:pro:`setdcdata2d`
+;
+;-
+function dcbaselinestack, dcs, nfit, regions, nregion, polyfit, polyrms, $
+                          subtract=subtract, fitok=fitok
+    compile_opt idl2
+
+    ndc = n_elements(dcs)
+    fitok = bytarr(ndc > 1)
+
+    if (data_valid(dcs[0]) lt 1) then begin
+        message, 'The data container to be fit has no valid data in it.', /info
+        return, 0
+    endif
+
+    if (nfit < 0) then begin
+        message, 'nfit must be >= 0', /info
+        return, 0
+    endif
+
+    chans = get_chans(dcs[0], nregion, regions)
+    if (chans[0] < 0) then begin
+        message, 'The nregions are invalid',/info
+        return, 0
+    endif
+
+    data = getdcdata2d(dcs)
+    if n_elements(data) eq 1 then return, 0
+    nchan = n_elements(data)/ndc
+    data = reform(data, nchan, ndc, /overwrite)
+
+    nsel = n_elements(chans)
+    y = double(data[chans,*])
+    nfinite = total(finite(y),1,/integer)
+
+    polyfit = dblarr(4, nfit+1, ndc)
+    polyrms = make_array(nfit+1, ndc, /double, value=!values.d_nan)
+
+    allChans = dindgen(nchan)
+
+    ; data containers with no blanked channels in the regions share
+    ; the same polynomials
+    shared = where(nfinite eq nsel, nshared, complement=others, ncomplement=nothers)
+    if nshared gt 0 then begin
+        ob = ortho_basis(double(chans), nfit, xeval=allChans, evalbasis=evalbasis)
+        ys = reform(y[*,shared], nsel, nshared)
+        coef = reform(matrix_multiply(ob.basis, ys, /atranspose), nfit+1, nshared)
+
+        ; the rms after each order, as ortho_fit does
+        resid = ys
+        for m=0,nfit do begin
+            resid -= ob.basis[*,m] # reform(coef[m,*], nshared)
+            polyrms[m,shared] = sqrt(total(resid^2,1)/double(nsel))
+        endfor
+
+        polyfit[0:2,*,shared] = rebin(ob.polyfit[0:2,*], 3, nfit+1, nshared)
+        polyfit[3,*,shared] = reform(coef, 1, nfit+1, nshared)
+        fitok[shared] = 1
+
+        if keyword_set(subtract) then begin
+            data[*,shared] -= matrix_multiply(evalbasis, coef)
+        endif
+    endif
+
+    ; the rest are fit individually, as in dcbaseline
+    for j=0L,(nothers-1) do begin
+        i = others[j]
+        indx = where(finite(y[*,i]), count)
+        if count eq 0 then continue
+        thisPolyfit = ortho_fit(chans[indx], y[indx,i], nfit, cfit, thisRms)
+        polyfit[*,*,i] = thisPolyfit
+        polyrms[*,i] = thisRms
+        fitok[i] = 1
+        if keyword_set(subtract) then begin
+            data[*,i] -= ortho_poly(allChans, thisPolyfit)
+        endif
+    endfor
+
+    if total(fitok) eq 0 then begin
+        message,'No unblanked data in those regions, nothing to fit',/info
+        return, 0
+    endif
+
+    if keyword_set(subtract) then setdcdata2d, dcs, data
+
+    return, 1
+end
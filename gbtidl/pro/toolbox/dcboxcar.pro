@@ -2,9 +2,10 @@
 
 ;+
 ; Smooth a data container with a boxcar smoothing of a certain
-; width, in channels. For odd width, this uses the built-in idl
-; SMOOTH function.  For even widths this uses :idl:pro:`doboxcar1d` 
-; and the reference channel is moved left by 1/2 channel width.
+; width, in channels. This uses :idl:pro:`doboxcar1d`, which gives
+; the same result as the built-in idl SMOOTH function for odd widths.
+; For even widths the reference channel is moved left by 1/2 channel
+; width.
 ;
 ; Replaces the contents of the data being smoothed with the smoothed
 ; data.  Use the :idl:pro:`boxcar` procedure to smoothing data containers
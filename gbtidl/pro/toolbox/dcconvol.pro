@@ -27,6 +27,16 @@
 ; it has not been implemented here appart from what CONVOL provides in
 ; IDL 6.2 
 ;
+; For large kernels (at least 64 elements, e.g. when smoothing to a
+; coarse resolution with :idl:pro:`dcsmooth`) the convolution is done
+; using FFTs (see :idl:pro:`fftconvol`), which is much faster than
+; CONVOL for wide kernels and gives the same result apart from
+; floating point round off.  That is only possible when no keywords
+; other than ``/NAN``, ``/EDGE_TRUNCATE``, ``MISSING`` and ``/NORMALIZE``
+; are used and, unless ``/NAN`` is set, the data are not blanked.
+; Otherwise CONVOL is always used.  Use the fft keyword to choose the
+; method explicitly.
+;
 ; :Params:
 ;   dc : in, required, type=data container
 ;       The data container to use in the convolution.
@@ -52,6 +62,11 @@
 ;       factor and bias are calculated without using those values so that 
 ;       all result values are comparable in magnitude.
 ; 
+;   fft : in, optional, type=boolean
+;       When set, use the FFT method if possible.  When explicitly
+;       set to 0, always use CONVOL.  When not supplied, the FFT method
+;       is used for kernels with at least 64 elements if possible.
+;
 ;   _extra : in, optional, type=extra keywords
 ;       Keyword arguments to **CONVOL**
 ;
@@ -69,10 +84,11 @@
 ;       dcconvol, dc, kernel, /nan, /edge_truncate, /normalize
 ;
 ; :Uses:
+;   :idl:pro:`fftconvol`
 ;   :idl:pro:`setdcdata`
 ;
 ;-
-pro dcconvol, dc, kernel, scale_factor, ok=ok, normalize=normalize, $
+pro dcconvol, dc, kernel, scale_factor, ok=ok, normalize=normalize, fft=fft, $
               _extra=extra_keywords
     compile_opt idl2
 
@@ -95,8 +111,31 @@ pro dcconvol, dc, kernel, scale_factor, ok=ok, normalize=normalize, $
         return
     endif
 
+    ; can the FFT method be used
+    useFFT = (n_elements(fft) gt 0) ? keyword_set(fft) : n_elements(kernel) ge 64
+    if useFFT then begin
+        nan = 0
+        edge_truncate = 0
+        if n_elements(extra_keywords) gt 0 then begin
+            extraTags = tag_names(extra_keywords)
+            for i=0,(n_elements(extraTags)-1) do begin
+                case extraTags[i] of
+                    'NAN': nan = keyword_set(extra_keywords.(i))
+                    'EDGE_TRUNCATE': edge_truncate = keyword_set(extra_keywords.(i))
+                    'MISSING': missing = extra_keywords.(i)
+                    'CENTER': if not keyword_set(extra_keywords.(i)) then useFFT = 0
+                    else: useFFT = 0
+                endcase
+            endfor
+        endif
+        if useFFT and not nan then useFFT = array_equal(finite(theData),1)
+    endif
+
     idlver=fix(strsplit(!version.release,'.',/extract))
-    if idlver[0] gt 6 or (idlver[0] eq 6 and idlver[1] ge 2) then begin
+    if useFFT then begin
+        theData = fftconvol(theData,kernel,scale_factor,nan=nan,edge_truncate=edge_truncate, $
+                            normalize=normalize,missing=missing)
+    endif else if idlver[0] gt 6 or (idlver[0] eq 6 and idlver[1] ge 2) then begin
         theData = convol(theData,kernel,scale_factor, normalize=normalize, _extra=extra_keywords)
     endif else begin
         if keyword_set(normalize) then begin
@@ -58,24 +58,35 @@ pro dcsetfframe, dc, toframe=toframe
      message,'dc must be a spectrum data container',/info
   endif
 
-  ; this could be vectorized, but doing it this way allows for less
-  ; code duplication since the non-vectorized functions already exist
-
-  for i=0,n_elements(dc)-1 do begin
+  ; the frame to use for each data container
+  ndc = n_elements(dc)
+  frames = strarr(ndc)
+  for i=0,ndc-1 do begin
      if n_elements(toframe) eq 0 then begin
         ; default to frame in velocity definition
         if not decode_veldef(dc[i].velocity_definition, vdef, thisFrame) then return
      endif else begin
         thisFrame = toframe
      endelse
-         
-     if thisFrame ne dc[i].frequency_type then begin
-        ; can convert everything in one shot
-        newFreqs = freqtofreq(dc[i], [dc[i].reference_frequency, dc[i].frequency_interval, dc[i].center_frequency], thisFrame, dc[i].frequency_type)
-        dc[i].reference_frequency = newFreqs[0]
-        dc[i].frequency_interval = newFreqs[1]
-        dc[i].center_frequency = newFreqs[2]
-        dc[i].frequency_type = thisFrame
-     endif
+     frames[i] = thisFrame
   endfor
+
+  ; the frame velocities are done together for all data containers
+  ; with the same pair of frames
+  pairs = frames + ' ' + dc.frequency_type
+  todo = where(frames ne dc.frequency_type, ntodo)
+  while ntodo gt 0 do begin
+     thisPair = pairs[todo[0]]
+     sel = todo[where(pairs[todo] eq thisPair, complement=rest, ncomplement=nrest)]
+     thisFrame = frames[sel[0]]
+     vframe = frame_velocity(dc[sel], thisFrame, dc[sel[0]].frequency_type, /bootstrap)
+     ; can convert everything in one shot, as freqtofreq does
+     factor = sqrt((!gc.light_speed + vframe)/(!gc.light_speed-vframe))
+     dc[sel].reference_frequency = dc[sel].reference_frequency * factor
+     dc[sel].frequency_interval = dc[sel].frequency_interval * factor
+     dc[sel].center_frequency = dc[sel].center_frequency * factor
+     dc[sel].frequency_type = thisFrame
+     if nrest gt 0 then todo = todo[rest]
+     ntodo = nrest
+  endwhile
 end
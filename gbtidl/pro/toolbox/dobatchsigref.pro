@@ -0,0 +1,155 @@
+; docformat = 'rst'
+
+;+
+; This procedure calibrates all of the integrations of a signal and
+; reference scan pair in one vectorized step.
+;
+; This is the batched equivalent of calling :idl:pro:`dofullsigref`
+; once per integration.  The four input arguments are arrays of
+; uncalibrated spectrum data containers, one element per integration,
+; and integration i of each array is combined with integration i of the
+; other three arrays.  The data from each array are held as a single
+; 2-D (channel x integration) array (see :idl:pro:`getdcdata2d`) and
+; the steps done by :idl:pro:`dototalpower` and :idl:pro:`dosigref` are
+; applied to all integrations at once:
+;
+; * The total power in each pair is the average of the cal-on and
+;   cal-off data.  The Tsys of each integration is calculated using
+;   :idl:pro:`meantsys2d`, which is the same model as
+;   :idl:pro:`dcmeantsys`.
+; * The calibrated result is :math:`((sig-ref)/ref) * Tsys_{ref}`.
+; * The exposure of each integration is
+;   :math:`t_{sig} * t_{ref} * smoothref / (t_{sig}+t_{ref} * smoothref)`
+;   where :math:`t_{sig}` and :math:`t_{ref}` are the summed cal-on
+;   and cal-off exposures.
+;
+; The results are identical to those from dofullsigref.  No data
+; containers are created or copied here.  The calibrated data are
+; returned as a 2-D array and the header values that dofullsigref
+; would have changed are returned as vectors through the keywords.
+; The caller can then use :idl:pro:`setdcdata2d` to put the result into
+; data containers that have the same header values as the ``sig``
+; data containers (this is what dofullsigref produces).
+;
+; The user can optionally over-ride the reference system temperature
+; by supplying a value for the tsys and tau keywords here, exactly as
+; described in :idl:pro:`dofullsigref`.
+;
+; The units of result is "Ta".  Use :idl:pro:`dcsetunits` to change these
+; units to something else.
+;
+; This is used by :idl:pro:`getps` when the ``batch`` keyword is set.
+; The calling routine is expected to check that the 4 input arrays are
+; compatible (all have the same number of elements and all data
+; containers have the same number of data points).
+;
+; :Params:
+;   result : out, required, type=2-D float array
+;       The calibrated data, [nchan, nint].
+;   sigwcal : in, required, type=spectrum array
+;       Uncalibrated spectra from the signal scan with the cal on.
+;   sig : in, required, type=spectrum array
+;       Uncalibrated spectra from signal scan with the cal off.
+;   refwcal : in, required, type=spectrum array
+;       Uncalibrated spectra from reference scan with the cal on.
+;   ref : in, required, type=spectrum array
+;       Uncalibrated spectra from reference scan with the cal off.
+;   smoothref : in, optional, type=integer
+;       Boxcar smooth width for reference spectra.  No smoothing if not
+;       supplied or if value is less than or equal to 1.
+;
+; :Keywords:
+;   tsys : in, optional, type=float
+;       tsys at zenith, this is converted to a tsys at the observed elevation.
+;       If not suppled, the tsys for each integration is calculated as described
+;       elsewhere.
+;   tau : in, optional, type=float
+;       tau at zenith, if not supplied, it is estimated using :idl:pro:`get_tau`
+;       tau is only used when a user-supplied tsys value at zenith is to be used.
+;   tcal : in, optional, type=float
+;       Cal temperature (K) to use in the Tsys calculation.  If not supplied,
+;       the mean_tcal value from the header of the cal_off switching phase data
+;       in each integration is used.  This must be a scalar, vector tcal is not
+;       yet supported.
+;   retreftsys : out, optional, type=float array
+;       The reference Tsys used for each integration.  This is the tsys
+;       of each calibrated integration.
+;   retsigtsys : out, optional, type=float array
+;       The signal Tsys calculated for each integration. If tsys is
+;       supplied, then retsigtsys is equal to retreftsys.
+;   retexposure : out, optional, type=double array
+;       The exposure of each calibrated integration.
+;   retduration : out, optional, type=double array
+;       The duration of each calibrated integration (sum of the signal
+;       cal-on and cal-off durations).
+;   rettcal : out, optional, type=double array
+;       The tcal used for the signal Tsys of each integration. This is
+;       the mean_tcal of each calibrated integration.
+;
+;-
+pro dobatchsigref,result,sigwcal,sig,refwcal,ref,smoothref,$
+                  tsys=tsys,tau=tau,tcal=tcal,retsigtsys=retsigtsys,retreftsys=retreftsys,$
+                  retexposure=retexposure,retduration=retduration,rettcal=rettcal
+    compile_opt idl2
+
+    nint = n_elements(sig)
+
+    if n_elements(tcal) eq 0 or n_elements(tcal) gt 1 then begin
+        if n_elements(tcal) gt 1 then $
+          message,'Vector tcal is not yet supported, sorry.  Ignoring user-supplied tcal.',/info
+        sigTcal = sig.mean_tcal
+        refTcal = ref.mean_tcal
+    endif else begin
+        sigTcal = replicate(tcal[0],nint)
+        refTcal = sigTcal
+    endelse
+
+    sigOff = getdcdata2d(sig)
+    sigOn = getdcdata2d(sigwcal)
+    refOff = getdcdata2d(ref)
+    refOn = getdcdata2d(refwcal)
+    nchan = (size(sigOff,/dimensions))[0]
+
+    ; tsys values are float in the data containers
+    retsigtsys = float(meantsys2d(sigOff,sigOn,sigTcal))
+    retreftsys = float(meantsys2d(refOff,refOn,refTcal))
+
+    ; ignore float underflows
+    oldExcept=!except
+    !except=0
+    sigData = reform((sigOff + sigOn)/2.0,nchan,nint)
+    refData = reform((refOff + refOn)/2.0,nchan,nint)
+    ; clear them
+    ret=check_math(mask=32)
+    ; reset except state
+    !except=oldExcept
+
+    ; is there a user-supplied tsys
+    if n_elements(tsys) eq 1 then begin
+        ; correct this for elevation of each reference integration
+        if n_elements(tau) eq 0 then begin
+            thistau = fltarr(nint)
+            for i=0L,(nint-1) do thistau[i] = get_tau(ref[i].observed_frequency/1.0e9)
+        endif else begin
+            thistau = tau
+        endelse
+        retreftsys = float(tsys * exp(thistau/sin(ref.elevation)))
+        retsigtsys = retreftsys
+    endif
+
+    nsmooth = 1
+    if n_elements(smoothref) gt 0 then begin
+        if smoothref gt 1 then begin
+            ; smooth along the channel axis only
+            refData = smooth(refData,[smoothref,1],/nan,/edge_truncate)
+            nsmooth = smoothref
+        endif
+    endif
+    result = ((sigData - refData)/refData) * (replicate(1.0,nchan) # retreftsys)
+
+    sigExposure = sig.exposure + sigwcal.exposure
+    refExposure = ref.exposure + refwcal.exposure
+    retexposure = sigExposure*refExposure*nsmooth/(sigExposure+refExposure*nsmooth)
+    retduration = sig.duration + sigwcal.duration
+    rettcal = double(sigTcal)
+end
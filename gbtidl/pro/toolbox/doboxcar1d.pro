@@ -1,19 +1,27 @@
-; docformat = 'rst' 
+; docformat = 'rst'
 
 ;+
 ; Do a boxcar smooth on a 1D array.
 ;
-; This uses the IDL smooth for odd smoothing widths but even widths
-; are handled here since smooth rounds even widths to the next higher
-; integer.  Only 1-d arrays are handled here.
+; This gives the same result as the IDL smooth for odd smoothing
+; widths but even widths are also handled here since smooth rounds
+; even widths to the next higher integer.  For even widths, the box
+; for element i extends from element i-width/2+1 to element
+; i+width/2.
+;
+; The smoothing is done using cumulative sums of the values and of
+; the number of valid (finite) values so that the cost does not depend
+; on the width.  A 2D array is smoothed along the first dimension
+; (e.g. a channel x integration array, see :idl:pro:`getdcdata2d`),
+; each row independently, in one call.
 ;
 ; :Params:
-;   array : in, required, type=1d array
+;   array : in, required, type=1d or 2d array
 ;       The array to be smoothed.
 ;   width : in, required, type=integer
 ;       The width of the boxcar.
-; 
-; 
+;
+;
 ; :Keywords:
 ;   edge_truncate : in, optional, type=boolean
 ;       Same meaning as for smooth.
@@ -33,117 +41,64 @@ function doboxcar1d, array, width, edge_truncate=edge_truncate, nan=nan, missing
 
     if n_elements(array) eq 0 or n_elements(width) eq 0 then message,'array and width must be specified'
 
-    if size(array,/n_dimensions) ne 1 then message,'Only 1d arrays are supported'
-
-    if (width mod 2) eq 1 then begin
-        return, smooth(array,width,edge_truncate=edge_truncate,nan=nan,missing=missing)
-    endif
+    ndim = size(array,/n_dimensions)
+    if ndim lt 1 or ndim gt 2 then message,'Only 1d and 2d arrays are supported'
 
-    nel = n_elements(array)
-    if width lt 0 or width gt nel then message,'Width must be positive and smaller than length of array'
+    nel = (size(array,/dimensions))[0]
+    nrows = (ndim eq 2) ? (size(array,/dimensions))[1] : 1L
+    if width lt 1 or width gt nel then message,'Width must be positive and smaller than length of array'
 
-    count = 0
-    cursum = 0.0d
-    halfwidth = width/2
+    w = long(width)
+    if w eq 1 then return, array
 
     donan = keyword_set(nan)
-    if n_elements(missing) eq 0 then missing = !values.d_nan
-
-    result = array ; make a copy for the output
-
-    istart = halfwidth-1
-    iend = nel-1-halfwidth
-
-    for i=0,(width-1) do begin
-        if (not donan) or finite(array[i]) then begin
-            cursum += array[i]
-            count += 1
-        endif
-    endfor
-    
-    if count gt 0 then begin
-        result[istart] = cursum/count
-    endif else begin
-        result[istart] = missing
-    endelse
-
-    ; remember these for later
-    firstCount = count
-    firstSum = cursum
+    missingValue = (n_elements(missing) gt 0) ? missing : !values.d_nan
+
+    ; the box for element i is i-lo to i+hi
+    hi = w/2
+    lo = w-1-hi
+
+    ; extend each row by copies of the edge values
+    ext = reform(array, nel, nrows)
+    if lo gt 0 then ext = [rebin(ext[0,*],lo,nrows), ext]
+    if hi gt 0 then ext = [ext, rebin(ext[nel+lo-1,*],hi,nrows)]
+
+    valid = finite(ext)
+    nbad = nel*nrows - total(valid[lo:(lo+nel-1),*],/integer)
+    if nbad gt 0 then begin
+        bad = where(valid eq 0)
+        ext[bad] = 0.0
+    endif
 
-    togo = istart-halfwidth+1
-    next = togo + width
-    for i=istart+1,iend do begin
-        if (not donan) or finite(array[togo]) then begin
-            cursum -= array[togo]
-            count -= 1
-        endif
-        if (not donan) or finite(array[next]) then begin
-            cursum += array[next]
-            count += 1
-        endif
-        if count gt 0 then begin
-            result[i] = cursum/count
-        endif else begin
-            result[i] = missing
-        endelse
-        togo += 1
-        next += 1
-    endfor
+    ; box sums from the cumulative sums along the first dimension
+    sums = total(ext,1,/cumulative,/double)
+    boxSum = sums[(w-1):*,*]
+    boxSum[1:*,*] -= sums[0:(nel-2),*]
 
-    ; and the end channels
+    counts = total(valid,1,/cumulative,/integer)
+    boxCount = counts[(w-1):*,*]
+    boxCount[1:*,*] -= counts[0:(nel-2),*]
 
-    if keyword_set(edge_truncate) then begin
-        ; high element edge, just keep going,
-        ; adding in edges until the end is reached
-        endok = (not donan) or finite(array[nel-1])
-        for i=iend+1,(nel-1) do begin
-            if (not donan) or finite(array[togo]) then begin
-                cursum -= array[togo]
-                count -= 1
-            endif
-            if (endok) then begin
-                cursum += array[nel-1]
-                count += 1
-            endif
-            if count gt 0 then begin
-                result[i] = cursum/count
-            endif else begin
-                result[i] = missing
-            endelse
-            togo += 1
-        endfor
-            
-        ; work backwards from the start, adding in 
-        ; copies of the edge as necessary
-        zerook = (not donan) or finite(array[0])
-        togo = width-1
-        cursum = firstSum
-        count = firstCount
-        for i=(istart-1),0,-1 do begin
-            if (not donan) or finite(array[togo]) then begin
-                cursum -= array[togo]
-                count -= 1
-            endif
-            if (zerook) then begin
-                cursum += array[0]
-                count += 1
-            endif
-            if count gt 0 then begin
-                result[i] = cursum/count
-            endif else begin
-                result[i] = missing
-            endelse
-            togo -= 1
-        endfor
-        
+    result = reform(array, nel, nrows)
+    if donan then begin
+        good = where(boxCount gt 0, ngood, complement=empty, ncomplement=nempty)
+        if ngood gt 0 then result[good] = boxSum[good] / boxCount[good]
+        if nempty gt 0 then result[empty] = missingValue
     endif else begin
-        if istart gt 0 then begin
-            result[0:(istart-1)] = array[0:(istart)-1]
+        result[*] = boxSum / w
+        ; any non-finite value in the box blanks the result
+        if nbad gt 0 then begin
+            blanked = where(boxCount lt w, nblanked)
+            if nblanked gt 0 then result[blanked] = !values.d_nan
         endif
-        
-        result[(iend+1):(nel-1)] = array[(iend+1):(nel-1)]
     endelse
 
+    if not keyword_set(edge_truncate) then begin
+        ; the end channels are unchanged
+        if lo gt 0 then result[0:(lo-1),*] = array[0:(lo-1),*]
+        if hi gt 0 then result[(nel-hi):(nel-1),*] = array[(nel-hi):(nel-1),*]
+    endif
+
+    if ndim eq 1 then result = reform(result, nel, /overwrite)
     return, result
 end
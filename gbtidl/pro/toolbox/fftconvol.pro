@@ -0,0 +1,154 @@
+; docformat = 'rst'
+
+;+
+; Convolve a 1-D array with a kernel using FFTs.
+;
+; This gives the same result as the IDL CONVOL function (apart from
+; floating point round off) for the subset of the CONVOL keywords
+; used in GBTIDL, but the cost grows as N*log(N) instead of N*M for an
+; N element array and M element kernel.  It is used by
+; :idl:pro:`dcconvol` when the kernel is large, e.g. when
+; :idl:pro:`dcsmooth` smooths to a resolution of many channels.
+;
+; As with CONVOL (with the default CENTER), the kernel is centered on
+; each element and it is not reversed:
+; ``result[t] = total(data[t+i-m/2]*kernel[i])/scale_factor`` where m is
+; the number of elements in the kernel and the sum is over i from 0
+; to m-1.
+;
+; The data is extended at each end before the FFT.  With
+; /edge_truncate the extension repeats the end values, otherwise the
+; first m/2 and the last m/2 elements of the result are set to 0 (as
+; CONVOL does, also when m is even).
+;
+; With /nan, blanked (NaN) values are treated as 0.  If /normalize is
+; also set, each result is divided by the sum of the absolute values of
+; the kernel elements at the non-blanked values instead of by the
+; scale factor.  With /nan, elements where every value under the
+; kernel is blanked are set to the missing value, with or without
+; /normalize, as CONVOL does.  Without /nan, this function should
+; not be used on data with blanked values (each blanked value would
+; blank the entire result), :idl:pro:`dcconvol` uses CONVOL in that case.
+;
+; :Params:
+;   data : in, required, type=array
+;       The 1-D array to convolve.
+;   kernel : in, required, type=array
+;       The kernel.  Must have fewer elements than data.
+;   scale_factor : in, optional, type=real, default=1
+;       The scale factor.  Ignored if /normalize is set.
+;
+; :Keywords:
+;   nan : in, optional, type=boolean
+;       Treat NaN values as missing data.
+;   edge_truncate : in, optional, type=boolean
+;       Repeat the end values beyond the ends of the data.
+;   normalize : in, optional, type=boolean
+;       Normalize by the sum of the absolute values of the kernel
+;       elements used at each element.
+;   missing : in, optional, type=real, default=NaN
+;       The value of result elements where no valid data was available
+;       (only used when /nan is set).
+;
+; :Returns:
+;   the convolved array, the same size as data.  Float unless data or
+;   kernel is double.
+;
+;-
+function fftconvol, data, kernel, scale_factor, nan=nan, edge_truncate=edge_truncate, $
+                    normalize=normalize, missing=missing
+    compile_opt idl2
+
+    n = n_elements(data)
+    m = n_elements(kernel)
+    if m lt 1 or m ge n then begin
+        message,'kernel must have at least 1 element and < the number of elements in the data',/info
+        return, -1
+    endif
+
+    isDouble = size(data,/type) eq 5 or size(kernel,/type) eq 5
+    missingValue = (n_elements(missing) gt 0) ? missing : !values.d_nan
+
+    ; extend the data so that every result element is a full
+    ; (non-wrapped) correlation.
+    left = m/2
+    right = m-1-left
+    ext = isDouble ? dblarr(n+m-1) : fltarr(n+m-1)
+    ext[left] = data
+    if keyword_set(edge_truncate) then begin
+        if left gt 0 then ext[0:(left-1)] = data[0]
+        if right gt 0 then ext[(left+n):*] = data[n-1]
+    endif
+
+    if keyword_set(nan) then begin
+        valid = finite(ext)
+        ; outside of the data counts as valid only when edge truncating
+        if not keyword_set(edge_truncate) then begin
+            if left gt 0 then valid[0:(left-1)] = 0
+            if right gt 0 then valid[(left+n):*] = 0
+        endif
+        blanked = where(valid eq 0 and finite(ext) eq 0, nblanked)
+        if nblanked gt 0 then ext[blanked] = 0.0
+    endif
+
+    ; the FFT size, the smallest 2^a*3^b*5^c >= the extended size
+    next = n_elements(ext)
+    nfft = 2LL^ceil(alog(double(next))/alog(2d))
+    p3 = 1LL
+    while p3 lt nfft do begin
+        p35 = p3
+        while p35 lt nfft do begin
+            cand = p35 * 2LL^(ceil(alog(double(next)/p35)/alog(2d)) > 0)
+            if cand lt nfft then nfft = cand
+            p35 *= 5
+        endwhile
+        p3 *= 3
+    endwhile
+
+    padded = isDouble ? dblarr(nfft) : fltarr(nfft)
+    padded[0] = ext
+    kpad = isDouble ? dblarr(nfft) : fltarr(nfft)
+    kpad[0] = kernel
+    kfft = conj(fft(kpad,-1))
+
+    ; IDL's forward FFT includes 1/nfft, restore it for the product
+    result = real_part(fft(fft(padded,-1)*kfft,1)) * nfft
+    result = result[0:(n-1)]
+
+    if keyword_set(nan) then begin
+        ; exact count of the valid elements under the kernel
+        nvalid = total([0L,long(valid)],/cumulative,/integer)
+        nvalid = nvalid[m:(n+m-1)] - nvalid[0:(n-1)]
+    endif
+
+    if keyword_set(normalize) then begin
+        if keyword_set(nan) then begin
+            ; weights of the valid elements under the kernel
+            vpad = isDouble ? dblarr(nfft) : fltarr(nfft)
+            vpad[0] = valid
+            kpad[0] = abs(kernel)
+            denom = real_part(fft(fft(vpad,-1)*conj(fft(kpad,-1)),1)) * nfft
+            denom = denom[0:(n-1)]
+            result = result / denom
+        endif else begin
+            result = result / total(abs(kernel))
+        endelse
+    endif else begin
+        if n_elements(scale_factor) gt 0 then result = result / scale_factor
+    endelse
+
+    if keyword_set(nan) then begin
+        empty = where(nvalid eq 0, nempty)
+        if nempty gt 0 then result[empty] = missingValue
+    endif
+
+    ; as CONVOL, the first m/2 and the last m/2 elements are 0
+    if not keyword_set(edge_truncate) then begin
+        if left gt 0 then begin
+            result[0:(left-1)] = 0.0
+            result[(n-left):*] = 0.0
+        endif
+    endif
+
+    return, result
+end
@@ -0,0 +1,35 @@
+; docformat = 'rst'
+
+;+
+; Construct one sorted column of a find index (see
+; :idl:pro:`get_find_index`).
+;
+; The values are kept in their original (index row) order along with
+; the sort order, the sorted unique values and, for each unique value,
+; the position in the sorted order where that value first appears.
+; Every row having the unique value ``uniq[j]`` is then found in
+; ``order[starts[j]:starts[j+1]-1]`` and a value or range can be located
+; by a binary search of the unique values (see :idl:pro:`query_find_index`).
+;
+; :Params:
+;   values : in, required, type=long or string array
+;       The column values, one per index row.
+;
+; :Returns:
+;   structure with fields values, order, uniq and starts.
+;
+;-
+function find_index_column, values
+    compile_opt idl2
+
+    nrows = n_elements(values)
+    order = sort(values)
+    sorted = values[order]
+    ; last element of each run of equal values
+    lastInRun = uniq(sorted)
+    starts = lonarr(n_elements(lastInRun)+1)
+    if n_elements(lastInRun) gt 1 then starts[1] = lastInRun[0:(n_elements(lastInRun)-2)] + 1
+    starts[n_elements(lastInRun)] = nrows
+
+    return, {values:values, order:long(order), uniq:sorted[lastInRun], starts:starts}
+end
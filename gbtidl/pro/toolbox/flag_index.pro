@@ -0,0 +1,144 @@
+; docformat = 'rst'
+
+;+
+; Construct an index of a set of flag rules so that the rules that
+; apply to a given spectrum can be found without looking at every
+; rule.
+;
+; Each rule has a range of scans, an optional range of integrations,
+; optional plnum, ifnum and fdnum values and a range of channels,
+; the same information that :idl:pro:`flag` records.  Looking at every
+; rule for every spectrum read is expensive when a project has many
+; thousands of rules.  Here the scan ranges are put into a centered
+; interval tree (stored in arrays, see below) so that the rules whose
+; scan range contains a given scan are found in about log2(nrules)
+; steps.  The few rules found are then checked against the rest of
+; the selection.  Use :idl:pro:`flag_mask` to find the flagged
+; channels of a data container using the index.
+;
+; Each node of the tree has a center scan and the rules whose scan
+; range contains that center.  Those rules are kept twice, sorted by
+; the first scan and sorted by the last scan, so that the rules
+; containing any scan below (above) the center are a leading part of
+; one of those lists, found with a single value_locate.  Rules
+; entirely below (above) the center are in the left (right) subtree.
+;
+; :Params:
+;   rules : in, required, type=structure array
+;       The flag rules, one element per rule, with these fields.
+;
+;       * scan : [first,last] scan numbers
+;       * intnum : [first,last] integration numbers, [-1,-1] for all
+;       * plnum : the plnum, -1 for all
+;       * ifnum : the ifnum, -1 for all
+;       * fdnum : the fdnum, -1 for all
+;       * bchan : the first channel flagged
+;       * echan : the last channel flagged, -1 for the last channel
+;       * idstring : the flag id string
+;
+; :Returns:
+;   structure holding the rules and the tree, for use by
+;   :idl:pro:`flag_mask`, or -1 on error.
+;
+; :Examples:
+;
+;   .. code-block:: IDL
+;
+;       r = replicate({scan:[0L,0L], intnum:[-1L,-1L], plnum:-1L, ifnum:-1L, $
+;                      fdnum:-1L, bchan:0L, echan:-1L, idstring:''}, 2)
+;       r[0].scan = [10,20] & r[0].bchan = 100 & r[0].echan = 120
+;       r[1].scan = [15,15] & r[1].ifnum = 1 & r[1].idstring = 'RFI'
+;       fi = flag_index(r)
+;       mask = flag_mask(fi, !g.s[0])
+;
+;-
+function flag_index, rules
+    compile_opt idl2
+
+    if size(rules,/type) ne 8 then begin
+        message, 'rules must be an array of structures', /info
+        return, -1
+    endif
+
+    nrules = n_elements(rules)
+    scans = reform(long(rules.scan), 2, nrules)
+    lo = reform(scans[0,*], nrules)
+    hi = reform(scans[1,*], nrules)
+    swapped = where(hi lt lo, nswapped)
+    if nswapped gt 0 then begin
+        tmp = lo[swapped]
+        lo[swapped] = hi[swapped]
+        hi[swapped] = tmp
+    endif
+
+    ; every node holds at least one rule, so there are at most nrules nodes
+    center = lonarr(nrules)
+    left = lonarr(nrules) - 1
+    right = lonarr(nrules) - 1
+    first = lonarr(nrules)
+    count = lonarr(nrules)
+    byLo = lonarr(nrules)
+    byHi = lonarr(nrules)
+
+    ; build without recursion, each stack entry is a node number and
+    ; the rules it is to be built from
+    stackNode = lonarr(nrules)
+    stackRules = ptrarr(nrules)
+    stackRules[0] = ptr_new(lindgen(nrules))
+    nstack = 1L
+    nnodes = 1L
+    nstored = 0L
+    while nstack gt 0 do begin
+        nstack -= 1
+        node = stackNode[nstack]
+        ids = *stackRules[nstack]
+        ptr_free, stackRules[nstack]
+
+        ; the first scan of the median rule, by first scan
+        theseLo = lo[ids]
+        theseHi = hi[ids]
+        c = (theseLo[sort(theseLo)])[n_elements(ids)/2]
+        center[node] = c
+
+        inNode = where(theseLo le c and theseHi ge c, nin)
+        nodeIds = ids[inNode]
+        first[node] = nstored
+        count[node] = nin
+        byLo[nstored:(nstored+nin-1)] = nodeIds[sort(lo[nodeIds])]
+        byHi[nstored:(nstored+nin-1)] = nodeIds[reverse(sort(hi[nodeIds]))]
+        nstored += nin
+
+        below = where(theseHi lt c, nbelow)
+        if nbelow gt 0 then begin
+            left[node] = nnodes
+            stackNode[nstack] = nnodes
+            stackRules[nstack] = ptr_new(ids[below])
+            nstack += 1
+            nnodes += 1
+        endif
+        above = where(theseLo gt c, nabove)
+        if nabove gt 0 then begin
+            right[node] = nnodes
+            stackNode[nstack] = nnodes
+            stackRules[nstack] = ptr_new(ids[above])
+            nstack += 1
+            nnodes += 1
+        endif
+    endwhile
+
+    intnum = reform(long(rules.intnum), 2, nrules)
+    echan = reform(long(rules.echan), nrules)
+
+    return, {nrules:nrules, $
+             scanlo:lo, scanhi:hi, $
+             intlo:reform(intnum[0,*], nrules), inthi:reform(intnum[1,*], nrules), $
+             plnum:reform(long(rules.plnum), nrules), $
+             ifnum:reform(long(rules.ifnum), nrules), $
+             fdnum:reform(long(rules.fdnum), nrules), $
+             bchan:reform(long(rules.bchan), nrules), echan:echan, $
+             idstring:reform(string(rules.idstring), nrules), $
+             center:center[0:(nnodes-1)], left:left[0:(nnodes-1)], $
+             right:right[0:(nnodes-1)], first:first[0:(nnodes-1)], $
+             count:count[0:(nnodes-1)], $
+             byLo:byLo, loSorted:lo[byLo], byHi:byHi, negHiSorted:-hi[byHi]}
+end
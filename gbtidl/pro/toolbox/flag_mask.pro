@@ -0,0 +1,165 @@
+; docformat = 'rst'
+
+;+
+; Find the channels of a spectrum data container that are flagged by
+; a set of flag rules indexed by :idl:pro:`flag_index`.
+;
+; The rules whose scan range contains the scan number of the data
+; container are found by walking the interval tree from the root,
+; taking a leading part of each node's sorted rules (one
+; value_locate per node) until the node whose center is the scan
+; number, or a leaf, is reached.  Only those rules are then checked
+; against the integration, plnum, ifnum and fdnum of the data
+; container and the useflag or skipflag selection of flag ids.  The
+; channel ranges of the matching rules are combined by histogramming
+; their first channels and the channels after their last channels and
+; taking the running total, so overlapping ranges cost nothing extra.
+;
+; :Params:
+;   findex : in, required, type=structure
+;       The flag index, as returned by :idl:pro:`flag_index`.
+;   dc : in, required, type=spectrum data container
+;       The data container to check.  The scan_number, integration,
+;       polarization_num, if_number and feed_num fields are used.
+;
+; :Keywords:
+;   nmatch : out, optional, type=long
+;       The number of rules that apply to this data container.
+;   rules : out, optional, type=long array
+;       The indices (into the rules given to :idl:pro:`flag_index`) of
+;       the rules that apply, -1 if there are none.
+;   apply : in, optional, type=boolean
+;       When set, the flagged channels of dc are set to NaN (blanked).
+;   useflag : in, optional, type=boolean or string
+;       Apply all or just some of the flag rules?  As for
+;       :idl:pro:`getps`, the default is /useflag (all rules).  When
+;       this is a string or array of strings, only the rules with one
+;       of those idstring values are used.
+;   skipflag : in, optional, type=boolean or string
+;       Do not apply any or do not apply a few of the flag rules?  When
+;       set (/skipflag) no rules are used.  When this is a string or
+;       array of strings, all rules except those with one of those
+;       idstring values are used.  It is an error to use both useflag
+;       and skipflag.
+;
+; :Returns:
+;   byte array with one element per channel, 1 where the channel is
+;   flagged, or -1 on error.
+;
+; :Examples:
+;
+;   .. code-block:: IDL
+;
+;       fi = flag_index(r)
+;       get, scan=15, ifnum=1
+;       mask = flag_mask(fi, !g.s[0], nmatch=n, /apply)
+;       print, n, total(mask)
+;
+; :Uses:
+;   :idl:pro:`data_valid`
+;
+;-
+function flag_mask, findex, dc, nmatch=nmatch, rules=rules, apply=apply, $
+                    useflag=useflag, skipflag=skipflag
+    compile_opt idl2
+
+    nmatch = 0L
+    rules = -1L
+    if size(findex,/type) ne 8 then begin
+        message, 'findex must be a flag index from flag_index', /info
+        return, -1
+    endif
+    if data_valid(dc, name=name) le 0 then begin
+        message, 'invalid or empty data container', /info
+        return, -1
+    endif
+    if name ne 'SPECTRUM_STRUCT' then begin
+        message, 'dc must be a spectrum data container', /info
+        return, -1
+    endif
+
+    if n_elements(useflag) gt 0 and n_elements(skipflag) gt 0 then begin
+        message, 'Flag and skipflag can not be used at the same time', /info
+        return, -1
+    endif
+
+    nchan = n_elements(*dc.data_ptr)
+    mask = bytarr(nchan)
+    if size(skipflag,/type) ne 7 and keyword_set(skipflag) then return, mask
+    if size(useflag,/type) ne 7 and n_elements(useflag) gt 0 and not keyword_set(useflag) then return, mask
+    x = dc.scan_number
+
+    ; rules whose scan range contains x
+    cand = lonarr(findex.nrules)
+    ncand = 0L
+    node = 0L
+    while node ge 0 do begin
+        f = findex.first[node]
+        n = findex.count[node]
+        c = findex.center[node]
+        if x lt c then begin
+            k = value_locate(findex.loSorted[f:(f+n-1)], x) + 1
+            if k gt 0 then begin
+                cand[ncand:(ncand+k-1)] = findex.byLo[f:(f+k-1)]
+                ncand += k
+            endif
+            node = findex.left[node]
+        endif else if x gt c then begin
+            k = value_locate(findex.negHiSorted[f:(f+n-1)], -x) + 1
+            if k gt 0 then begin
+                cand[ncand:(ncand+k-1)] = findex.byHi[f:(f+k-1)]
+                ncand += k
+            endif
+            node = findex.right[node]
+        endif else begin
+            cand[ncand:(ncand+n-1)] = findex.byLo[f:(f+n-1)]
+            ncand += n
+            node = -1L
+        endelse
+    endwhile
+    if ncand eq 0 then return, mask
+    cand = cand[0:(ncand-1)]
+
+    ; the flag ids selected by useflag or skipflag
+    byId = size(useflag,/type) eq 7
+    if byId or size(skipflag,/type) eq 7 then begin
+        idList = byId ? useflag : skipflag
+        ids = strtrim(findex.idstring[cand],2)
+        inList = bytarr(ncand)
+        for j=0,(n_elements(idList)-1) do inList or= (ids eq strtrim(idList[j],2))
+        keepIds = byId ? where(inList, ncand) : where(inList eq 0, ncand)
+        if ncand eq 0 then return, mask
+        cand = cand[keepIds]
+    endif
+
+    ; the rest of the selection, -1 matches everything
+    intlo = findex.intlo[cand]
+    inthi = findex.inthi[cand]
+    plnum = findex.plnum[cand]
+    ifnum = findex.ifnum[cand]
+    fdnum = findex.fdnum[cand]
+    ok = where((intlo lt 0 or (dc.integration ge intlo and dc.integration le inthi)) and $
+               (plnum lt 0 or plnum eq dc.polarization_num) and $
+               (ifnum lt 0 or ifnum eq dc.if_number) and $
+               (fdnum lt 0 or fdnum eq dc.feed_num), nmatch)
+    if nmatch eq 0 then return, mask
+    rules = cand[ok]
+
+    bchan = findex.bchan[rules] > 0
+    echan = findex.echan[rules]
+    last = where(echan lt 0 or echan ge nchan, nlast)
+    if nlast gt 0 then echan[last] = nchan - 1
+    use = where(bchan le echan and bchan lt nchan, nuse)
+    if nuse gt 0 then begin
+        starts = histogram(bchan[use], min=0, max=nchan)
+        stops = histogram(echan[use]+1, min=0, max=nchan)
+        mask = byte((total(starts - stops, /cumulative, /integer))[0:(nchan-1)] gt 0)
+    endif
+
+    if keyword_set(apply) then begin
+        flagged = where(mask, nflagged)
+        if nflagged gt 0 then (*dc.data_ptr)[flagged] = !values.f_nan
+    endif
+
+    return, mask
+end
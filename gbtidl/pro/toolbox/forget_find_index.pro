@@ -0,0 +1,36 @@
+; docformat = 'rst'
+
+;+
+; Forget the find index kept for an io object (see
+; :idl:pro:`get_find_index`) so that it is constructed again the next
+; time it is needed.
+;
+; This is used after a change to the data behind an io object that
+; may not change the number of rows in its index, e.g. when
+; :idl:pro:`nsave` overwrites a spectrum in the output file.
+;
+; :Params:
+;   io : in, required, type=io object
+;       The io object (e.g. ``!g.lineoutio``).
+;
+;-
+pro forget_find_index, io
+    compile_opt idl2
+    common find_index_common, fi_ios, fi_indexes
+
+    if not obj_valid(io) or n_elements(fi_ios) eq 0 then return
+    slot = (where(fi_ios eq io, nslot))[0]
+    if nslot eq 0 then return
+
+    fidxOld = *fi_indexes[slot]
+    ptr_free, fidxOld.cols
+    ptr_free, fi_indexes[slot]
+    if n_elements(fi_ios) gt 1 then begin
+        others = where(lindgen(n_elements(fi_ios)) ne slot)
+        fi_ios = fi_ios[others]
+        fi_indexes = fi_indexes[others]
+    endif else begin
+        fi_ios = objarr(1)
+        fi_indexes = ptrarr(1)
+    endelse
+end
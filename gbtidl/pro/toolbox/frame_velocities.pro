@@ -0,0 +1,206 @@
+; docformat = 'rst'
+
+;+
+; Computes the projected velocity of the telescope wrt the same six
+; coordinate systems as :idl:pro:`chdoppler` (geo, helio, bary, lsrk,
+; lsrd, gal) for many pointings and times at once.
+;
+; The result is the same as chdoppler, apart from the interpolation
+; described here, but it is much faster for large numbers of
+; integrations.  Most of the time in chdoppler is spent getting the
+; velocity of the Earth's center wrt the sun and the solar system
+; barycenter (baryvel), once for every time.  Those velocities do not
+; depend on the pointing direction, and they change slowly and
+; smoothly.  Here they are tabulated on a regular time grid (0.02 day
+; by default), the grid values are cached and reused for all later
+; times that fall in the same grid intervals, and the values at each
+; time are interpolated linearly from the grid.  The interpolation
+; error grows as the square of the step, mostly from the curvature of
+; the Earth's orbit: about 0.5 mm/s for the default step and about
+; 1 cm/s for a 0.1 day step.  The solar motions (lsrk, lsrd and gal)
+; are constant and are also computed just once.  The projection on to
+; each pointing direction and the Earth spin term are done for all
+; of the inputs at once.
+;
+; :Params:
+;   ra : in, required, type=double
+;       The source ra in decimal hours, equinox 2000
+;   dec : in, required, type=double
+;       The source dec in decimal degrees, equinox 2000
+;   julday : in, required, type=double
+;       The julian day
+;
+; :Keywords:
+;   obspos : in, optional, type=double
+;       observatory position [East longitude, latitude] in degrees.
+;       Either a 2 element vector used for all inputs or a [2,n] array
+;       giving the position for each input.  Uses the GBT position if
+;       not specified.  As in chdoppler, a position that is all zeros
+;       (e.g. an unset site_location) is taken as not specified.
+;   light : in, optional, type=boolean
+;       When set, returns the velocity as a fraction of c
+;   exact : in, optional, type=boolean
+;       When set, baryvel is used at each time, as in chdoppler, with
+;       no interpolation (the constant terms are still cached).
+;   step : in, optional, type=double, default=0.02
+;       The time grid spacing in days.  Changing this clears the cache.
+;
+; :Returns:
+;   The velocity in km/s, or as a faction of c if the keyword /light
+;   is specified.  The result is a [6,n] array (a 6 element vector
+;   for a single input) whose first dimension is [geo, helio, bary,
+;   lsrk, lsrd, gal].
+;
+; :Examples:
+;
+;   .. code-block:: IDL
+;
+;       ; every integration in a chunk
+;       v = frame_velocities(dcs.longitude_axis/15.0d, dcs.latitude_axis, $
+;                            dcs.mjd+2400000.5d)
+;
+; :Uses:
+;   `baryvel <https://asd.gsfc.nasa.gov/archive/idlastro/ftp/pro/astro/baryvel.pro>`_
+;   `precess <https://asd.gsfc.nasa.gov/archive/idlastro/ftp/pro/astro/precess.pro>`_
+;   :idl:pro:`juldaytolmst`
+;   :idl:pro:`shiftvel`
+;
+;-
+function frame_velocities, ra, dec, julday, obspos=obspos, light=light, exact=exact, step=step
+    compile_opt idl2
+    common frame_velocities_common, fv_step, fv_nodes, fv_vh, fv_vb, fv_vsun
+
+    nin = n_elements(ra)
+    if n_elements(dec) ne nin or n_elements(julday) ne nin then $
+        message, 'ra, dec and julday must have the same number of elements'
+
+    ; Default to GBT if obspos not provided.
+    gbtlong = -(79.D + 50.D/60.D + 23.3988D/3600.D)
+    gbtlat = (38.D + 25.D/60.D + 59.2284D/3600.D)
+    if n_elements(obspos) eq 0 then begin
+        obslong = gbtlong
+        obslat = gbtlat
+    endif else begin
+        obslong = reform(double(obspos[0,*]))
+        obslat = reform(double(obspos[1,*]))
+        ; an all zero position was not provided
+        unset = where(obslong eq 0.0d and obslat eq 0.0d, nunset)
+        if nunset gt 0 then begin
+            obslong[unset] = gbtlong
+            obslat[unset] = gbtlat
+        endif
+        if n_elements(obslong) eq 1 then begin
+            obslong = obslong[0]
+            obslat = obslat[0]
+        endif
+    endelse
+
+    thisStep = (n_elements(step) gt 0) ? double(step) : 0.02d
+    if n_elements(fv_step) eq 0 then fv_step = thisStep
+    if fv_step ne thisStep then begin
+        fv_step = thisStep
+        fv_nodes = 0
+        tmp = temporary(fv_nodes)
+    endif
+
+    ; the constant velocities of the sun wrt lsrk, lsrd and gal, as
+    ; defined in chdoppler
+    if n_elements(fv_vsun) eq 0 then begin
+        ralsrk_rad= 2.d*!pi*18.d/24.d
+        declsrk_rad= !dtor*30.d
+        precess, ralsrk_rad, declsrk_rad, 1900.d, 2000.d,/radian
+        ralsrd_rad= 2.d*!dpi*(17.D + 49.D/60.D + 58.7D/3600.D)/24.d
+        declsrd_rad= !dtor*(28.D + 07.D/60.D + 04.0D/3600.D)
+        ragal_rad = 2.d*!dpi*(21.D + 12.D/60.D + 01.1D/3600.D)/24.d
+        decgal_rad = !dtor*(48.D + 19.D/60.D + 47.D/3600.D)
+        fv_vsun = dblarr(3,3)
+        fv_vsun[*,0] = 20.d * [cos(declsrk_rad)*cos(ralsrk_rad), cos(declsrk_rad)*sin(ralsrk_rad), sin(declsrk_rad)]
+        fv_vsun[*,1] = 16.6D * [cos(declsrd_rad)*cos(ralsrd_rad), cos(declsrd_rad)*sin(ralsrd_rad), sin(declsrd_rad)]
+        fv_vsun[*,2] = 220.D * [cos(decgal_rad)*cos(ragal_rad), cos(decgal_rad)*sin(ragal_rad), sin(decgal_rad)]
+    endif
+
+    jd = reform(double(julday), nin)
+    rasource = reform(double(ra), nin)*15.d*!dtor
+    decsource = reform(double(dec), nin)*!dtor
+    xxsource = dblarr(3, nin)
+    xxsource[0,*] = cos(decsource) * cos(rasource)
+    xxsource[1,*] = cos(decsource) * sin(rasource)
+    xxsource[2,*] = sin(decsource)
+
+    ; velocity of the earth center wrt the sun and the barycenter
+    vvorbit = dblarr(3, nin)
+    velb = dblarr(3, nin)
+    if keyword_set(exact) then begin
+        for nr=0L,(nin-1) do begin
+            baryvel, jd[nr], 2000., vh, vb
+            vvorbit[*,nr] = vh
+            velb[*,nr] = vb
+        endfor
+    endif else begin
+        ; grid nodes needed, each time falls between nodes k and k+1
+        k = floor(jd/fv_step, /l64)
+        needed = [k, k+1]
+        needed = needed[uniq(needed, sort(needed))]
+        if n_elements(fv_nodes) gt 0 then begin
+            pos = value_locate(fv_nodes, needed) > 0
+            missingNodes = where(fv_nodes[pos] ne needed, nmissing)
+        endif else begin
+            missingNodes = lindgen(n_elements(needed))
+            nmissing = n_elements(needed)
+        endelse
+        if nmissing gt 0 then begin
+            newNodes = needed[missingNodes]
+            newVh = dblarr(3, nmissing)
+            newVb = dblarr(3, nmissing)
+            for i=0L,(nmissing-1) do begin
+                baryvel, newNodes[i]*fv_step, 2000., vh, vb
+                newVh[*,i] = vh
+                newVb[*,i] = vb
+            endfor
+            if n_elements(fv_nodes) gt 0 then begin
+                fv_nodes = [fv_nodes, newNodes]
+                fv_vh = [[fv_vh], [newVh]]
+                fv_vb = [[fv_vb], [newVb]]
+            endif else begin
+                fv_nodes = newNodes
+                fv_vh = newVh
+                fv_vb = newVb
+            endelse
+            order = sort(fv_nodes)
+            fv_nodes = fv_nodes[order]
+            fv_vh = fv_vh[*,order]
+            fv_vb = fv_vb[*,order]
+        endif
+
+        k0 = value_locate(fv_nodes, k)
+        frac = jd/fv_step - k
+        for j=0,2 do begin
+            vvorbit[j,*] = fv_vh[j,k0] + (fv_vh[j,k0+1] - fv_vh[j,k0])*frac
+            velb[j,*] = fv_vb[j,k0] + (fv_vb[j,k0+1] - fv_vb[j,k0])*frac
+        endfor
+    endelse
+
+    ; projections on to the source directions
+    pvorbit_helio = total(vvorbit*xxsource, 1)
+    pvorbit_bary = total(velb*xxsource, 1)
+    pvlsrk = reform(matrix_multiply(fv_vsun[*,0], xxsource, /atranspose), nin)
+    pvlsrd = reform(matrix_multiply(fv_vsun[*,1], xxsource, /atranspose), nin)
+    pvgal = reform(matrix_multiply(fv_vsun[*,2], xxsource, /atranspose), nin)
+
+    ; earth spin, as in chdoppler
+    lst_mean = 24.d/(2.d*!pi)*juldaytolmst(jd, obslong=obslong)
+    pvspin = -0.465* cos(!dtor*obslat) * cos(decsource) * $
+             sin((lst_mean - reform(double(ra), nin))* 15.* !dtor)
+
+    vtotal = dblarr(6, nin)
+    vtotal[0,*] = -pvspin
+    vtotal[1,*] = shiftvel(-pvspin,-pvorbit_helio)
+    vtotal[2,*] = shiftvel(-pvspin,-pvorbit_bary)
+    vtotal[3,*] = shiftvel(reform(vtotal[2,*]),-pvlsrk)
+    vtotal[4,*] = shiftvel(reform(vtotal[2,*]),-pvlsrd)
+    vtotal[5,*] = shiftvel(reform(vtotal[4,*]),-pvgal)
+
+    if keyword_set(light) then vtotal = vtotal/(!gc.light_speed*1.d3)
+
+    return, vtotal
+end
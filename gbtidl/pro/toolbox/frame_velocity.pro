@@ -1,8 +1,14 @@
 ; docformat = 'rst'
 
 ;+
-; Toolbox front-end to chdoppler.  Get the velocity of a given frame
-; relative to another frame.
+; Toolbox front-end to :idl:pro:`frame_velocities` (equivalent to
+; chdoppler).  Get the velocity of a given frame relative to another
+; frame.
+;
+; data may be an array of data containers, in which case the
+; velocities for all of them are computed together and an array of
+; velocities is returned.  This is much faster than using this
+; function on each data container in turn.
 ;
 ; Recognized frames:
 ; 
@@ -27,8 +33,8 @@
 ; 
 ; :Params:
 ;   data : in, required, type=spectrum
-;       Data container to get pointing direction, time, and telescope 
-;       location from.
+;       Data container (or array of data containers) to get pointing 
+;       direction, time, and telescope location from.
 ;
 ;   toframe : in, required, type=string
 ;       The desired frame.
@@ -52,11 +58,14 @@
 ;
 ; :Returns:
 ;   Velocity difference between fromframe and toframe along the line of sight 
-;   implied by the data header.
+;   implied by the data header.  An array with one value for each data
+;   container when data is an array.
 ;
 ; :Uses:
-;   :idl:pro:`chdoppler`
+;   :idl:pro:`frame_velocities`
 ;   :idl:pro:`decode_veldef`
+;   :idl:pro:`galtoeq`
+;   :idl:pro:`getradec`
 ;
 ;-
 function frame_velocity, data, toframe, fromframe, bootstrap=bootstrap, status=status
@@ -71,93 +80,105 @@ function frame_velocity, data, toframe, fromframe, bootstrap=bootstrap, status=s
         return,0.0
     endif
 
-    result = 0.0d
+    ndata = n_elements(data)
+    result = (ndata eq 1) ? 0.0d : dblarr(ndata)
 
     if (n_elements(fromframe) eq 0) then fromframe='TOPO'
 
     if (toframe eq fromframe) then return, result
 
     ; frame velocities relative to topo
-    radec = getradec(data,/quiet)
-    frames = chdoppler(radec[0]/15.D, radec[1], $
-                       data.mjd+2400000.5D, obspos=data.site_location[0:1])
-    frames *= 1.d3 ; convert km/s to m/s
+    ; the source positions as getradec gives them, at the equinox of
+    ; each data container.  RADEC needs no conversion and GALACTIC is
+    ; converted for all data containers with the same equinox at once.
+    ra = reform(double(data.longitude_axis), ndata)
+    dec = reform(double(data.latitude_axis), ndata)
+    modes = reform(data.coordinate_mode, ndata)
+    equinox = reform(double(data.equinox), ndata)
+    isGal = where(modes eq 'GALACTIC', ngal)
+    if ngal gt 0 then begin
+        galEquinox = equinox[isGal]
+        low = where(galEquinox lt 1900.0d, nlow)
+        if nlow gt 0 then galEquinox[low] = 2000.0d
+        eqList = galEquinox[uniq(galEquinox, sort(galEquinox))]
+        for e=0L,(n_elements(eqList)-1) do begin
+            these = isGal[where(galEquinox eq eqList[e], nthese)]
+            radec = reform(galtoeq(ra[these], dec[these], eqList[e]), 2, nthese)
+            ra[these] = reform(radec[0,*])
+            dec[these] = reform(radec[1,*])
+        endfor
+    endif
+    others = where((modes ne 'RADEC' or equinox lt 1900.0d) and modes ne 'GALACTIC', nothers)
+    for i=0L,(nothers-1) do begin
+        radec = getradec(data[others[i]],/quiet)
+        ra[others[i]] = radec[0]
+        dec[others[i]] = radec[1]
+    endfor
+    frames = frame_velocities(ra/15.D, dec, data.mjd+2400000.5D, $
+                              obspos=data.site_location[0:1])
+    frames = reform(frames, 6, ndata) * 1.d3 ; convert km/s to m/s
+
+    frameNames = ["GEO","HEL","BAR","LSR","LSD","GAL"]
 
     ; if bootstraping, try and calibrate the frames values
-    boot_velocity = 0.0D
-    boot_frame = 'TOPO'
     if (keyword_set(bootstrap)) then begin
-        if (not decode_veldef(data.velocity_definition, v_def, v_frame)) then begin
-            status = 0
-            message,"Problems deciphering data.velocity_definition, velocities may be wrong",/info
-        endif
-        boot_frame = v_frame
         boot_velocity = data.frame_velocity
+        offset = dblarr(ndata)
+        isBoot = bytarr(ndata)
+        for i=0L,(ndata-1) do begin
+            if (not decode_veldef(data[i].velocity_definition, v_def, v_frame)) then begin
+                status = 0
+                message,"Problems deciphering data.velocity_definition, velocities may be wrong",/info
+            endif
+            isBoot[i] = (fromframe eq "TOPO" and toframe eq v_frame)
 
-        if (fromframe eq "TOPO" and toframe eq boot_frame) then return, boot_velocity
-
-       ; any difference is assumed to come from Earth's rotation
-       ;    - common to all frames
-        offset=0.0D
-        case boot_frame of
-            "GEO": offset = shiftvel(frames[0],-boot_velocity,veldef='TRUE')
-            "HEL": offset = shiftvel(frames[1],-boot_velocity,veldef='TRUE')
-            "BAR": offset = shiftvel(frames[2],-boot_velocity,veldef='TRUE')
-            "LSR": offset = shiftvel(frames[3],-boot_velocity,veldef='TRUE')
-            "LSD": offset = shiftvel(frames[4],-boot_velocity,veldef='TRUE')
-            "GAL": offset = shiftvel(frames[5],-boot_velocity,veldef='TRUE')
-           else: offset = 0.0D
-        endcase
+            ; any difference is assumed to come from Earth's rotation
+            ;    - common to all frames
+            k = (where(frameNames eq v_frame))[0]
+            if k ge 0 then offset[i] = shiftvel(frames[k,i],-boot_velocity[i],veldef='TRUE')
+        endfor
         ; and add that to all the frame
         ; velocities to get a bootstraped result
-        offset = replicate(offset,n_elements(frames))
-        frames = shiftvel(frames,-offset,veldef='TRUE')
+        frames = shiftvel(frames,-rebin(reform(offset,1,ndata),6,ndata),veldef='TRUE')
     endif
 
-    tovel = 0.0D
+    tovel = dblarr(ndata)
     if (toframe ne "TOPO") then begin
         ; velocity of toframe relative to TOPO
-
-        case toframe of
-            "GEO": tovel=frames[0]
-            "HEL": tovel=frames[1]
-            "BAR": tovel=frames[2]
-            "LSR": tovel=frames[3]
-            "LSD": tovel=frames[4]
-            "GAL": tovel=frames[5]
-            else: begin
-                message, "unrecognized toframe, assuming TOPO",/info
-                message,"toframe = " + toframe, /info
-                toframe = 'TOPO'
-                status = 0
-                tovel=0.0D
-            end
-        endcase
+        k = (where(frameNames eq toframe))[0]
+        if k ge 0 then begin
+            tovel = reform(frames[k,*])
+        endif else begin
+            message, "unrecognized toframe, assuming TOPO",/info
+            message,"toframe = " + toframe, /info
+            toframe = 'TOPO'
+            status = 0
+        endelse
     endif
 
-    fromvel = 0.0D
+    fromvel = dblarr(ndata)
     if (fromframe ne "TOPO") then begin
-            ; velocity of fromframe relative to TOPO
-        
-        case fromframe of
-            "GEO": fromvel=frames[0]
-            "HEL": fromvel=frames[1]
-            "BAR": fromvel=frames[2]
-            "LSR": fromvel=frames[3]
-            "LSD": fromvel=frames[4]
-            "GAL": fromvel=frames[5]
-            else: begin
-                message, "unrecognized fromframe, assuming TOPO",/info
-                message,"fromframe = " + fromframe,/info
-                fromframe = 'TOPO'
-                status = 0
-                fromvel=0.0D
-            end
-        endcase
+        ; velocity of fromframe relative to TOPO
+        k = (where(frameNames eq fromframe))[0]
+        if k ge 0 then begin
+            fromvel = reform(frames[k,*])
+        endif else begin
+            message, "unrecognized fromframe, assuming TOPO",/info
+            message,"fromframe = " + fromframe,/info
+            fromframe = 'TOPO'
+            status = 0
+        endelse
     endif
 
     ; true offset is the full relativistic difference between the two.
     result = shiftvel(tovel,-fromvel,veldef='TRUE')
 
+    ; the frame velocity is used as is to get to its own frame
+    if (keyword_set(bootstrap)) then begin
+        w = where(isBoot, nboot)
+        if nboot gt 0 then result[w] = boot_velocity[w]
+    endif
+
+    if ndata eq 1 then result = result[0]
     return, result
 end
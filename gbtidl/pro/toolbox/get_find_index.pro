@@ -0,0 +1,130 @@
+; docformat = 'rst'
+
+;+
+; Get the typed, sorted find index for an io object.
+;
+; The find index holds the most frequently searched columns of the
+; index of an io object as typed columns (long integers for SCAN, IFNUM,
+; PLNUM, FDNUM and INT, strings for SOURCE, SAMPLER and TIMESTAMP)
+; each with a sorted order (see :idl:pro:`find_index_column`).  It is
+; used by :idl:pro:`query_find_index` to answer range and set queries
+; with binary searches instead of a comparison against every row of
+; the index.
+;
+; The find index is constructed from the io object the first time it
+; is needed and is kept until the io object changes, the number of
+; rows in its index changes (e.g. new data in online mode or a new
+; spectrum in the keep file) or the size or modification time of one
+; of the files behind it changes, at which point it is constructed
+; again.  The files are known for the io objects in ``!g`` (the input,
+; continuum input and output files).  Changes made through GBTIDL that
+; keep the number of rows (e.g. :idl:pro:`nsave` overwriting a
+; spectrum) also use :idl:pro:`forget_find_index`.
+; Columns that are not available for that io object (e.g. PLNUM for
+; continuum data) are omitted.
+;
+; :Params:
+;   io : in, required, type=io object
+;       The io object (e.g. ``!g.lineio``).
+;
+; :Keywords:
+;   rebuild : in, optional, type=boolean
+;       When set, construct the find index even if an up to date one
+;       is available.
+;
+; :Returns:
+;   structure with fields nrows, names, cols and stamp.  cols is an
+;   array of pointers, one per column name.  stamp describes the state
+;   of the files when the find index was constructed.  Returns -1 if the io object has no
+;   data.
+;
+; :Uses:
+;   :idl:pro:`find_index_column`
+;   :idl:pro:`index_cache_key`
+;
+;-
+function get_find_index, io, rebuild=rebuild
+    compile_opt idl2
+    common find_index_common, fi_ios, fi_indexes
+
+    if not obj_valid(io) then return, -1
+    if not io->is_data_loaded() then return, -1
+    nrows = io->get_num_index_rows()
+    if nrows le 0 then return, -1
+
+    ; forget any io objects that have since been destroyed
+    if n_elements(fi_ios) gt 0 then begin
+        alive = where(obj_valid(fi_ios), nalive, complement=dead, ncomplement=ndead)
+        if ndead gt 0 then heap_free, fi_indexes[dead]
+        if nalive gt 0 then begin
+            fi_ios = fi_ios[alive]
+            fi_indexes = fi_indexes[alive]
+        endif else begin
+            fi_ios = objarr(1)
+            fi_indexes = ptrarr(1)
+        endelse
+    endif else begin
+        fi_ios = objarr(1)
+        fi_indexes = ptrarr(1)
+    endelse
+
+    ; the sizes and modification times of the files behind io, so
+    ; that changes that keep the number of rows are also seen
+    stamp = strtrim(nrows,2)
+    name = ''
+    if io eq !g.lineio then begin
+        name = !g.line_filein_name
+    endif else if io eq !g.contio then begin
+        name = !g.cont_filein_name
+    endif else if io eq !g.lineoutio then begin
+        name = !g.line_fileout_name
+    endif
+    if strlen(name) gt 0 then begin
+        key = index_cache_key(name, directory=file_test(name,/directory), count=nfiles, /nohash)
+        if nfiles gt 0 then stamp += ' ' + strjoin(strtrim(key.size,2) + ':' + strtrim(key.mtime,2), ' ')
+    endif
+
+    slot = (where(fi_ios eq io, nslot))[0]
+    if nslot gt 0 and not keyword_set(rebuild) then begin
+        if (*fi_indexes[slot]).nrows eq nrows and (*fi_indexes[slot]).stamp eq stamp then $
+          return, *fi_indexes[slot]
+    endif
+
+    names = ['SCAN','IFNUM','PLNUM','FDNUM','INT','SOURCE','SAMPLER','TIMESTAMP']
+    isString = [0,0,0,0,0,1,1,1]
+    cols = ptrarr(n_elements(names))
+    keep = bytarr(n_elements(names))
+    for i=0,(n_elements(names)-1) do begin
+        catch, error_status
+        if error_status ne 0 then begin
+            ; column not available for this io object
+            catch, /cancel
+            continue
+        endif
+        values = io->get_index_values(names[i])
+        catch, /cancel
+        if n_elements(values) ne nrows then continue
+        values = isString[i] ? strtrim(values,2) : long(values)
+        cols[i] = ptr_new(find_index_column(values))
+        keep[i] = 1
+    endfor
+    kept = where(keep, nkept)
+    if nkept eq 0 then return, -1
+    fidx = {nrows:nrows, names:names[kept], cols:cols[kept], stamp:stamp}
+
+    if nslot gt 0 then begin
+        fidxOld = *fi_indexes[slot]
+        ptr_free, fidxOld.cols
+        *fi_indexes[slot] = fidx
+    endif else begin
+        if obj_valid(fi_ios[0]) then begin
+            fi_ios = [fi_ios, io]
+            fi_indexes = [fi_indexes, ptr_new(fidx)]
+        endif else begin
+            fi_ios[0] = io
+            fi_indexes[0] = ptr_new(fidx)
+        endelse
+    endelse
+
+    return, fidx
+end
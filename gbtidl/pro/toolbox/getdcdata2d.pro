@@ -0,0 +1,59 @@
+; docformat = 'rst'
+
+;+ 
+; Convenience function for retrieving the data from an array of data
+; containers as a single 2-D (channel x container) array.
+;
+; All of the data containers must hold the same number of channels.
+; The type of the returned array is the type of the data in the first
+; data container.  Row i of the result (``result[*,i]``) is a copy of
+; the data in ``dcs[i]``.
+;
+; This is intended for use by routines that operate on many spectra
+; at once (e.g. :idl:pro:`dobatchsigref`) where the calculation can be
+; done in a single vectorized step instead of one data container at a
+; time.  Use :idl:pro:`setdcdata2d` to put the rows back into data
+; containers.
+;
+; :Params:
+;   dcs : in, required, type=data container array
+;       The data containers (spectrum or continuum) to use.
+; 
+; :Returns:
+;   2-D array of data values, [nchan, n_elements(dcs)]. Returns -1
+;   on error.
+;
+; :Examples:
+;
+;   .. code-block:: IDL
+; 
+;       dcs = getchunk(scan=10,ifnum=0,plnum=0)
+;       d2 = getdcdata2d(dcs)
+;       help, d2
+;       data_free, dcs
+;
+; :Uses:
+;   :idl:pro:`DATA_VALID`
+;
+;-
+FUNCTION GETDCDATA2D, dcs
+    compile_opt idl2
+
+    nchan = data_valid(dcs)
+    if nchan le 0 then begin
+        message, "Data container is empty or invalid",/info
+        return, -1
+    endif
+
+    ndc = n_elements(dcs)
+    result = make_array(nchan, ndc, type=size(*dcs[0].data_ptr,/type), /nozero)
+    for i=0L,(ndc-1) do begin
+        if n_elements(*dcs[i].data_ptr) ne nchan then begin
+            message, "All data containers must have the same number of channels",/info
+            return, -1
+        endif
+        result[0,i] = *dcs[i].data_ptr
+    endfor
+
+    return, result
+END
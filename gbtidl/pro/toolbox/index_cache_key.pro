@@ -0,0 +1,102 @@
+; docformat = 'rst'
+
+;+
+; Construct a key describing the current state of an SDFITS file or a
+; directory of SDFITS files, used by :idl:pro:`get_find_index` to
+; notice when the data behind an io object have changed.
+;
+; There is one element in the returned array for each SDFITS file
+; (all "\*.fits" files when ``name`` is a directory) and for the
+; GBTIDL index (".index") and flag (".flag") files that go with each
+; of them, so that flags added or removed since the key was made
+; change it.  Each element holds the fully qualified file
+; name, the file size (bytes, -1 when the file does not exist), the
+; modification time and a content hash.  The hash is an Adler-32
+; checksum of the whole file for files up to 1 MB and of the first and
+; last 10 FITS blocks (28800 bytes each) for larger files.  That covers
+; the headers and any rows appended at the end, while the full size
+; and modification time cover everything else, so constructing the key
+; is fast even for very large files.
+;
+; Two keys describe the same data when they have the same number of
+; elements and all fields match.
+;
+; :Params:
+;   name : in, required, type=string
+;       An SDFITS file name or a directory name.
+;
+; :Keywords:
+;   directory : in, optional, type=boolean
+;       When set, name is a directory.
+;   count : out, optional, type=integer
+;       The number of files in the key.
+;   nohash : in, optional, type=boolean
+;       When set, the files are not read and every hash is 0.  The key
+;       then only describes the file sizes and modification times.
+;
+; :Returns:
+;   array of structures with fields name, size, mtime and hash.
+;   Returns -1 when no SDFITS files were found.
+;
+;-
+function index_cache_key, name, directory=directory, count=count, nohash=nohash
+    compile_opt idl2
+
+    count = 0
+    if keyword_set(directory) then begin
+        files = file_search(name, '*.fits', count=count)
+    endif else begin
+        if file_test(name,/regular) then begin
+            files = [name]
+            count = 1
+        endif
+    endelse
+    if count eq 0 then return, -1
+
+    files = file_expand_path(files[sort(files)])
+    ; the index and flag files used by the io classes for each file
+    stems = files
+    for i=0L,(count-1) do begin
+        dot = strpos(files[i], '.', /reverse_search)
+        if dot gt strpos(files[i], path_sep(), /reverse_search) + 1 then stems[i] = strmid(files[i], 0, dot)
+    endfor
+    files = reform(transpose([[files], [stems + '.index'], [stems + '.flag']]), 3*count)
+    count = n_elements(files)
+    info = file_info(files)
+
+    key = replicate({name:'', size:-1LL, mtime:0LL, hash:0UL}, count)
+    key.name = files
+    exists = where(info.exists, nexists)
+    if nexists gt 0 then begin
+        key[exists].size = info[exists].size
+        key[exists].mtime = info[exists].mtime
+    endif
+
+    nwhole = 1048576LL
+    nblocks = 28800LL
+    for i=0L,(count-1) do begin
+        if key[i].size le 0 or keyword_set(nohash) then continue
+        openr, lun, files[i], /get_lun, error=ioerr
+        if ioerr ne 0 then continue
+        if key[i].size le nwhole then begin
+            buf = bytarr(key[i].size, /nozero)
+            readu, lun, buf
+        endif else begin
+            head = bytarr(nblocks, /nozero)
+            tail = bytarr(nblocks, /nozero)
+            readu, lun, head
+            point_lun, lun, key[i].size - nblocks
+            readu, lun, tail
+            buf = [head, tail]
+        endelse
+        free_lun, lun
+        ; Adler-32, done with array arithmetic
+        nbytes = ulong64(n_elements(buf))
+        d = ulong64(buf)
+        a = (1ULL + total(d, /integer)) mod 65521ULL
+        b = (nbytes + total((nbytes - ul64indgen(nbytes)) * d, /integer)) mod 65521ULL
+        key[i].hash = ulong(b * 65536ULL + a)
+    endfor
+
+    return, key
+end
@@ -0,0 +1,48 @@
+; docformat = 'rst'
+
+;+
+; Write any spectra held in the keep buffer to the output file
+; (``!g.lineoutio``) with a single write and empty the buffer.
+;
+; This does nothing if the keep buffer is off or empty.  It is called
+; before anything reads from or changes the output file (e.g.
+; :idl:pro:`kget`, :idl:pro:`nsave`, :idl:pro:`fileout`) so that the
+; buffer is never visible to the user.  See :idl:pro:`keepbuffer`.
+;
+; If the write fails, the spectra are left in the buffer so that
+; nothing is lost and the flush can be tried again.
+;
+; :Keywords:
+;   ok : out, optional, type=boolean
+;       1 if the buffer is empty on return, otherwise 0.
+;
+;-
+pro keep_buffer_flush, ok=ok
+    compile_opt idl2
+    common keep_buffer_common, kb_dcs, kb_count, kb_bytes, kb_maxcount, kb_maxbytes, kb_stats
+
+    ok = 1
+    if n_elements(kb_count) eq 0 then return
+    if kb_count le 0 then return
+
+    tstart = systime(/seconds)
+    catch, error_status
+    if error_status ne 0 then begin
+        catch, /cancel
+        message,'Unable to write the keep buffer, ' + strtrim(kb_count,2) + $
+                ' spectra are still buffered: ' + !error_state.msg,/info
+        ok = 0
+        return
+    endif
+    !g.lineoutio->write_spectra, kb_dcs[0:(kb_count-1)]
+    catch, /cancel
+
+    kb_stats.nflushes += 1
+    kb_stats.nwritten += kb_count
+    kb_stats.flushtime += systime(/seconds) - tstart
+
+    data_free, kb_dcs[0:(kb_count-1)]
+    kb_dcs = 0
+    kb_count = 0L
+    kb_bytes = 0LL
+end
@@ -0,0 +1,85 @@
+; docformat = 'rst'
+
+;+
+; Write spectrum data containers to the output file
+; (``!g.lineoutio``), through the keep buffer when it is turned on.
+;
+; This is used by :idl:pro:`keep` and :idl:pro:`putchunk`.  When the
+; keep buffer is off (the default) the data containers are written
+; immediately.  When it is on (see :idl:pro:`keepbuffer`) copies of the
+; data containers are held in memory and written with a single write
+; (one table append and one index update) once the buffer holds the
+; maximum number of spectra or the maximum number of bytes.  Arrays of
+; data containers at least as large as the buffer are written
+; directly after first flushing the buffer, so the order of the
+; spectra in the output file is always the order in which they were
+; kept.  If that flush fails, nothing is written (and nothing is added
+; to the buffer) so that the order is kept, a message is printed and ok
+; is 0.
+;
+; The buffer is an array of data containers allocated to hold the
+; maximum number of spectra.  The bytes counted are the data values
+; (at their actual size) and the header of each data container.
+;
+; :Params:
+;   dcs : in, required, type=spectrum data container array
+;       The data containers to write.  The caller still owns these and
+;       may free them as soon as this returns.
+;
+; :Keywords:
+;   ok : out, optional, type=boolean
+;       1 if the data containers were written or buffered, otherwise 0.
+;
+; :Uses:
+;   :idl:pro:`data_copy`
+;   :idl:pro:`keep_buffer_flush`
+;
+;-
+pro keep_buffer_write, dcs, ok=ok
+    compile_opt idl2
+    common keep_buffer_common, kb_dcs, kb_count, kb_bytes, kb_maxcount, kb_maxbytes, kb_stats
+
+    ok = 0
+    if n_elements(kb_maxcount) eq 0 then kb_maxcount = 0L
+    if kb_maxcount le 0 then begin
+        !g.lineoutio->write_spectra, dcs
+        ok = 1
+        return
+    endif
+
+    ndc = n_elements(dcs)
+    if ndc ge kb_maxcount then begin
+        keep_buffer_flush, ok=flushOK
+        if not flushOK then begin
+            message,'Not writing these spectra ahead of the ones still in the keep buffer',/info
+            return
+        endif
+        !g.lineoutio->write_spectra, dcs
+        kb_stats.nkept += ndc
+        kb_stats.nwritten += ndc
+        ok = 1
+        return
+    endif
+
+    if kb_count eq 0 then begin
+        kb_dcs = replicate({spectrum_struct}, kb_maxcount)
+    endif else if kb_count + ndc gt n_elements(kb_dcs) then begin
+        ; the maximum was raised while the buffer held spectra
+        kb_dcs = [kb_dcs, replicate({spectrum_struct}, (kb_maxcount > (kb_count+ndc)) - n_elements(kb_dcs))]
+    endif
+
+    ; bytes per element of each IDL type code
+    typeBytes = [0,1,2,4,4,8,8,0,0,16,0,0,2,4,8,8]
+    headerBytes = n_tags({spectrum_struct}, /data_length)
+    for i=0L,(ndc-1) do begin
+        thisCopy = 0
+        data_copy, dcs[i], thisCopy
+        kb_dcs[kb_count] = thisCopy
+        kb_count += 1
+        kb_bytes += n_elements(*thisCopy.data_ptr) * typeBytes[size(*thisCopy.data_ptr,/type)] + headerBytes
+    endfor
+    kb_stats.nkept += ndc
+    ok = 1
+
+    if kb_count ge kb_maxcount or kb_bytes ge kb_maxbytes then keep_buffer_flush
+end
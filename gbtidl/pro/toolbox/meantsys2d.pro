@@ -0,0 +1,58 @@
+; docformat = 'rst' 
+
+;+
+; Calculate the mean Tsys for many integrations at once using 2-D
+; (channel x integration) arrays of data with the CAL on and with
+; the CAL off.
+;
+; This is the vectorized equivalent of :idl:pro:`dcmeantsys` and uses
+; the same model for each integration (row):
+;
+; .. math::
+; 
+;   mean_tsys = tcal * mean(nocal) / (mean(withcal-nocal)) + tcal/2.0
+; 
+; * The outer 10% of all channels in both arrays are ignored.
+; * Blanked data values are ignored.
+; * ``tcal`` is either a scalar (used for all rows) or a vector having
+;   one value per row.
+;
+; :Params:
+;   nocal : in, required, type=2-D float array
+;       The data with no cal signal, [nchan, nint].
+;   withcal : in, required, type=2-D float array
+;       The data with a cal signal, [nchan, nint].
+;   tcal : in, required, type=float
+;       The cal temperature (K), scalar or one value per row.
+;
+; :Returns:
+;   double array of mean Tsys values, one per row.
+;
+;-
+function meantsys2d, nocal, withcal, tcal
+    compile_opt idl2
+
+    ; Use the inner 80% of data to calculate mean Tsys
+    ; reform keeps the row dimension even when there is only one row
+    nchans = (size(nocal,/dimensions))[0]
+    nrows = n_elements(nocal)/nchans
+    off = reform(nocal,nchans,nrows)
+    on = reform(withcal,nchans,nrows)
+    pct10 = nchans/10
+    pct90 = nchans - pct10
+
+    ; ignore math errors here, underflow is fairly common
+    oldExcept = !except
+    !except = 0
+
+    meanTsys = mean(off[pct10:pct90,*],dimension=1,/nan,/double) / $
+               mean(on[pct10:pct90,*] - off[pct10:pct90,*],dimension=1,/nan,/double) * $
+               tcal + tcal/2.0
+
+    ; clear them, but only the underflow
+    res = check_math(mask=32)
+    ; return to previous state
+    !except = oldExcept
+
+    return, meanTsys
+end
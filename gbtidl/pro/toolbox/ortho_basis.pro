@@ -0,0 +1,139 @@
+; docformat = 'rst'
+
+;+
+; Function returns the set of orthonormal polynomials used by
+; :idl:pro:`ortho_fit` evaluated at xx, and the recursion coefficients
+; that describe them.
+;
+; The polynomials depend only on xx and nfit, not on the data being
+; fit, so when many spectra are fit using the same channels (e.g. the
+; same baseline regions) they only need to be constructed once.  The
+; coefficients of the fit to each spectrum are then the dot product of
+; each polynomial with the data, which can be done for all of the
+; spectra at once with a single matrix product (see
+; :idl:pro:`dcbaselinestack`).  The same recursion as in ortho_fit is
+; used so the results agree with ortho_fit.
+;
+; The most recently used sets of polynomials are cached and reused
+; when the same xx is used again with the same or a smaller nfit.
+;
+; :Params:
+;   xx : in, required
+;       The x-values to use in the fit.
+;   nfit : in, required, type=integer
+;       The order of the polynomial.
+;
+; :Keywords:
+;   xeval : in, optional
+;       Also evaluate the polynomials at these x-values (e.g. all
+;       channels) and return that in evalbasis.
+;   evalbasis : out, optional, type=2D double array
+;       The polynomials evaluated at xeval, [n_elements(xeval),nfit+1].
+;
+; :Returns:
+;   structure with two fields. polyfit is the [4,nfit+1] array as
+;   returned by ortho_fit with polyfit[3,*] (the fit coefficients) set
+;   to 0.  basis is the [n_elements(xx),nfit+1] array of the
+;   orthonormal polynomials evaluated at xx.
+;
+; :Examples:
+;
+;   .. code-block:: IDL
+;
+;       ob = ortho_basis(double(chans), 3)
+;       ; fit coefficients for every column of y
+;       coef = matrix_multiply(ob.basis, y, /atranspose)
+;
+;-
+function ortho_basis, xx, nfit, xeval=xeval, evalbasis=evalbasis
+    compile_opt idl2
+    common ortho_basis_common, ob_cache
+
+    if (nfit lt 0) then message, 'nfit must be >= 0'
+
+    x = double(xx)
+    n = n_elements(x)
+
+    ; look for a cached set with this x and at least this order
+    result = -1
+    ncache = n_elements(ob_cache)
+    for i=0,(ncache-1) do begin
+        entry = ob_cache[i]
+        if not ptr_valid(entry) then continue
+        if (*entry).nfit ge nfit and n_elements((*entry).x) eq n then begin
+            if array_equal((*entry).x, x) then begin
+                result = {polyfit:reform((*entry).polyfit[*,0:nfit],4,nfit+1), $
+                          basis:reform((*entry).basis[*,0:nfit],n,nfit+1)}
+                break
+            endif
+        endif
+    endfor
+
+    if size(result,/type) ne 8 then begin
+        polyfit = dblarr(4,nfit+1)
+        basis = dblarr(n,nfit+1)
+
+        p0 = replicate(1.0d,n)
+        xnorm = sqrt(total(p0^2))
+        p0 = p0/xnorm
+        polyfit[0,0] = 1./xnorm
+        basis[*,0] = p0
+
+        if nfit gt 0 then begin
+            a = total(x*p0)
+            p1 = x - a*p0
+            xnorm = sqrt(total(p1^2))
+            p1 = p1/xnorm
+            polyfit[0:1,1] = [-a*polyfit[0,0], 1.0d]/xnorm
+            basis[*,1] = p1
+
+            pnm1 = p0
+            pn = p1
+            for m=2,nfit do begin
+                a = -1./total(x*pn*pnm1)
+                b = -a*total(x*pn^2)
+                pnp1 = (a*x + b)*pn + pnm1
+                xnorm = sqrt(total(pnp1^2))
+                pnp1 = pnp1/xnorm
+                polyfit[0,m] = 1./xnorm
+                polyfit[1,m] = b/xnorm
+                polyfit[2,m] = a/xnorm
+                basis[*,m] = pnp1
+                pnm1 = pn
+                pn = pnp1
+            endfor
+        endif
+
+        result = {polyfit:polyfit, basis:basis}
+
+        ; keep the 8 most recent
+        newEntry = ptr_new({x:x, nfit:nfit, polyfit:polyfit, basis:basis})
+        if ncache ge 8 then begin
+            ptr_free, ob_cache[0]
+            ob_cache = [ob_cache[1:*], newEntry]
+        endif else begin
+            ob_cache = (ncache gt 0) ? [ob_cache, newEntry] : [newEntry]
+        endelse
+    endif
+
+    if n_elements(xeval) gt 0 then begin
+        ; the same recursion as ortho_poly
+        xe = double(xeval)
+        pf = result.polyfit
+        evalbasis = dblarr(n_elements(xe),nfit+1)
+        pnm1 = replicate(pf[0,0],n_elements(xe))
+        evalbasis[*,0] = pnm1
+        if nfit gt 0 then begin
+            pn = xe*pf[1,1] + pf[0,1]
+            evalbasis[*,1] = pn
+            for m=2,nfit do begin
+                pnp1 = pn*(xe*pf[2,m] + pf[1,m]) + pnm1*pf[0,m]
+                evalbasis[*,m] = pnp1
+                pnm1 = pn
+                pn = pnp1
+            endfor
+        endif
+    endif
+
+    return, result
+end
@@ -0,0 +1,184 @@
+; docformat = 'rst'
+
+;+
+; Select data using a find index (see :idl:pro:`get_find_index`)
+; and return the array of matching indices.
+;
+; This is the indexed equivalent of :idl:pro:`select_data` for the
+; columns held in the find index.  The selection syntax is the usual
+; one (see the discussion on "Select" in the GBTIDL User's Guide
+; :ref:`here <references/software/gbtidl/users_guide/data_analysis:Select>`):
+;
+; * Integer columns (SCAN, IFNUM, PLNUM, FDNUM, INT) accept a value, an
+;   array of values or a string of comma separated values and ranges
+;   (e.g. ``scan='100:900'``, ``ifnum=[0,2]``, ``int=':3,5'``).
+; * String columns (SOURCE, SAMPLER, TIMESTAMP) accept a value, an
+;   array of values or a string of comma separated values.  Values may
+;   start or end with the "*" wildcard.  Matching is case sensitive.
+;
+; Each value or range is located using a binary search of the sorted
+; unique values of that column, so the cost does not depend on the
+; number of rows in the index.  When there are several selection
+; parameters (combined with a logical AND), the rows matching the most
+; selective parameter are found this way and those rows alone are then
+; checked against the other parameters.
+;
+; If any of the selection parameters is not a column in the find index
+; (the name must be given in full), ``ok`` is returned as 0 and the
+; caller should use :idl:pro:`select_data` instead.
+;
+; :Params:
+;   fidx : in, required, type=structure
+;       The find index, as returned by :idl:pro:`get_find_index`.
+;
+; :Keywords:
+;   count : out, optional, type=integer
+;       The number of matches found.
+;   ok : out, optional, type=boolean
+;       1 if the selection could be done with this find index, else 0.
+;   _EXTRA : in, optional, type=extra keywords
+;       These are the selection parameters.
+;
+; :Returns:
+;   a sorted array of indicies.  Returns a value of -1 if no match was
+;   found or ok is 0.
+;
+;-
+function query_find_index, fidx, count=count, ok=ok, _EXTRA=ex
+    compile_opt idl2
+
+    count = 0
+    ok = 0
+    if size(fidx,/type) ne 8 then return, -1
+
+    if n_elements(ex) eq 0 then begin
+        ok = 1
+        count = fidx.nrows
+        return, lindgen(fidx.nrows)
+    endif
+
+    tags = tag_names(ex)
+    ncrit = n_elements(tags)
+    colPtrs = ptrarr(ncrit)
+    isString = bytarr(ncrit)
+    for i=0,(ncrit-1) do begin
+        thisCol = (where(fidx.names eq tags[i], ncol))[0]
+        if ncol eq 0 then return, -1
+        colPtrs[i] = fidx.cols[thisCol]
+        isString[i] = size((*colPtrs[i]).values,/type) eq 7
+    endfor
+
+    ; parse each criterion into a set of [lo,hi] ranges (integer
+    ; columns) or patterns (string columns)
+    crits = ptrarr(ncrit)
+    for i=0,(ncrit-1) do begin
+        val = ex.(i)
+        if size(val,/type) eq 7 then begin
+            tokens = strsplit(strjoin(val,','),',',/extract)
+            tokens = strtrim(tokens,2)
+        endif else begin
+            tokens = val
+        endelse
+        if isString[i] then begin
+            crits[i] = ptr_new({patterns:string(tokens)})
+        endif else begin
+            ntok = n_elements(tokens)
+            lo = dblarr(ntok)
+            hi = dblarr(ntok)
+            for j=0,(ntok-1) do begin
+                if size(tokens[j],/type) eq 7 then begin
+                    tok = strtrim(tokens[j],2)
+                    ; strip any array brackets
+                    tok = strjoin(strsplit(tok,'[]',/extract))
+                    if strpos(tok,':') ge 0 then begin
+                        parts = strsplit(tok,':',/extract,/preserve_null)
+                        lo[j] = strlen(parts[0]) gt 0 ? double(parts[0]) : -!values.d_infinity
+                        hi[j] = strlen(parts[1]) gt 0 ? double(parts[1]) : !values.d_infinity
+                    endif else begin
+                        lo[j] = double(tok)
+                        hi[j] = lo[j]
+                    endelse
+                endif else begin
+                    lo[j] = double(tokens[j])
+                    hi[j] = lo[j]
+                endelse
+            endfor
+            ; these are integer columns, round the finite ends only so
+            ; that a missing end stays unbounded
+            fin = where(finite(lo), nfin)
+            if nfin gt 0 then lo[fin] = ceil(lo[fin], /l64)
+            fin = where(finite(hi), nfin)
+            if nfin gt 0 then hi[fin] = floor(hi[fin], /l64)
+            crits[i] = ptr_new({lo:lo, hi:hi})
+        endelse
+    endfor
+
+    ; find the unique value positions matched by each criterion and
+    ; the resulting number of rows, using binary searches
+    nmatch = lon64arr(ncrit)
+    ranges = ptrarr(ncrit)
+    for i=0,(ncrit-1) do begin
+        col = colPtrs[i]
+        nuniq = n_elements((*col).uniq)
+        useUniq = bytarr(nuniq)
+        if isString[i] then begin
+            patterns = (*crits[i]).patterns
+            for j=0,(n_elements(patterns)-1) do begin
+                if strpos(patterns[j],'*') ge 0 then begin
+                    useUniq or= strmatch((*col).uniq, patterns[j])
+                endif else begin
+                    k = value_locate((*col).uniq, patterns[j])
+                    if k ge 0 then begin
+                        if (*col).uniq[k] eq patterns[j] then useUniq[k] = 1
+                    endif
+                endelse
+            endfor
+        endif else begin
+            lo = (*crits[i]).lo
+            hi = (*crits[i]).hi
+            for j=0,(n_elements(lo)-1) do begin
+                if hi[j] lt lo[j] then continue
+                ; first unique value >= lo, last unique value <= hi
+                k0 = finite(lo[j]) ? value_locate((*col).uniq, lo[j]-1) + 1 : 0L
+                k1 = finite(hi[j]) ? value_locate((*col).uniq, hi[j]) : nuniq-1
+                if k1 ge k0 then useUniq[k0:k1] = 1
+            endfor
+        endelse
+        ranges[i] = ptr_new(useUniq)
+        w = where(useUniq, nw)
+        if nw gt 0 then nmatch[i] = total((*col).starts[w+1] - (*col).starts[w], /integer)
+    endfor
+
+    ok = 1
+    best = (where(nmatch eq min(nmatch)))[0]
+    result = -1
+    if nmatch[best] gt 0 then begin
+        ; rows matching the most selective criterion
+        col = colPtrs[best]
+        w = where(*ranges[best])
+        count = nmatch[best]
+        result = lonarr(count)
+        pos = 0LL
+        for j=0L,(n_elements(w)-1) do begin
+            first = (*col).starts[w[j]]
+            last = (*col).starts[w[j]+1]-1
+            result[pos] = (*col).order[first:last]
+            pos += last - first + 1
+        endfor
+        result = result[sort(result)]
+
+        ; check those against the remaining criteria
+        for i=0,(ncrit-1) do begin
+            if i eq best or count eq 0 then continue
+            col = colPtrs[i]
+            ; position of each candidate value in the unique values
+            k = value_locate((*col).uniq, (*col).values[result])
+            keepRows = where((*ranges[i])[k], count)
+            if count gt 0 then result = result[keepRows] else result = -1
+        endfor
+    endif
+
+    ptr_free, crits
+    ptr_free, ranges
+    return, result
+end
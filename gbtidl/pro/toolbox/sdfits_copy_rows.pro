@@ -0,0 +1,176 @@
+; docformat = 'rst'
+
+;+
+; Copy rows of an SDFITS file to a new SDFITS file without decoding
+; them.
+;
+; The primary HDU is copied as is.  For each extension that has
+; selected rows, the extension header is copied with NAXIS2 changed
+; to the number of selected rows and then the selected rows are
+; copied byte for byte, in ascending row order.  Rows that are next to
+; each other in the input are copied in large blocks (up to blockbytes
+; at a time), so the cost is mostly that of reading and writing the
+; selected bytes.  No data containers are involved and all of the
+; columns are preserved exactly.
+;
+; The rows are usually found by resolving a selection against the
+; index of the input file, using the EXTENSION and ROW index values
+; (see :idl:pro:`getdatablock` for the same approach when reading).
+; No index file is written for the output file.  GBTIDL creates it
+; the first time that file is opened.
+;
+; Extensions with a heap (variable length array columns) can not be
+; copied this way.
+;
+; :Params:
+;   infile : in, required, type=string
+;       The input SDFITS file.
+;   outfile : in, required, type=string
+;       The output SDFITS file.  This is overwritten if it exists.
+;   extensions : in, required, type=integer array
+;       The extension number of each row to copy.
+;   rows : in, required, type=integer array
+;       The row number (counting from 0) within that extension of each
+;       row to copy.
+;
+; :Keywords:
+;   blockbytes : in, optional, type=long, default=16777216
+;       The largest block, in bytes, read and written at once.
+;   count : out, optional, type=long
+;       The number of rows copied.
+;
+; :Returns:
+;   1 on success, 0 on failure.
+;
+; :Examples:
+;
+;   .. code-block:: IDL
+;
+;       io = sdfitsin('big.fits')
+;       indx = select_data(io, source='W3OH', ifnum=1)
+;       exts = io->get_index_values('EXTENSION', index=indx)
+;       rows = io->get_index_values('ROW', index=indx)
+;       ok = sdfits_copy_rows('big.fits', 'w3oh.fits', exts, rows)
+;
+; :Uses:
+;   :idl:pro:`sdfits_table_layout`
+;
+;-
+function sdfits_copy_rows, infile, outfile, extensions, rows, blockbytes=blockbytes, count=count
+    compile_opt idl2
+
+    count = 0L
+    if n_elements(extensions) eq 0 or n_elements(extensions) ne n_elements(rows) then begin
+        message, 'extensions and rows must have the same number of elements', /info
+        return, 0
+    endif
+
+    maxBytes = (n_elements(blockbytes) gt 0) ? long64(blockbytes[0]) > 2880LL : 16777216LL
+
+    exts = long(extensions)
+    theRows = long64(rows)
+    extList = exts[uniq(exts, sort(exts))]
+    if extList[0] lt 1 then begin
+        message, 'Extension numbers must be >= 1', /info
+        return, 0
+    endif
+
+    ; locate all of the extensions first
+    nexts = n_elements(extList)
+    layouts = replicate({header_offset:0LL, data_offset:0LL, naxis1:0LL, naxis2:0LL}, nexts)
+    for e=0L,(nexts-1) do begin
+        layout = sdfits_table_layout(infile, extList[e])
+        if size(layout,/type) ne 8 then return, 0
+        if layout.pcount ne 0 then begin
+            message, string(extList[e],format='("Extension ",i0," has a heap, rows can not be copied")'), /info
+            return, 0
+        endif
+        layouts[e].header_offset = layout.header_offset
+        layouts[e].data_offset = layout.data_offset
+        layouts[e].naxis1 = layout.naxis1
+        layouts[e].naxis2 = layout.naxis2
+        extRows = theRows[where(exts eq extList[e])]
+        outOfRange = where(extRows ge layout.naxis2 or extRows lt 0, nbad)
+        if nbad gt 0 then begin
+            message, string(extList[e],format='("Row numbers out of range for extension ",i0)'), /info
+            return, 0
+        endif
+    endfor
+
+    ; the primary HDU is everything before the first extension
+    primary = sdfits_table_layout(infile, 1)
+    if size(primary,/type) ne 8 then return, 0
+
+    openr, inLun, infile, /get_lun, error=ioerr
+    if ioerr ne 0 then begin
+        message, 'Unable to open ' + infile, /info
+        return, 0
+    endif
+    openw, outLun, outfile, /get_lun, error=ioerr
+    if ioerr ne 0 then begin
+        free_lun, inLun
+        message, 'Unable to open ' + outfile + ' for writing', /info
+        return, 0
+    endif
+
+    catch, error_status
+    if error_status ne 0 then begin
+        catch, /cancel
+        message, 'Problem copying rows: ' + !error_state.msg, /info
+        free_lun, inLun
+        free_lun, outLun
+        return, 0
+    endif
+
+    buffer = bytarr(primary.header_offset, /nozero)
+    readu, inLun, buffer
+    writeu, outLun, buffer
+
+    for e=0L,(nexts-1) do begin
+        lay = layouts[e]
+        theseRows = theRows[where(exts eq extList[e])]
+        theseRows = theseRows[uniq(theseRows, sort(theseRows))]
+        nsel = n_elements(theseRows)
+
+        ; the header with the new number of rows
+        header = bytarr(lay.data_offset - lay.header_offset, /nozero)
+        point_lun, inLun, lay.header_offset
+        readu, inLun, header
+        cards = reform(header, 80, n_elements(header)/80)
+        naxis2Card = where(string(cards[0:7,*]) eq 'NAXIS2  ', ncard)
+        if ncard eq 0 then message, 'NAXIS2 not found'
+        cards[10:29,naxis2Card[0]] = byte(string(nsel, format='(i20)'))
+        writeu, outLun, cards
+
+        ; contiguous runs of rows, copied in blocks
+        nbreaks = 0
+        if nsel gt 1 then breaks = where(theseRows[1:*] - theseRows ne 1, nbreaks)
+        runLast = (nbreaks gt 0) ? [breaks, nsel-1] : [nsel-1]
+        nruns = n_elements(runLast)
+        runFirst = (nruns gt 1) ? [0L, runLast[0:(nruns-2)]+1] : [0L]
+        rowsPerBlock = (maxBytes / lay.naxis1) > 1LL
+        for r=0L,(nruns-1) do begin
+            row = theseRows[runFirst[r]]
+            left = long64(runLast[r] - runFirst[r] + 1)
+            point_lun, inLun, lay.data_offset + row*lay.naxis1
+            while left gt 0 do begin
+                nr = left < rowsPerBlock
+                if n_elements(buffer) ne nr*lay.naxis1 then buffer = bytarr(nr*lay.naxis1, /nozero)
+                readu, inLun, buffer
+                writeu, outLun, buffer
+                left -= nr
+            endwhile
+        endfor
+
+        ; pad the data to a whole number of FITS blocks
+        nbytes = nsel*lay.naxis1
+        npad = (2880LL - (nbytes mod 2880LL)) mod 2880LL
+        if npad gt 0 then writeu, outLun, bytarr(npad)
+        count += nsel
+    endfor
+    catch, /cancel
+
+    free_lun, inLun
+    free_lun, outLun
+    return, 1
+end
@@ -0,0 +1,163 @@
+; docformat = 'rst'
+
+;+
+; Find the layout on disk of one column of an SDFITS binary table
+; extension.
+;
+; The FITS headers are read directly (only the header blocks are
+; read) and used to work out where the data for the requested
+; extension start in the file, the size of each row, and the offset,
+; length and type of the requested column within each row.  With this
+; information the values of that column for any row can be read (or
+; mapped, see :idl:pro:`getdatablock`) without going through the
+; FITS table reading routines.
+;
+; Only fixed-length columns are supported.  Variable length array
+; columns (P and Q formats) can not be located this way.
+;
+; :Params:
+;   filename : in, required, type=string
+;       The SDFITS file name.
+;   extension : in, required, type=integer
+;       The extension number (the primary HDU is extension 0).
+;
+; :Keywords:
+;   column : in, optional, type=string, default='DATA'
+;       The column name (TTYPE value) to locate.
+;
+; :Returns:
+;   structure with these fields, or -1 on error.
+;
+;   * header_offset : byte offset in the file of the extension header
+;   * data_offset : byte offset in the file of the first table row
+;   * naxis1 : bytes per row
+;   * naxis2 : number of rows
+;   * col_offset : byte offset of the column within each row
+;   * col_repeat : number of values in the column in each row
+;   * col_type : IDL type code of the column values
+;   * col_bytes : bytes per value
+;   * pcount : size of the heap (variable length array data) in bytes
+;
+;-
+function sdfits_table_layout, filename, extension, column=column
+    compile_opt idl2
+
+    if n_elements(column) eq 0 then column = 'DATA'
+    thisColumn = strupcase(strtrim(column,2))
+
+    openr, lun, filename, /get_lun, error=ioerr
+    if ioerr ne 0 then begin
+        message, 'Unable to open ' + filename, /info
+        return, -1
+    endif
+    fileSize = (fstat(lun)).size
+
+    block = bytarr(2880)
+    hduStart = 0LL
+    for hdu=0L,extension do begin
+        ; read this header
+        cards = ''
+        done = 0
+        nblocks = 0LL
+        while not done do begin
+            if hduStart + (nblocks+1)*2880LL gt fileSize then begin
+                free_lun, lun
+                message, string(extension,filename,format='("Extension ",i0," not found in ",a)'), /info
+                return, -1
+            endif
+            point_lun, lun, hduStart + nblocks*2880LL
+            readu, lun, block
+            nblocks += 1
+            theseCards = string(reform(block,80,36))
+            cards = [cards, theseCards]
+            done = total(strmid(theseCards,0,8) eq 'END     ') gt 0
+        endwhile
+        cards = cards[1:*]
+        keys = strtrim(strmid(cards,0,8),2)
+        ; values, without any comment
+        vals = strmid(cards,10,70)
+        valLen = strpos(vals,'/')
+        noComment = where(valLen lt 0, nnc)
+        if nnc gt 0 then valLen[noComment] = 70
+        vals = strtrim(strmid(vals,0,valLen),2)
+
+        bitpix = 8LL
+        naxes = lon64arr(3)
+        naxes[*] = 1
+        pcount = 0LL
+        gcount = 1LL
+        naxis = 0L
+        w = where(keys eq 'BITPIX', nw) & if nw gt 0 then bitpix = long64(vals[w[0]])
+        w = where(keys eq 'NAXIS', nw) & if nw gt 0 then naxis = long(vals[w[0]])
+        for i=1,(naxis < 2) do begin
+            w = where(keys eq 'NAXIS'+strtrim(i,2), nw)
+            if nw gt 0 then naxes[i] = long64(vals[w[0]])
+        endfor
+        w = where(keys eq 'PCOUNT', nw) & if nw gt 0 then pcount = long64(vals[w[0]])
+        w = where(keys eq 'GCOUNT', nw) & if nw gt 0 then gcount = long64(vals[w[0]])
+        dataBytes = (naxis gt 0) ? abs(bitpix)/8 * gcount * (pcount + product(naxes[1:(naxis < 2)],/integer)) : 0LL
+        dataStart = hduStart + nblocks*2880LL
+
+        if hdu lt extension then begin
+            hduStart = dataStart + ((dataBytes + 2879LL)/2880LL)*2880LL
+        endif
+    endfor
+    free_lun, lun
+
+    if keys[0] ne 'XTENSION' || strpos(vals[0],'BINTABLE') lt 0 then begin
+        message, string(extension,format='("Extension ",i0," is not a binary table")'), /info
+        return, -1
+    endif
+
+    w = where(keys eq 'TFIELDS', nw)
+    tfields = (nw gt 0) ? long(vals[w[0]]) : 0L
+    colOffset = 0LL
+    for i=1,tfields do begin
+        si = strtrim(i,2)
+        w = where(keys eq 'TTYPE'+si, nw)
+        ttype = (nw gt 0) ? strupcase(strtrim(strjoin(strsplit(vals[w[0]],"'",/extract)),2)) : ''
+        w = where(keys eq 'TFORM'+si, nw)
+        if nw eq 0 then begin
+            message, 'Missing TFORM' + si, /info
+            return, -1
+        endif
+        tform = strupcase(strtrim(strjoin(strsplit(vals[w[0]],"'",/extract)),2))
+        ; repeat count followed by the type code
+        pos = stregex(tform,'[A-Z]')
+        repeatCount = (pos gt 0) ? long64(strmid(tform,0,pos)) : 1LL
+        code = strmid(tform,pos,1)
+        case code of
+            'L': begin & nbytes = 1 & idlType = 1 & end
+            'X': begin & nbytes = 1 & idlType = 1 & repeatCount = (repeatCount+7)/8 & end
+            'B': begin & nbytes = 1 & idlType = 1 & end
+            'I': begin & nbytes = 2 & idlType = 2 & end
+            'J': begin & nbytes = 4 & idlType = 3 & end
+            'K': begin & nbytes = 8 & idlType = 14 & end
+            'A': begin & nbytes = 1 & idlType = 7 & end
+            'E': begin & nbytes = 4 & idlType = 4 & end
+            'D': begin & nbytes = 8 & idlType = 5 & end
+            'C': begin & nbytes = 8 & idlType = 6 & end
+            'M': begin & nbytes = 16 & idlType = 9 & end
+            'P': begin & nbytes = 8 & idlType = 0 & end
+            'Q': begin & nbytes = 16 & idlType = 0 & end
+            else: begin
+                message, 'Unrecognized TFORM' + si + ' : ' + tform, /info
+                return, -1
+            end
+        endcase
+        if ttype eq thisColumn then begin
+            if idlType eq 0 then begin
+                message, 'Variable length array columns are not supported: ' + thisColumn, /info
+                return, -1
+            endif
+            return, {header_offset:hduStart, data_offset:dataStart, naxis1:naxes[1], $
+                     naxis2:naxes[2], col_offset:colOffset, col_repeat:repeatCount, $
+                     col_type:idlType, col_bytes:long64(nbytes), pcount:pcount}
+        endif
+        ; P and Q descriptors have a fixed size in the row
+        colOffset += ((code eq 'P' or code eq 'Q') ? 1LL : repeatCount) * nbytes
+    endfor
+
+    message, 'Column ' + thisColumn + ' not found', /info
+    return, -1
+end
@@ -0,0 +1,45 @@
+; docformat = 'rst'
+
+;+ 
+; Convenience procedure for putting the rows of a 2-D (channel x container)
+; array back into an array of data containers.
+;
+; This is the inverse of :idl:pro:`getdcdata2d`. Row i of ``value``
+; (``value[*,i]``) replaces the data in ``dcs[i]``.  The data
+; containers are modified in place (their existing data pointers are
+; reused), so no new data containers are created here and the header
+; values are unchanged.
+;
+; :Params:
+;   dcs : in, required, type=data container array
+;       The data containers (spectrum or continuum) to set.
+;   value : in, required, type=2-D array
+;       The data values, [nchan, n_elements(dcs)].
+;
+; :Examples:
+;
+;   .. code-block:: IDL
+; 
+;       dcs = getchunk(scan=10,ifnum=0,plnum=0)
+;       d2 = getdcdata2d(dcs)
+;       setdcdata2d, dcs, d2 * 2.0
+;       data_free, dcs
+;
+; :Uses:
+;   :idl:pro:`DATA_VALID`
+;
+;-
+pro setdcdata2d, dcs, value
+    compile_opt idl2
+
+    if data_valid(dcs) eq -1 then message, "Data container must contain valid data"
+
+    ndc = n_elements(dcs)
+    dims = size(value,/dimensions)
+    nrows = (size(value,/n_dimensions) eq 2) ? dims[1] : 1
+    if nrows ne ndc then message, "number of rows in value does not match the number of data containers"
+
+    for i=0L,(ndc-1) do begin
+        *dcs[i].data_ptr = value[*,i]
+    endfor
+end
@@ -0,0 +1,220 @@
+; docformat = 'rst'
+
+;+
+; Add many spectra from an input (or output) file into an ongoing
+; accumulation in a given accum_struct structure, reading them from
+; disk a few at a time.
+;
+; This is intended for averaging very large numbers of integrations
+; (thousands to hundreds of thousands) where holding all of the data
+; containers in memory (e.g. using :idl:pro:`getchunk` on the full
+; selection) is not possible.  The matching rows are read from disk
+; in chunks of ``chunksize`` data containers.  Each data container in
+; a chunk is added to the accumulation using :idl:pro:`dcaccum`, which
+; updates the weighted sums in place, and the chunk is then freed before
+; the next chunk is read.  The peak memory use is therefore ``chunksize``
+; spectra plus the accumulation itself, independent of how many spectra
+; are averaged.  The result is the same as using dcaccum on each
+; spectrum in turn.
+;
+; Each chunk is still read into data containers by the io object so
+; that flags are applied exactly as in :idl:pro:`getchunk`.  What is
+; saved is memory, not the cost of decoding each row.
+;
+; The spectra to use can be given as an array of index numbers in
+; ``indicies`` or as the usual selection parameters (see
+; :idl:pro:`select_data`).  When ``indicies`` is given, any selection
+; parameters are ignored.
+;
+; **Checkpoint and Resume**
+;
+; If the ``checkpoint`` keyword is set to a file name, the list of
+; indicies is saved once, at the start, to a second file with
+; ".indicies" appended to that name.  The state of the accumulation
+; (the accum_struct contents and the position in the list of indicies)
+; is then saved to the checkpoint file after every ``checkinterval``
+; spectra and at the end, so the cost of each checkpoint does not grow
+; with the number of spectra.  If the accumulation is interrupted, it
+; can be continued by calling streamaccum again with the same
+; selection, the same ``checkpoint`` file and the ``resume`` keyword
+; set.  The accumulation in ``accumbuf`` is then replaced by the one
+; in the checkpoint file and the remaining spectra are added.  It is an error to resume using a
+; checkpoint file that was made with a different list of indicies.  The
+; checkpoint files are deleted when the accumulation finishes unless
+; ``keepcheckpoint`` is set.
+;
+; Use :idl:pro:`accumave` to get the average when done.
+;
+; :Params:
+;   accumbuf : in, out, required, type=accum_struct
+;       The structure containing the accumulation that you want to add to.
+;   indicies : in, optional, type=long array
+;       The index numbers of the spectra to add.  If not supplied, the
+;       selection parameters are used to find them.
+;
+; :Keywords:
+;   keep : in, optional, type=boolean
+;       When set, the data are fetched from the output file.
+;   chunksize : in, optional, type=integer, default=10
+;       The number of spectra to read from disk at a time.
+;   weight : in, optional, type=float
+;       The weight to use for all of the data.  See :idl:pro:`dcaccum`.
+;   useflag : in, optional, type=boolean or string, default=true
+;       Apply all or just some of the flag rules?
+;   skipflag : in, optional, type=boolean or string
+;       Do not apply any or do not apply a few of the flag rules?
+;   checkpoint : in, optional, type=string
+;       The name of the file used to save the state of the accumulation.
+;   checkinterval : in, optional, type=integer, default=1000
+;       Save the state to the checkpoint file after at least this many
+;       spectra have been added since it was last saved.
+;   resume : in, optional, type=boolean
+;       When set, continue the accumulation from the state saved in
+;       the checkpoint file.
+;   keepcheckpoint : in, optional, type=boolean
+;       When set, the checkpoint files are not deleted at the end.
+;   quiet : in, optional, type=boolean
+;       When set, suppress the warning messages from dcaccum and
+;       the final announcement of the number of spectra used.
+;   count : out, optional, type=integer
+;       The number of spectra in the accumulation when this procedure
+;       returns. Returns -1 on an error.
+;   _EXTRA : in, optional, type=extra keywords
+;       These are selection parameters to specify which data to use.
+;
+; :Examples:
+;
+;   .. code-block:: IDL
+;
+;       a = {accum_struct}
+;       accumclear, a
+;       ; average every integration of this source and IF
+;       streamaccum, a, source='W3OH', ifnum=0, plnum=0, checkpoint='w3oh.sav'
+;       accumave, a, myavg
+;       show, myavg
+;       data_free, myavg
+;
+;       ; after an interruption, pick up where it stopped
+;       streamaccum, a, source='W3OH', ifnum=0, plnum=0, checkpoint='w3oh.sav', /resume
+;
+; :Uses:
+;   :idl:pro:`accumclear`
+;   :idl:pro:`dcaccum`
+;   :idl:pro:`DATA_FREE`
+;   :idl:pro:`keep_buffer_flush`
+;   :idl:pro:`select_data`
+;
+;-
+pro streamaccum, accumbuf, indicies, keep=keep, chunksize=chunksize, weight=weight, $
+                 useflag=useflag, skipflag=skipflag, checkpoint=checkpoint, $
+                 checkinterval=checkinterval, resume=resume, keepcheckpoint=keepcheckpoint, $
+                 quiet=quiet, count=count, _EXTRA=ex
+    compile_opt idl2
+
+    on_error, 2
+
+    count = -1
+
+    if n_params() lt 1 then begin
+        usage,'streamaccum'
+        return
+    endif
+
+    if (size(accumbuf,/type) ne 8 or tag_names(accumbuf,/structure_name) ne "ACCUM_STRUCT") then begin
+        message,"accumbuf is not an accum_struct structure",/info
+        return
+    endif
+
+    if n_elements(useflag) gt 0 and n_elements(skipflag) gt 0 then begin
+        message,'Flag and skipflag can not be used at the same time',/info
+        return
+    endif
+
+    if keyword_set(resume) and n_elements(checkpoint) eq 0 then begin
+        message,'resume requires a checkpoint file',/info
+        return
+    endif
+
+    if keyword_set(keep) then begin
+        ; anything still in the keep buffer must be on disk first
+        keep_buffer_flush, ok=flushOK
+        if not flushOK then return
+        io = !g.lineoutio
+    endif else begin
+        if not !g.line then begin
+            message,'Can not accumulate continuum data, sorry.',/info
+            return
+        endif
+        io = !g.lineio
+    endelse
+
+    if n_elements(indicies) gt 0 then begin
+        theseIndicies = long(indicies)
+    endif else begin
+        theseIndicies = select_data(io,count=nsel,_EXTRA=ex)
+        if nsel le 0 then begin
+            message,'No data found matching the selection',/info
+            return
+        endif
+    endelse
+    nIndicies = n_elements(theseIndicies)
+
+    thisChunk = (n_elements(chunksize) gt 0) ? (long(chunksize[0]) > 1) : 10L
+    thisInterval = (n_elements(checkinterval) gt 0) ? (long(checkinterval[0]) > 1) : 1000L
+    if n_elements(checkpoint) gt 0 then indexFile = checkpoint + '.indicies'
+
+    nextPos = 0L
+    resumed = 0
+    if keyword_set(resume) then begin
+        if file_test(checkpoint) and file_test(indexFile) then begin
+            restore, indexFile
+            restore, checkpoint
+            if n_elements(ckpt_indicies) ne nIndicies then begin
+                message,'The checkpoint file was made using a different selection, can not resume',/info
+                return
+            endif
+            if total(ckpt_indicies ne theseIndicies) ne 0 then begin
+                message,'The checkpoint file was made using a different selection, can not resume',/info
+                return
+            endif
+            accumclear, accumbuf
+            accumbuf = ckpt_accum
+            nextPos = ckpt_next
+            resumed = 1
+        endif else begin
+            message,'Checkpoint file not found, starting from the beginning: '+checkpoint,/info
+        endelse
+    endif
+    if n_elements(checkpoint) gt 0 and not resumed then begin
+        ; the list of indicies is written just once
+        ckpt_indicies = theseIndicies
+        save, ckpt_indicies, filename=indexFile
+    endif
+
+    lastSaved = nextPos
+    while nextPos lt nIndicies do begin
+        lastPos = (nextPos + thisChunk - 1) < (nIndicies - 1)
+        dcs = io->get_spectra(nread,dcIndicies,index=theseIndicies[nextPos:lastPos], $
+                              useflag=useflag,skipflag=skipflag)
+        for i=0L,(nread-1) do begin
+            dcaccum, accumbuf, dcs[i], weight=weight, quiet=quiet
+        endfor
+        if nread gt 0 then data_free, dcs
+        nextPos = lastPos + 1
+
+        if n_elements(checkpoint) gt 0 and (nextPos - lastSaved ge thisInterval or nextPos ge nIndicies) then begin
+            ckpt_accum = accumbuf
+            ckpt_next = nextPos
+            save, ckpt_accum, ckpt_next, filename=checkpoint
+            lastSaved = nextPos
+        endif
+    endwhile
+
+    if n_elements(checkpoint) gt 0 and not keyword_set(keepcheckpoint) then begin
+        if file_test(checkpoint) then file_delete, checkpoint
+        if file_test(indexFile) then file_delete, indexFile
+    endif
+
+    count = accumbuf.n
+    if not keyword_set(quiet) then message, 'Accumulated :' + string(count) + ' spectra',/info
+end